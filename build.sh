@@ -27,62 +27,38 @@ if ! command -v flutter &> /dev/null; then
     exit 1
 fi
 
-print_status "Checking Flutter doctor..."
-flutter doctor
-
-# Build user app
-print_status "Building User App..."
-cd user-app
-
-if [ ! -f "pubspec.yaml" ]; then
-    print_error "pubspec.yaml not found in user-app directory"
-    exit 1
-fi
-
-flutter clean
-flutter pub get
-flutter build web --release --base-href /
-
-if [ $? -eq 0 ]; then
-    print_success "User app built successfully!"
-else
-    print_error "Failed to build user app"
-    exit 1
-fi
-
-cd ..
-
-# Build admin app
-print_status "Building Admin App..."
-cd admin-app
-
-if [ ! -f "pubspec.yaml" ]; then
-    print_error "pubspec.yaml not found in admin-app directory"
-    exit 1
-fi
-
-flutter clean
-flutter pub get
-flutter build web --release --base-href /admin/
+# Build both apps: unchanged apps are restored from the build cache
+# (release.webbuild), the others are built in parallel without flutter clean
+print_status "Building User App and Admin App..."
+for app in user-app admin-app; do
+    if [ ! -f "$app/pubspec.yaml" ]; then
+        print_error "pubspec.yaml not found in $app directory"
+        exit 1
+    fi
+done
+
+python3 -m release.webbuild user-app admin-app
 
 if [ $? -eq 0 ]; then
-    print_success "Admin app built successfully!"
+    print_success "User app and admin app built successfully!"
 else
-    print_error "Failed to build admin app"
+    print_error "Failed to build the web apps"
     exit 1
 fi
 
-cd ..
-
 # Copy admin build to user app build directory
 print_status "Combining builds..."
 
-# Create admin directory in user app
+# Create admin directory in user app (replacing the last combined build's)
+rm -rf user-app/build/web/admin
 mkdir -p user-app/build/web/admin
 
 # Copy all admin build files
 cp -r admin-app/build/web/* user-app/build/web/admin/
 
+# Both service workers list exactly the files deployed next to them
+python3 -m release.service_worker user-app/build/web user-app/build/web/admin
+
 print_success "Build process completed successfully!"
 print_status "Build output is in: user-app/build/web/"
 print_status "User app: user-app/build/web/"
@@ -9,20 +9,6 @@ handle_error() {
     exit 1
 }
 
-# Download and setup Flutter
-echo "📦 Setting up Flutter..."
-if [ ! -d "flutter" ]; then
-    echo "⬇️ Downloading Flutter..."
-    git clone https://github.com/flutter/flutter.git -b stable --depth 1 || handle_error "Flutter download failed"
-    echo "✅ Flutter downloaded successfully"
-fi
-
-export PATH="$PWD/flutter/bin:$PATH"
-
-# Configure Flutter
-echo "⚙️ Configuring Flutter..."
-flutter config --no-analytics --enable-web || handle_error "Flutter config failed"
-
 # Create build directory
 echo "📁 Creating build directory..."
 rm -rf build
@@ -65,16 +51,34 @@ fi
 
 echo "✅ Landing page copied successfully"
 
-echo "🔨 Building admin app..."
-cd admin-app || handle_error "Failed to enter admin-app directory"
-
-echo "📦 Getting admin app dependencies..."
-flutter pub get || handle_error "Failed to get admin app dependencies"
-
-echo "🏗️ Building admin app for web..."
-flutter build web --release --verbose --base-href="/admin/" || handle_error "Failed to build admin app"
+# Incremental web build (release.webbuild): an unchanged admin app is restored
+# from the build cache, so Flutter is only downloaded when something changed.
+# Keep the cache in Netlify's build cache directory between deploys.
+if [ -z "$ASC_WEB_BUILD_CACHE" ] && [ -n "$NETLIFY_CACHE_DIR" ]; then
+    export ASC_WEB_BUILD_CACHE="$NETLIFY_CACHE_DIR/web-builds"
+fi
 
-cd .. || handle_error "Failed to return to root directory"
+echo "🔍 Checking the admin app build cache..."
+if python3 -m release.webbuild admin-app --restore-only; then
+    echo "✅ Admin app unchanged, skipping Flutter"
+else
+    # Download and setup Flutter
+    echo "📦 Setting up Flutter..."
+    if [ ! -d "flutter" ]; then
+        echo "⬇️ Downloading Flutter..."
+        git clone https://github.com/flutter/flutter.git -b stable --depth 1 || handle_error "Flutter download failed"
+        echo "✅ Flutter downloaded successfully"
+    fi
+
+    export PATH="$PWD/flutter/bin:$PATH"
+
+    # Configure Flutter
+    echo "⚙️ Configuring Flutter..."
+    flutter config --no-analytics --enable-web || handle_error "Flutter config failed"
+
+    echo "🔨 Building admin app..."
+    python3 -m release.webbuild admin-app --verbose || handle_error "Failed to build admin app"
+fi
 
 echo "📋 Copying admin app to build/admin directory..."
 mkdir -p build/admin || handle_error "Failed to create admin directory"
@@ -83,6 +87,9 @@ if [ ! -d "admin-app/build/web" ]; then
 fi
 cp -r admin-app/build/web/* build/admin/ || handle_error "Failed to copy admin app"
 
+echo "🧭 Refreshing the admin service worker manifest..."
+python3 -m release.service_worker build/admin || handle_error "Failed to update the service worker manifest"
+
 echo "📝 Adding redirects file..."
 cat > build/_redirects << 'EOF'
 # Netlify redirects for admin panel
@@ -0,0 +1,3 @@
+"""
+Shared release tooling for ZaZa Dance Studio (App Store Connect API helpers)
+"""
@@ -0,0 +1,263 @@
+"""
+Local token agent.
+
+A small long-lived process that listens on a Unix socket, holds the parsed
+.p8 key and the current token, and hands tokens out on request. Shell steps
+that need a bearer token then cost one socket round trip instead of an
+interpreter start, a key parse and an ES256 signature.
+
+The protocol is one line per request and one line per answer:
+
+    token       -> OK <jwt>
+    invalidate  -> OK        (drop the cached token, e.g. after a 401)
+    ping        -> OK <pid>
+    stop        -> OK        (shut the agent down)
+
+Each connection is served on its own thread; the TokenProvider lock makes
+concurrent requests safe and at most one of them signs. A lock file next to
+the socket keeps two agents from racing for it. The socket lives in a 0700
+directory and is itself 0600. The agent exits on its own after
+AGENT_IDLE_TIMEOUT seconds without requests.
+
+    python3 -m release agent start|stop|status|serve
+"""
+
+import argparse
+import fcntl
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+from . import config
+
+CONNECT_TIMEOUT = 2.0
+START_TIMEOUT = 5.0
+
+
+class AgentError(Exception):
+    pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        server.touch()
+        line = self.rfile.readline(256).decode('ascii', 'replace').strip()
+
+        try:
+            if line == 'token':
+                reply = f"OK {server.provider.get_token()}"
+            elif line == 'invalidate':
+                server.provider.invalidate()
+                reply = 'OK'
+            elif line == 'ping':
+                reply = f"OK {os.getpid()}"
+            elif line == 'stop':
+                reply = 'OK'
+                threading.Thread(target=server.shutdown, daemon=True).start()
+            else:
+                reply = f"ERR unknown request {line!r}"
+        except Exception as e:
+            reply = f"ERR {type(e).__name__}: {e}"
+
+        self.wfile.write(reply.encode() + b'\n')
+
+
+class TokenAgent(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server that hands out tokens from one TokenProvider"""
+
+    daemon_threads = True
+    # Parallel CI jobs connect in bursts; the default backlog of 5 overflows
+    request_queue_size = 128
+
+    def __init__(self, socket_path=None, provider=None, idle_timeout=None):
+        from .auth import get_provider
+
+        self.socket_path = str(socket_path or config.AGENT_SOCKET_PATH)
+        self.provider = provider or get_provider()
+        self.idle_timeout = config.AGENT_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._last_used = time.monotonic()
+
+        directory = os.path.dirname(self.socket_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # makedirs leaves an existing directory's owner and mode alone
+        stat = os.stat(directory)
+        if stat.st_uid != os.getuid():
+            raise AgentError(f"{directory} is owned by another user (uid {stat.st_uid})")
+        if stat.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+        self._lock_file = open(self.socket_path + '.lock', 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise AgentError(f"an agent is already serving {self.socket_path}")
+        # Holding the lock means any socket file left here is stale
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def touch(self):
+        self._last_used = time.monotonic()
+
+    def _watch_idle(self):
+        while True:
+            remaining = self.idle_timeout - (time.monotonic() - self._last_used)
+            if remaining <= 0:
+                self.shutdown()
+                return
+            time.sleep(min(remaining, 5.0))
+
+    def serve(self):
+        """Serve until stopped or idle for idle_timeout seconds"""
+        if self.idle_timeout:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            # Parse the key up front so the first request does not pay for it
+            self.provider.get_token()
+            self.serve_forever()
+        finally:
+            self.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            self._lock_file.close()
+
+
+def _request(command, socket_path=None):
+    path = str(socket_path or config.AGENT_SOCKET_PATH)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(command.encode() + b'\n')
+            reply = sock.makefile('rb').readline().decode().strip()
+    except OSError as e:
+        raise AgentError(f"token agent unavailable: {e}") from e
+
+    status, _, value = reply.partition(' ')
+    if status != 'OK':
+        raise AgentError(value or 'empty reply from token agent')
+    return value
+
+
+def start_agent(socket_path=None, timeout=START_TIMEOUT):
+    """Start a detached agent and wait until it answers"""
+    path = str(socket_path or config.AGENT_SOCKET_PATH)
+    env = dict(os.environ, ASC_AGENT_SOCKET=path)
+    proc = subprocess.Popen([sys.executable, '-m', 'release.agent', 'serve'],
+                            cwd=config.REPO_ROOT, env=env, start_new_session=True,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        # Checked before the ping, so an agent that lost the start race to
+        # another one still gets a last chance to find it answering
+        exited = proc.poll()
+        try:
+            return int(_request('ping', path))
+        except AgentError:
+            if exited is not None:
+                # e.g. no signing key: do not wait out the timeout
+                raise AgentError(f"the agent exited right away (exit {exited})")
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.02)
+
+
+def request_token(socket_path=None, autostart=None):
+    """Fetch a token from the agent, starting one first if allowed"""
+    autostart = config.AGENT_AUTOSTART if autostart is None else autostart
+    try:
+        return _request('token', socket_path)
+    except AgentError:
+        if not autostart:
+            raise
+    try:
+        start_agent(socket_path)
+    except AgentError:
+        # Lost a race with another starter; its agent is answering by now
+        pass
+    return _request('token', socket_path)
+
+
+def get_token(socket_path=None):
+    """Return a token from the agent, or sign one in-process if it is unreachable"""
+    try:
+        return request_token(socket_path)
+    except AgentError:
+        from .auth import get_token as local_token
+
+        return local_token()
+
+
+def invalidate_token(socket_path=None):
+    """Ask a running agent to drop its token; returns False if none is running"""
+    try:
+        _request('invalidate', socket_path)
+    except AgentError:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local App Store Connect token agent")
+    parser.add_argument('action', choices=('start', 'stop', 'status', 'serve'))
+    parser.add_argument('--socket', default=config.AGENT_SOCKET_PATH)
+    parser.add_argument('--idle-timeout', type=float, default=config.AGENT_IDLE_TIMEOUT,
+                        help="exit after this many idle seconds (0 = never)")
+    args = parser.parse_args(argv)
+
+    if args.action == 'serve':
+        try:
+            agent = TokenAgent(args.socket, idle_timeout=args.idle_timeout)
+        except AgentError as e:
+            print(f"⚠️ {e}")
+            return 1
+        agent.serve()
+        return 0
+
+    if args.action == 'start':
+        try:
+            print(f"🔑 token agent running (pid {_request('ping', args.socket)})")
+            return 0
+        except AgentError:
+            pass
+        try:
+            pid = start_agent(args.socket)
+        except AgentError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"🔑 token agent started (pid {pid})")
+        return 0
+
+    try:
+        pid = _request('ping', args.socket)
+    except AgentError:
+        print("token agent not running")
+        return 0 if args.action == 'stop' else 1
+
+    if args.action == 'stop':
+        _request('stop', args.socket)
+        print(f"🛑 token agent stopped (pid {pid})")
+    else:
+        print(f"🔑 token agent running (pid {pid}) on {args.socket}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+"""
+Fast, deterministic discovery of built IPAs.
+
+The tree is walked with os.scandir, skipping directories that never hold
+IPAs (web builds, canvaskit, Pods, node_modules, ...). Every visited
+directory is remembered with its mtime in ASC_CACHE_DIR/artifacts.json;
+a directory whose mtime has not changed is not listed again, so after the
+first scan a lookup costs one stat() per directory. The version of each
+IPA is read from Payload/*.app/Info.plist through the zip central
+directory, without extracting the archive.
+
+Usage: python3 -m release.artifacts [--version 31] [--short-version 2.0.0]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import plistlib
+import threading
+import zipfile
+from pathlib import Path
+
+from . import config
+
+PRUNED_DIRS = frozenset({
+    '.git', '.dart_tool', '.gradle', '.idea', '.pub-cache', '.symlinks',
+    'node_modules', 'Pods', 'Flutter', 'flutter',
+    'admin', 'admin-app', 'canvaskit', 'assets', 'icons', 'web',
+    'lib', 'test', 'android', 'landing-page', 'shared_core', 'supabase',
+    'intermediates', '__pycache__',
+})
+INFO_PLIST_PATTERN = 'Payload/*.app/Info.plist'
+
+
+def read_ipa_info(path):
+    """Return the bundle id and versions from an IPA's Info.plist, or None"""
+    try:
+        with zipfile.ZipFile(path) as ipa:
+            for name in ipa.namelist():
+                if fnmatch.fnmatch(name, INFO_PLIST_PATTERN) and name.count('/') == 2:
+                    info = plistlib.loads(ipa.read(name))
+                    return {
+                        'bundle_id': info.get('CFBundleIdentifier'),
+                        'version': info.get('CFBundleVersion'),
+                        'short_version': info.get('CFBundleShortVersionString'),
+                    }
+    except (OSError, zipfile.BadZipFile, plistlib.InvalidFileException, ValueError):
+        pass
+    return None
+
+
+class ArtifactLocator:
+    """Finds artifacts under a set of roots using a persisted directory index"""
+
+    def __init__(self, roots=None, suffix='.ipa', index_path=None, pruned=PRUNED_DIRS):
+        self.roots = [Path(root).resolve() for root in (roots or [config.REPO_ROOT])]
+        self.suffix = suffix
+        self.index_path = index_path or config.ARTIFACT_INDEX_PATH
+        self.pruned = pruned
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self.index.setdefault('dirs', {})
+        self.index.setdefault('artifacts', {})
+
+    def _save(self):
+        if not self._dirty:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+        self._dirty = False
+
+    def _list_dir(self, path):
+        """(subdirs, artifacts) of a directory, re-listed only when its mtime changed"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.index['dirs'].pop(path, None)
+            return [], []
+
+        cached = self.index['dirs'].get(path)
+        if cached and cached['mtime'] == mtime:
+            return cached['subdirs'], cached['artifacts']
+
+        subdirs, artifacts = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.pruned:
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(self.suffix) and entry.is_file():
+                        artifacts.append(entry.path)
+        except OSError:
+            pass
+
+        self.index['dirs'][path] = {'mtime': mtime, 'subdirs': subdirs, 'artifacts': artifacts}
+        self._dirty = True
+        return subdirs, artifacts
+
+    def _describe(self, path):
+        """Size, mtime and Info.plist versions of an artifact (cached by size+mtime)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self.index['artifacts'].get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+            return cached
+
+        entry = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        entry.update(read_ipa_info(path) or {})
+        self.index['artifacts'][path] = entry
+        self._dirty = True
+        return entry
+
+    def scan(self):
+        """Every artifact under the roots, newest first"""
+        with self._lock:
+            found = []
+            stack = [str(root) for root in reversed(self.roots)]
+            seen = set()
+            while stack:
+                path = stack.pop()
+                if path in seen:
+                    continue
+                seen.add(path)
+                subdirs, artifacts = self._list_dir(path)
+                stack.extend(reversed(subdirs))
+                for artifact in artifacts:
+                    entry = self._describe(artifact)
+                    if entry:
+                        found.append(entry)
+
+            for stale in [p for p in self.index['dirs'] if p not in seen]:
+                del self.index['dirs'][stale]
+                self._dirty = True
+            known = {entry['path'] for entry in found}
+            for stale in [p for p in self.index['artifacts'] if p not in known]:
+                del self.index['artifacts'][stale]
+                self._dirty = True
+            self._save()
+
+        # Newest first; the path breaks ties so the answer is deterministic
+        found.sort(key=lambda entry: (-entry['mtime'], entry['path']))
+        return found
+
+    def find(self, version=None, short_version=None, bundle_id=None):
+        """Newest artifact matching the requested Info.plist values, or None"""
+        for entry in self.scan():
+            if version is not None and entry.get('version') != str(version):
+                continue
+            if short_version is not None and entry.get('short_version') != short_version:
+                continue
+            if bundle_id is not None and entry.get('bundle_id') != bundle_id:
+                continue
+            return entry
+        return None
+
+
+def find_artifact(version=None, short_version=None, bundle_id=None, roots=None):
+    """Shortcut returning the path of the newest matching IPA, or None"""
+    entry = ArtifactLocator(roots).find(version, short_version, bundle_id)
+    return entry['path'] if entry else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find built IPAs")
+    parser.add_argument('roots', nargs='*')
+    parser.add_argument('--version', help="CFBundleVersion (build number)")
+    parser.add_argument('--short-version', help="CFBundleShortVersionString")
+    parser.add_argument('--bundle-id')
+    parser.add_argument('--all', action='store_true', help="list every artifact")
+    args = parser.parse_args(argv)
+
+    locator = ArtifactLocator(args.roots or None)
+    if args.all:
+        for entry in locator.scan():
+            print(f"{entry['path']}  {entry.get('short_version')} ({entry.get('version')})")
+        return 0
+
+    entry = locator.find(args.version, args.short_version, args.bundle_id)
+    if not entry:
+        print("❌ לא נמצא IPA מתאים")
+        return 1
+    print(entry['path'])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""
+ES256 token signing for the App Store Connect API.
+
+The private key is parsed once per process and a signed token is reused
+until shortly before it expires, instead of re-reading the .p8 file and
+signing a new JWT for every request. The token is also shared between
+processes through a small 0600 cache file, so short-lived commands such as
+``release token`` usually answer without loading any crypto at all.
+
+Tokens are signed with cryptography's EC primitives directly; importing
+PyJWT alone costs more than the whole ``release token`` budget.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+
+from . import config
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+class TokenProvider:
+    """Hands out cached App Store Connect bearer tokens"""
+
+    def __init__(self, key_id=None, issuer_id=None, key_path=None,
+                 lifetime=config.TOKEN_LIFETIME,
+                 refresh_margin=config.TOKEN_REFRESH_MARGIN,
+                 cache_path=None):
+        self.key_id = key_id or config.KEY_ID
+        self.issuer_id = issuer_id or config.ISSUER_ID
+        self.key_path = key_path or config.KEY_PATH
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.cache_path = cache_path
+        self._private_key = None
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _load_private_key(self):
+        """Parse the .p8 key into a key object (done once)"""
+        from cryptography.hazmat.primitives import serialization
+
+        with open(self.key_path, 'rb') as key_file:
+            return serialization.load_pem_private_key(key_file.read(), password=None)
+
+    def _sign(self, now):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+
+        if self._private_key is None:
+            self._private_key = self._load_private_key()
+
+        headers = {
+            'alg': 'ES256',
+            'kid': self.key_id,
+            'typ': 'JWT'
+        }
+
+        payload = {
+            'iss': self.issuer_id,
+            'iat': now,
+            'exp': now + self.lifetime,
+            'aud': 'appstoreconnect-v1'
+        }
+
+        signing_input = b'.'.join(
+            _b64url(json.dumps(part, separators=(',', ':')).encode())
+            for part in (headers, payload))
+        der = self._private_key.sign(signing_input, ec.ECDSA(hashes.SHA256()))
+        # JWS wants the raw 32-byte r and s, not the DER encoding
+        r, s = decode_dss_signature(der)
+        signature = r.to_bytes(32, 'big') + s.to_bytes(32, 'big')
+        return (signing_input + b'.' + _b64url(signature)).decode()
+
+    def _read_cache(self, now):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (cached.get('kid') == self.key_id and cached.get('iss') == self.issuer_id
+                and now < cached.get('exp', 0) - self.refresh_margin):
+            return cached
+        return None
+
+    def _write_cache(self, token, expires_at):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'kid': self.key_id, 'iss': self.issuer_id,
+                           'exp': expires_at, 'token': token}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def get_token(self):
+        """Return a valid token, signing a new one only when close to expiry"""
+        with self._lock:
+            now = int(time.time())
+            if self._token is None or now >= self._expires_at - self.refresh_margin:
+                cached = self._read_cache(now)
+                if cached:
+                    self._token, self._expires_at = cached['token'], cached['exp']
+                else:
+                    self._token = self._sign(now)
+                    self._expires_at = now + self.lifetime
+                    self._write_cache(self._token, self._expires_at)
+            return self._token
+
+    def invalidate(self):
+        """Drop the cached token (e.g. after a 401)"""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+            if self.cache_path:
+                try:
+                    os.unlink(self.cache_path)
+                except OSError:
+                    pass
+
+
+_default_provider = None
+_default_lock = threading.Lock()
+
+
+def get_provider():
+    """Process-wide token provider using the shared configuration"""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            _default_provider = TokenProvider(cache_path=config.TOKEN_CACHE_PATH)
+        return _default_provider
+
+
+def get_token():
+    """Shortcut for get_provider().get_token()"""
+    return get_provider().get_token()
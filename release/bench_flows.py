@@ -0,0 +1,277 @@
+"""
+End-to-end benchmark of the release scripts against the offline API.
+
+Each run starts a fresh release.mockserver and a throwaway cache directory,
+key and working directory (with a pubspec.yaml at build 30 and a generated
+IPA for build 31), then runs the real scripts one after another, the way a
+release goes:
+
+    metadata        upload-to-appstore.py
+    release-notes   user-app/update_build_info.py
+    direct-upload   user-app/direct_upload.py
+    altool-upload   user-app/upload_with_altool.py
+
+Every step is timed, and the mock attributes each request it served to the
+step that sent it, so the report has per step: wall time (p50/p95 over the
+runs), requests, bytes on the wire and server-side request latency
+(p50/p95). ``xcrun`` is shadowed by a no-op so nothing ever reaches Apple.
+
+Results are compared with a stored baseline: more requests than the
+baseline, more bytes or slower wall/latency times beyond the tolerances is
+a regression and the command exits 1. A baseline recorded with different
+mock settings is not compared.
+
+    python3 -m release.bench_flows [--runs 3] [--latency 0.02] [--update-baseline]
+"""
+
+import argparse
+import json
+import math
+import os
+import plistlib
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from . import config, mockserver
+from .bench_startup import _write_test_key
+
+FLOWS = (
+    ('metadata', 'upload-to-appstore.py'),
+    ('release-notes', 'user-app/update_build_info.py'),
+    ('direct-upload', 'user-app/direct_upload.py'),
+    ('altool-upload', 'user-app/upload_with_altool.py'),
+)
+BASELINE_PATH = Path(__file__).resolve().parent / 'bench_flows_baseline.json'
+# Wall times below this many seconds of difference are noise, whatever the ratio
+TIME_SLACK = 0.05
+XCRUN_STUB = '#!/bin/sh\necho "xcrun $* (benchmark no-op)"\n'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile; 0 for no values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def write_ipa(path, version='31', short_version='2.0.0', size=8 * 1024 * 1024):
+    """A stored (uncompressed) IPA with a real Info.plist and `size` random bytes"""
+    info = plistlib.dumps({
+        'CFBundleIdentifier': config.BUNDLE_ID,
+        'CFBundleVersion': version,
+        'CFBundleShortVersionString': short_version,
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as ipa:
+        ipa.writestr('Payload/Runner.app/Info.plist', info)
+        ipa.writestr('Payload/Runner.app/Runner', random.Random(0).randbytes(size))
+
+
+def prepare(scratch, base_url, ipa_size):
+    """Key, cache dir, working dir and environment for one run"""
+    key_path = scratch / 'AuthKey_BENCH.p8'
+    _write_test_key(key_path)
+
+    workdir = scratch / 'work'
+    workdir.mkdir()
+    (workdir / 'pubspec.yaml').write_text("name: dance_studio_app\nversion: 2.0.0+30\n")
+    write_ipa(workdir / 'build' / 'ios' / 'ipa' / 'ZaZa_Dance_Build_31.ipa', size=ipa_size)
+
+    bin_dir = scratch / 'bin'
+    bin_dir.mkdir()
+    xcrun = bin_dir / 'xcrun'
+    xcrun.write_text(XCRUN_STUB)
+    xcrun.chmod(0o755)
+
+    cache_dir = scratch / 'cache'
+    env = dict(os.environ,
+               PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+               ASC_API_BASE_URL=base_url,
+               ASC_KEY_PATH=str(key_path),
+               ASC_CACHE_DIR=str(cache_dir),
+               ASC_TOKEN_CACHE=str(cache_dir / 'token.json'),
+               ASC_AGENT_SOCKET=str(scratch / 'agent.sock'),
+               ASC_AGENT_AUTOSTART='0',
+               # Keep watcher polls and retry backoff proportional to the mock
+               ASC_WATCH_INITIAL_INTERVAL='0.05',
+               ASC_WATCH_MAX_INTERVAL='0.2',
+               ASC_BACKOFF_BASE='0.05',
+               ASC_BACKOFF_MAX='1')
+    return workdir, env
+
+
+def run_step(script, workdir, env, verbose=False):
+    """Run one script; returns (ok, seconds, output)
+
+    The scripts report some failures only on stdout, so a ❌ line counts as
+    a failed step too.
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, str(config.REPO_ROOT / script)],
+                            cwd=workdir, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+    seconds = time.perf_counter() - started
+    if verbose:
+        print(result.stdout)
+    ok = result.returncode == 0 and '❌' not in result.stdout
+    return ok, seconds, result.stdout
+
+
+def run_once(args):
+    """One fresh mock and scratch directory, every flow in order; {step: sample}"""
+    samples = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            mockserver.from_arguments(args) as api:
+        workdir, env = prepare(Path(tmp), api.base_url, args.ipa_size)
+        for step, script in FLOWS:
+            api.step = step
+            ok, seconds, output = run_step(script, workdir, env, args.verbose)
+            requests = api.requests_for(step)
+            samples[step] = {
+                'ok': ok,
+                'seconds': seconds,
+                'requests': len(requests),
+                'bytes': sum(r['bytes_in'] + r['bytes_out'] for r in requests),
+                'errors': sum(1 for r in requests if r['status'] >= 400),
+                'latencies': [r['seconds'] for r in requests],
+            }
+            if not ok:
+                print(f"❌ {step} failed:")
+                print('\n'.join('   ' + line for line in output.splitlines()[-20:]))
+    return samples
+
+
+def aggregate(runs):
+    """Per-step statistics over all runs"""
+    report = {}
+    for step, _ in FLOWS:
+        samples = [run[step] for run in runs]
+        latencies = [value for sample in samples for value in sample['latencies']]
+        walls = [sample['seconds'] for sample in samples]
+        report[step] = {
+            'ok': all(sample['ok'] for sample in samples),
+            'wall_p50': percentile(walls, 0.50),
+            'wall_p95': percentile(walls, 0.95),
+            'requests': max(sample['requests'] for sample in samples),
+            'bytes': int(statistics.median(sample['bytes'] for sample in samples)),
+            'errors': max(sample['errors'] for sample in samples),
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p95': percentile(latencies, 0.95),
+        }
+    return report
+
+
+def settings(args):
+    """Mock and workload settings a baseline is only comparable under"""
+    return {name: getattr(args, name) for name in (
+        'latency', 'jitter', 'page_size', 'hourly_limit', 'failure_rate',
+        'failure_status', 'upload_failure_rate', 'part_size', 'etags', 'seed', 'ipa_size')}
+
+
+def print_report(report):
+    print(f"{'step':<15} {'wall p50':>9} {'wall p95':>9} {'requests':>9} {'bytes':>11} "
+          f"{'req p50':>8} {'req p95':>8} {'errors':>7}")
+    for step, stats in report.items():
+        icon = '✅' if stats['ok'] else '❌'
+        print(f"{step:<15} {stats['wall_p50']:8.3f}s {stats['wall_p95']:8.3f}s "
+              f"{stats['requests']:>9} {stats['bytes']:>11,} "
+              f"{stats['latency_p50'] * 1000:6.1f}ms {stats['latency_p95'] * 1000:6.1f}ms "
+              f"{stats['errors']:>7} {icon}")
+
+
+def regressions(report, baseline, time_tolerance, bytes_tolerance):
+    """Human-readable list of everything worse than the baseline"""
+    found = []
+    for step, stats in report.items():
+        base = baseline.get(step)
+        if base is None:
+            continue
+        if stats['requests'] > base['requests']:
+            found.append(f"{step}: {stats['requests']} requests (baseline {base['requests']})")
+        if stats['bytes'] > base['bytes'] * (1 + bytes_tolerance):
+            found.append(f"{step}: {stats['bytes']:,} bytes (baseline {base['bytes']:,})")
+        for key in ('wall_p50', 'latency_p95'):
+            if stats[key] > base[key] * (1 + time_tolerance) + TIME_SLACK:
+                found.append(f"{step}: {key} {stats[key]:.3f}s (baseline {base[key]:.3f}s)")
+    return found
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(path, data):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the release scripts offline")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--ipa-size', type=int, default=8 * 1024 * 1024,
+                        help="bytes of the generated IPA")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store this run as the new baseline")
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument('--bytes-tolerance', type=float, default=0.1)
+    parser.add_argument('--json', type=Path, help="also write the report here")
+    parser.add_argument('--verbose', action='store_true', help="print the scripts' output")
+    mockserver.add_arguments(parser)
+    parser.set_defaults(latency=0.02)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(1, args.runs + 1):
+        print(f"🏃 run {number}/{args.runs}")
+        runs.append(run_once(args))
+    report = aggregate(runs)
+    print_report(report)
+
+    result = {'settings': settings(args), 'steps': report}
+    if args.json:
+        save_json(args.json, result)
+
+    if not all(stats['ok'] for stats in report.values()):
+        print("❌ a flow failed")
+        return 1
+
+    if args.update_baseline:
+        save_json(args.baseline, result)
+        print(f"💾 baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"⚠️  no baseline at {args.baseline} (run with --update-baseline)")
+        return 0
+    if baseline.get('settings') != result['settings']:
+        print("⚠️  baseline was recorded with different settings, not comparing")
+        return 0
+
+    found = regressions(report, baseline['steps'], args.time_tolerance, args.bytes_tolerance)
+    for line in found:
+        print(f"❌ regression: {line}")
+    if found:
+        return 1
+    print("✅ no regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+"""
+Startup-time guard for the ``release`` command.
+
+Runs ``python3 -m release token`` repeatedly in fresh interpreters against a
+throwaway EC key and cache directory, and fails when the median wall time
+exceeds the budget. The first run signs a token (cold); the rest answer from
+the token cache or from a running token agent, which are the cases that
+must stay fast because scripts and shells call them over and over. An
+interpreter that only runs ``pass`` is timed too so a slow machine is not
+mistaken for a regression.
+
+    python3 -m release.bench_startup [--runs 15] [--budget-ms 100]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import config
+
+DEFAULT_BUDGET_MS = 100
+
+
+def _write_test_key(path):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    pem = key.private_bytes(serialization.Encoding.PEM,
+                            serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    with open(path, 'wb') as f:
+        f.write(pem)
+
+
+def _time_command(cmd, env, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(cmd, env=env, cwd=config.REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def measure(runs=15):
+    """Return (cold_ms, cached timings, agent timings, bare interpreter timings) in ms"""
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = os.path.join(tmp, 'AuthKey_BENCH.p8')
+        _write_test_key(key_path)
+        socket_path = os.path.join(tmp, 'agent.sock')
+        env = dict(os.environ, ASC_KEY_PATH=key_path, ASC_CACHE_DIR=tmp,
+                   ASC_TOKEN_CACHE=os.path.join(tmp, 'token.json'),
+                   ASC_AGENT_SOCKET=socket_path, ASC_AGENT_AUTOSTART='0')
+
+        cmd = [sys.executable, '-m', 'release', 'token']
+        cold = _time_command(cmd, env, 1)[0]
+        cached = _time_command(cmd, env, runs)
+        bare = _time_command([sys.executable, '-c', 'pass'], env, runs)
+
+        subprocess.run([sys.executable, '-m', 'release', 'agent', 'start'], env=env,
+                       cwd=config.REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        try:
+            agent = _time_command(cmd, env, runs)
+        finally:
+            subprocess.run([sys.executable, '-m', 'release', 'agent', 'stop'], env=env,
+                           cwd=config.REPO_ROOT, stdout=subprocess.DEVNULL)
+    return cold, cached, agent, bare
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that `release token` starts fast")
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum median wall time of a cached or agent-served `release token`")
+    args = parser.parse_args(argv)
+
+    cold, cached, agent, bare = measure(args.runs)
+    baseline = statistics.median(bare)
+    print(f"python3 -c pass        median {baseline:6.1f} ms")
+    print(f"release token (cold)          {cold:6.1f} ms")
+    for label, timings in (('cached', cached), ('agent', agent)):
+        median = statistics.median(timings)
+        print(f"release token ({label + ')':<7} median {median:6.1f} ms  "
+              f"(+{median - baseline:.1f} ms over the interpreter)")
+
+    median = max(statistics.median(cached), statistics.median(agent))
+    if median > args.budget_ms:
+        print(f"❌ release token is over the {args.budget_ms:.0f} ms budget")
+        return 1
+    print(f"✅ within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
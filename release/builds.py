@@ -0,0 +1,91 @@
+"""
+Build lookups against App Store Connect.
+
+Lookups are filtered and sorted on the server (GET /v1/builds with
+filter[app], filter[version], sort and sparse fields) so finding one build
+costs a single small request, and full listings follow links.next so no
+build is lost once the app has more builds than fit on one page. Id lookups
+fetch nothing but `version`.
+"""
+
+from . import config
+from .client import Query
+from .records import Build
+
+MAX_PAGE_SIZE = 200
+DEFAULT_BUILD_FIELDS = ('version', 'processingState', 'uploadedDate', 'expired')
+BUILD_ID_FIELDS = ('version',)
+
+
+def builds_query(app_id=None, fields=DEFAULT_BUILD_FIELDS, sort='-uploadedDate',
+                 limit=None, versions=(), client=None):
+    """Query for the app's builds, filtered and sorted on the server"""
+    query = Query('builds', client=client).filter('app', app_id or config.APP_ID)
+    if versions:
+        query.filter('version', *versions)
+    if sort:
+        query.sort(sort)
+    if limit:
+        query.limit(limit)
+    if fields:
+        query.fields('builds', *fields)
+    return query
+
+
+def iter_builds(app_id=None, fields=DEFAULT_BUILD_FIELDS, sort='-uploadedDate',
+                page_size=MAX_PAGE_SIZE, client=None, cache=True):
+    """Stream every build of the app, newest first, across all pages"""
+    query = builds_query(app_id, fields, sort=sort, limit=page_size, client=client)
+    yield from query if cache else query.uncached()
+
+
+def iter_build_records(app_id=None, fields=DEFAULT_BUILD_FIELDS, sort='-uploadedDate',
+                       page_size=MAX_PAGE_SIZE, client=None, cache=True):
+    """Stream every build as a compact Build record, newest first"""
+    query = builds_query(app_id, fields, sort=sort, limit=page_size, client=client)
+    if not cache:
+        query.uncached()
+    return query.records(Build)
+
+
+def find_builds(version, app_id=None, fields=DEFAULT_BUILD_FIELDS, limit=1, client=None):
+    """Return up to `limit` builds with the given build number, newest first"""
+    query = builds_query(app_id, fields, limit=limit, versions=[version], client=client)
+    return query.get().get('data', [])
+
+
+def find_build(version, app_id=None, fields=DEFAULT_BUILD_FIELDS, client=None):
+    """Return the newest build with the given build number, or None"""
+    return builds_query(app_id, fields, versions=[version], client=client).first()
+
+
+def build_ids_by_version(versions, app_id=None, client=None, cache=True):
+    """Map each build number to its newest build id, in one request
+
+    Only `version` is fetched, which is all an id lookup needs.
+    """
+    versions = [str(version) for version in versions]
+    if not versions:
+        return {}
+    query = builds_query(app_id, BUILD_ID_FIELDS, versions=versions,
+                         limit=MAX_PAGE_SIZE, client=client)
+    if not cache:
+        query.uncached()
+    ids = {}
+    for build in query.records(Build):
+        # newest first, so the first build seen for a version wins
+        ids.setdefault(build.version, build.id)
+    return ids
+
+
+def latest_build(app_id=None, fields=DEFAULT_BUILD_FIELDS, client=None):
+    """Return the most recently uploaded build, or None"""
+    return builds_query(app_id, fields, client=client).first()
+
+
+def latest_build_number(app_id=None, client=None):
+    """Return the build number (CFBundleVersion) of the newest build, or None"""
+    query = builds_query(app_id, BUILD_ID_FIELDS, limit=1, client=client)
+    build = next(query.records(Build), None)
+    return build.version if build else None
+
@@ -0,0 +1,203 @@
+"""
+On-disk cache for App Store Connect GET responses.
+
+The same listings (appInfos, builds, localizations) are requested with the
+same URLs by many scripts and runs. The client stores every 200 GET body
+here, keyed by the full URL including its query, and on the next identical
+GET either:
+
+- revalidates with If-None-Match / If-Modified-Since when the stored
+  response had an ETag or Last-Modified, turning a 304 into a cache hit; or
+- reuses the body without a request while it is younger than
+  RESPONSE_CACHE_TTL, for responses that carry no validators.
+
+Each entry is tagged with the resource types it contains (the collection in
+the path plus any include=), and a successful POST/PATCH/DELETE drops every
+entry tagged with a type it touched. The total body size is capped, with
+least-recently-used entries evicted first.
+"""
+
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from . import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    types TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_use ON responses (last_used);
+"""
+
+
+def resource_types(url, data=None):
+    """Resource types a request touches, e.g. apps/1/appInfos -> {apps, appInfos}
+
+    Path segments alternate between collection and id after the /v1 prefix;
+    relationship paths (x/ID/relationships/y) name both sides.
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split('/') if s]
+    if segments and segments[0].startswith('v') and segments[0][1:].isdigit():
+        segments = segments[1:]
+
+    types = set()
+    for position, segment in enumerate(segments):
+        if segment == 'relationships':
+            continue
+        if position % 2 == 0 or (position and segments[position - 1] == 'relationships'):
+            types.add(segment)
+
+    for include in parse_qs(parts.query).get('include', []):
+        types.update(name for name in include.split(',') if name)
+
+    if isinstance(data, dict) and isinstance(data.get('data'), dict):
+        if data['data'].get('type'):
+            types.add(data['data']['type'])
+    return types
+
+
+class CachedResponse:
+    """What the cache knows about one URL"""
+
+    __slots__ = ('url', 'etag', 'last_modified', 'content_type', 'stored_at', 'body')
+
+    def __init__(self, url, etag, last_modified, content_type, stored_at, body):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.stored_at = stored_at
+        self.body = body
+
+    @property
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """SQLite-backed LRU store of GET bodies, safe to share between threads"""
+
+    def __init__(self, path=None, max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+                 ttl=config.RESPONSE_CACHE_TTL):
+        self.path = path or config.RESPONSE_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0,
+                      'stores': 0, 'evictions': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        self._db = self._connect()
+
+    def _connect(self):
+        if str(self.path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        return db
+
+    def _count(self, name):
+        self.stats[name] += 1
+
+    def lookup(self, url):
+        """Return (entry, fresh): fresh entries may be served without a request"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT url, etag, last_modified, content_type, stored_at, body '
+                'FROM responses WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                self._count('misses')
+                return None, False
+            entry = CachedResponse(*row)
+            fresh = not entry.has_validators and time.time() - entry.stored_at < self.ttl
+            if fresh:
+                self._count('hits')
+                with self._db:
+                    self._db.execute('UPDATE responses SET last_used = ? WHERE url = ?',
+                                     (time.time(), url))
+            elif not entry.has_validators:
+                # Expired and nothing to revalidate with: a plain miss
+                self._count('misses')
+                return None, False
+            return entry, fresh
+
+    def revalidated(self, entry):
+        """Record a 304 for an entry: it is current again"""
+        with self._lock, self._db:
+            self._count('revalidated')
+            now = time.time()
+            self._db.execute('UPDATE responses SET stored_at = ?, last_used = ? WHERE url = ?',
+                             (now, now, entry.url))
+
+    def store(self, url, response):
+        """Keep a 200 GET response"""
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = response.headers
+        types = ',' + ','.join(sorted(resource_types(url))) + ','
+        now = time.time()
+        with self._lock, self._db:
+            self._count('stores')
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (url, types, etag, last_modified, '
+                'content_type, stored_at, last_used, size, body) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, types, headers.get('ETag'), headers.get('Last-Modified'),
+                 headers.get('Content-Type'), now, now, len(body), body))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute(
+                'SELECT url, size FROM responses ORDER BY last_used').fetchall():
+            self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self._count('evictions')
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def invalidate(self, types):
+        """Drop every entry that contains any of these resource types"""
+        with self._lock, self._db:
+            for resource_type in types:
+                dropped = self._db.execute('DELETE FROM responses WHERE types LIKE ?',
+                                           (f'%,{resource_type},%',)).rowcount
+                self.stats['invalidations'] += dropped
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM responses')
+
+    def summary(self):
+        """One-line hit/miss report for the end of a run"""
+        s = self.stats
+        served = s['hits'] + s['revalidated']
+        lookups = served + s['misses']
+        ratio = f"{served / lookups:.0%}" if lookups else "n/a"
+        return (f"💾 Response cache: {served}/{lookups} served from cache ({ratio}; "
+                f"{s['hits']} fresh, {s['revalidated']} revalidated), "
+                f"{s['evictions']} evicted, {s['invalidations']} invalidated")
+
+    def close(self):
+        self._db.close()
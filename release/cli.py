@@ -0,0 +1,109 @@
+"""
+The ``release`` command: one entry point for the release tooling.
+
+    python3 -m release token
+    python3 -m release agent status
+    python3 -m release builds [--version 31]
+    python3 -m release notes 31 [--dry-run]
+    python3 -m release metadata [--dry-run]
+    python3 -m release upload app.ipa --version 31 --short-version 1.0.0
+    python3 -m release watch --version 31
+    python3 -m release testers import testers.csv --group Students
+    python3 -m release --profile metadata   (also writes a cProfile dump)
+
+Subcommand modules are imported only when that subcommand runs, so
+``release token`` never pays for requests, sqlite3 or the metadata code.
+It asks the local token agent (starting it on first use) and falls back to
+the shared token cache, answering in a few tens of milliseconds.
+"""
+
+import importlib
+import sys
+
+# Subcommands that are complete commands of their own and get the rest of argv
+DELEGATED = {
+    'agent': ('release.agent', "run or control the local token agent"),
+    'metadata': ('release.metadata', "sync localized App Store metadata"),
+    'notes': ('release.notes', "push localized TestFlight release notes for a build"),
+    'testers': ('release.testflight', "manage TestFlight testers and beta groups"),
+    'upload': ('release.upload', "upload an IPA to App Store Connect"),
+    'watch': ('release.watch', "wait for builds to finish processing"),
+}
+
+
+def cmd_token(args):
+    if args is not None and args.no_agent:
+        from .auth import get_token
+    else:
+        from .agent import get_token
+
+    print(get_token())
+    return 0
+
+
+def cmd_builds(args):
+    from . import builds
+    from .client import AppStoreConnectError
+    from .records import Build
+
+    try:
+        query = builds.builds_query(args.app_id, limit=min(args.limit, builds.MAX_PAGE_SIZE),
+                                    versions=[args.version] if args.version else ())
+        for count, build in enumerate(query.records(Build), 1):
+            print(f"{build.version:>6}  {build.processing_state or '':<10}  "
+                  f"{build.uploaded_date or ''}  {build.id}")
+            if count >= args.limit:
+                break
+    except AppStoreConnectError as e:
+        print(f"❌ Error: {e.status_code}")
+        print(e.response.text)
+        return 1
+    return 0
+
+
+def build_parser():
+    import argparse
+
+    from . import config
+
+    parser = argparse.ArgumentParser(prog='release', description="ZaZa Dance release tooling")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    token = commands.add_parser('token', help="print a bearer token for the API")
+    token.add_argument('--no-agent', action='store_true',
+                       help="sign in this process instead of asking the token agent")
+    token.set_defaults(func=cmd_token)
+
+    builds = commands.add_parser('builds', help="list recent builds")
+    builds.add_argument('--version', help="only builds with this build number")
+    builds.add_argument('--limit', type=int, default=10)
+    builds.add_argument('--app-id', default=config.APP_ID)
+    builds.set_defaults(func=cmd_builds)
+
+    # Listed for --help only; main() hands these off before argparse runs
+    for name, (_, description) in DELEGATED.items():
+        commands.add_parser(name, help=description, add_help=False)
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if '--profile' in argv:
+        # Global flag: dump a cProfile of whatever subcommand runs
+        argv.remove('--profile')
+        from .telemetry import start_profile
+        start_profile()
+
+    if argv and argv[0] in DELEGATED:
+        module = importlib.import_module(DELEGATED[argv[0]][0])
+        return module.main(argv[1:])
+
+    # The hot path: skip argparse entirely for a bare `release token`
+    if argv == ['token']:
+        return cmd_token(None)
+
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,393 @@
+"""
+Shared App Store Connect API client.
+
+All scripts go through one pooled keep-alive session so that a multi-step
+run pays the TCP+TLS handshake once instead of once per request. The shared
+client also answers repeated GETs from the on-disk response cache
+(release.cache), revalidating where the API supports it.
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING
+
+from . import config, records
+from .auth import get_provider
+from .cache import ResponseCache, resource_types
+from .scheduler import RequestScheduler
+from .telemetry import add_phase, current_span, get_recorder
+
+
+class AppStoreConnectError(Exception):
+    """Raised when the API answers with an unexpected status code"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        super().__init__(f"{response.request.method} {response.url} -> "
+                         f"{response.status_code}: {response.text[:500]}")
+
+
+# Connection-level timing: requests does not expose connect/TLS time, so the
+# client's adapter uses urllib3 connections that report it to the current span
+
+class _TimedConnection:
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            add_phase('attempt_connect', time.perf_counter() - started)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            add_phase('handshake', time.perf_counter() - started)
+
+
+class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report connect and TLS time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class AppStoreConnectClient:
+    """Authenticated, connection-pooled access to the App Store Connect API"""
+
+    def __init__(self, token_provider=None, base_url=config.API_BASE_URL,
+                 pool_size=config.HTTP_POOL_SIZE,
+                 timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT),
+                 scheduler=None, cache=None, telemetry=None):
+        self.token_provider = token_provider or get_provider()
+        self.scheduler = scheduler or RequestScheduler()
+        self.cache = cache
+        self.telemetry = telemetry or get_recorder()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = self._create_session(pool_size)
+
+    def _create_session(self, pool_size):
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    def url(self, endpoint):
+        """Build an absolute URL; absolute URLs (e.g. links.next) pass through"""
+        if endpoint.startswith(('http://', 'https://')):
+            return endpoint
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    def request(self, method, endpoint, data=None, params=None, timeout=None, cache=True):
+        """Send an authenticated request and return the requests.Response
+
+        Requests are paced by the scheduler; 429s, 5xx answers and dropped
+        connections are retried with backoff where that is safe. GETs go
+        through the response cache unless `cache` is False; successful
+        writes invalidate cached responses of the resource types they touch.
+        Each call is recorded as one telemetry span, retries included.
+        """
+        url = self.url(endpoint)
+        with self.telemetry.http(method, url) as span:
+            cached = None
+            if self.cache is not None and method == 'GET' and cache:
+                # One canonical URL (query included) is both the cache key and what we send
+                url = requests.Request('GET', url, params=params).prepare().url
+                params = None
+                cached, fresh = self.cache.lookup(url)
+                if fresh:
+                    span.status, span.cache = 200, 'hit'
+                    return self._cached_response(cached, span)
+
+            response = self._request(method, url, data, params, timeout,
+                                     cached.conditional_headers() if cached else None)
+            response.span = span
+
+            if self.cache is not None:
+                if cached is not None and response.status_code == 304:
+                    self.cache.revalidated(cached)
+                    span.cache = 'revalidated'
+                    return self._cached_response(cached, span)
+                if method == 'GET' and cache and response.status_code == 200:
+                    self.cache.store(url, response)
+                elif method != 'GET' and response.status_code < 400:
+                    self.cache.invalidate(resource_types(url, data))
+            return response
+
+    def _request(self, method, url, data, params, timeout, headers):
+        span = current_span()
+        attempt = 0
+        token_refreshed = False
+
+        while True:
+            started = time.perf_counter()
+            self.scheduler.acquire()
+            add_phase('throttle', time.perf_counter() - started)
+            try:
+                response = self._send(method, url, data, params, timeout, headers)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self.scheduler.should_retry(method, None, attempt):
+                    raise
+                self._backoff(attempt)
+                attempt += 1
+                span.retries = attempt
+                continue
+
+            self.scheduler.observe(response)
+
+            if response.status_code == 401 and not token_refreshed:
+                # Token may have been revoked or clock-skewed; sign a fresh one once
+                self.token_provider.invalidate()
+                token_refreshed = True
+                continue
+
+            if self.scheduler.should_retry(method, response.status_code, attempt):
+                self._backoff(attempt, response)
+                attempt += 1
+                span.retries = attempt
+                continue
+
+            return response
+
+    def _backoff(self, attempt, response=None):
+        started = time.perf_counter()
+        self.scheduler.backoff(attempt, response)
+        add_phase('backoff', time.perf_counter() - started)
+
+    def _send(self, method, url, data, params, timeout, extra_headers=None):
+        started = time.perf_counter()
+        headers = {'Authorization': f'Bearer {self.token_provider.get_token()}'}
+        add_phase('token', time.perf_counter() - started)
+        if extra_headers:
+            headers.update(extra_headers)
+        started = time.perf_counter()
+        response = self.session.request(
+            method, url,
+            headers=headers,
+            json=data,
+            params=params,
+            timeout=timeout or self.timeout,
+        )
+        span = current_span()
+        if span is not None:
+            span.response(response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _cached_response(entry, span=None):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = entry.body
+        response.headers['Content-Type'] = entry.content_type or 'application/json'
+        response.encoding = 'utf-8'
+        response.url = entry.url
+        response.request = requests.Request('GET', entry.url).prepare()
+        response.from_cache = True
+        response.span = span
+        return response
+
+    def get(self, endpoint, params=None, **kwargs):
+        return self.request('GET', endpoint, params=params, **kwargs)
+
+    def post(self, endpoint, data, **kwargs):
+        return self.request('POST', endpoint, data=data, **kwargs)
+
+    def patch(self, endpoint, data, **kwargs):
+        return self.request('PATCH', endpoint, data=data, **kwargs)
+
+    def delete(self, endpoint, data=None, **kwargs):
+        return self.request('DELETE', endpoint, data=data, **kwargs)
+
+    def get_json(self, endpoint, params=None, cache=True):
+        """GET a document and return the decoded JSON, raising on errors"""
+        response = self.get(endpoint, params=params, cache=cache)
+        if response.status_code != 200:
+            raise AppStoreConnectError(response)
+        started = time.perf_counter()
+        document = response.json()
+        self.telemetry.decoded(response, time.perf_counter() - started)
+        return document
+
+    def paginate_documents(self, endpoint, params=None, cache=True):
+        """Yield each page of a list endpoint as a whole document (data + included)"""
+        document = self.get_json(endpoint, params=params, cache=cache)
+        while True:
+            yield document
+            next_url = document.get('links', {}).get('next')
+            if not next_url:
+                return
+            # links.next already carries the original query and the cursor
+            document = self.get_json(next_url, cache=cache)
+
+    def paginate(self, endpoint, params=None, cache=True):
+        """Yield every resource of a list endpoint, following links.next"""
+        for document in self.paginate_documents(endpoint, params=params, cache=cache):
+            yield from document.get('data', [])
+
+    def query(self, endpoint):
+        """Start a Query against this client"""
+        return Query(endpoint, client=self)
+
+    def close(self):
+        self.session.close()
+
+
+class Query:
+    """JSON:API query parameters for App Store Connect, built by chaining
+
+        (client.query(f'apps/{app_id}/appInfos')
+            .include('appInfoLocalizations')
+            .fields('appInfoLocalizations', 'locale', 'name')
+            .limit(50, 'appInfoLocalizations')
+            .get())
+
+    Compound documents (include=) and sparse fieldsets (fields[type]=) let
+    one request return a resource together with exactly the related
+    resources and attributes the caller reads.
+    """
+
+    def __init__(self, endpoint, client=None):
+        self.endpoint = endpoint
+        self.client = client
+        self.params = {}
+        self.use_cache = True
+
+    def filter(self, name, *values):
+        """filter[name]=v1,v2 (values are ORed by the API)"""
+        self.params[f'filter[{name}]'] = ','.join(str(value) for value in values)
+        return self
+
+    def fields(self, resource_type, *names):
+        """fields[type]=a,b: only these attributes/relationships of that type"""
+        self.params[f'fields[{resource_type}]'] = ','.join(names)
+        return self
+
+    def include(self, *relationships):
+        """include=rel1,rel2: embed related resources in `included`"""
+        self.params['include'] = ','.join(relationships)
+        return self
+
+    def limit(self, count, relationship=None):
+        """limit=N for the primary data, limit[relationship]=N for included ones"""
+        key = f'limit[{relationship}]' if relationship else 'limit'
+        self.params[key] = count
+        return self
+
+    def sort(self, *keys):
+        self.params['sort'] = ','.join(keys)
+        return self
+
+    def uncached(self):
+        """Always ask the API (for state that is being polled)"""
+        self.use_cache = False
+        return self
+
+    def _client(self):
+        return self.client or get_client()
+
+    def get(self):
+        """Fetch the first (or only) document"""
+        return self._client().get_json(self.endpoint, params=self.params, cache=self.use_cache)
+
+    def documents(self):
+        """Yield every page as a whole document"""
+        return self._client().paginate_documents(self.endpoint, params=self.params,
+                                                 cache=self.use_cache)
+
+    def __iter__(self):
+        """Iterate over the primary resources of every page"""
+        return self._client().paginate(self.endpoint, params=self.params,
+                                       cache=self.use_cache)
+
+    def records(self, record_type, *fields):
+        """Stream the primary resources as compact records, page by page
+
+        Unless fields[] for the record's type is already set, only the given
+        fields (default: all the record's fields) are requested.
+        """
+        key = f'fields[{record_type.resource_type}]'
+        if fields or key not in self.params:
+            self.fields(record_type.resource_type, *(fields or record_type.FIELDS))
+        return records.decode(self.documents(), record_type)
+
+    def first(self):
+        """Return the first primary resource, or None"""
+        self.params.setdefault('limit', 1)
+        data = self.get().get('data', [])
+        return data[0] if data else None
+
+
+def included_index(document):
+    """Map (type, id) to every resource in a compound document's `included`"""
+    return {(item['type'], item['id']): item for item in document.get('included', [])}
+
+
+def related(resource, relationship, included):
+    """Resolve a to-many relationship of `resource` against included_index()"""
+    linkage = resource.get('relationships', {}).get(relationship, {}).get('data') or []
+    if isinstance(linkage, dict):
+        linkage = [linkage]
+    return [included[(item['type'], item['id'])] for item in linkage
+            if (item['type'], item['id']) in included]
+
+
+def relationship_complete(resource, relationship):
+    """False when limit[relationship] cut the embedded linkage short"""
+    rel = resource.get('relationships', {}).get(relationship, {})
+    total = rel.get('meta', {}).get('paging', {}).get('total')
+    return total is None or total <= len(rel.get('data') or [])
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client sharing one connection pool and the response cache
+
+    With ASC_REFRESH=1 the run begins with an empty response cache.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            cache = None
+            if config.RESPONSE_CACHE_ENABLED:
+                cache = ResponseCache()
+                if config.REFRESH:
+                    cache.clear()
+            _default_client = AppStoreConnectClient(cache=cache)
+        return _default_client
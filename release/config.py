@@ -0,0 +1,118 @@
+"""
+App Store Connect credentials and defaults shared by all release scripts.
+
+Every value can be overridden from the environment so CI and local runs use
+the same code with different keys.
+"""
+
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# ASC_API_BASE_URL points every script at another server (e.g. release.mockserver)
+API_BASE_URL = os.environ.get("ASC_API_BASE_URL", "https://api.appstoreconnect.apple.com/v1")
+
+KEY_ID = os.environ.get("ASC_KEY_ID", "496SGT8GNA")
+ISSUER_ID = os.environ.get("ASC_ISSUER_ID", "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1")
+KEY_PATH = Path(os.environ.get(
+    "ASC_KEY_PATH",
+    Path.home() / ".private_keys" / f"AuthKey_{KEY_ID}.p8",
+))
+
+APP_ID = os.environ.get("ASC_APP_ID", "7078329715")
+BUNDLE_ID = os.environ.get("ASC_BUNDLE_ID", "com.sharonstudio.app.danceStudioApp")
+
+# Apple rejects tokens that live longer than 20 minutes
+TOKEN_LIFETIME = 20 * 60
+TOKEN_REFRESH_MARGIN = 60
+
+# HTTP connection pooling for api.appstoreconnect.apple.com
+HTTP_POOL_SIZE = int(os.environ.get("ASC_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("ASC_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.environ.get("ASC_READ_TIMEOUT", "60"))
+
+# Local on-disk state (metadata index, caches, journals)
+CACHE_DIR = Path(os.environ.get(
+    "ASC_CACHE_DIR",
+    Path.home() / ".cache" / "zazadance-release",
+))
+INDEX_PATH = CACHE_DIR / "index.sqlite3"
+# How long appInfo/localization listings are trusted without asking Apple
+INDEX_METADATA_TTL = int(os.environ.get("ASC_INDEX_TTL", "3600"))
+
+# ASC_REFRESH=1 starts a run with an empty response cache and index, so every
+# lookup goes back to App Store Connect
+REFRESH = os.environ.get("ASC_REFRESH", "0") != "0"
+
+# Conditional-GET response cache shared by every script (ASC_RESPONSE_CACHE=0 disables)
+RESPONSE_CACHE_ENABLED = os.environ.get("ASC_RESPONSE_CACHE", "1") != "0"
+RESPONSE_CACHE_PATH = CACHE_DIR / "responses.sqlite3"
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("ASC_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Responses without ETag/Last-Modified are reused for this many seconds
+RESPONSE_CACHE_TTL = float(os.environ.get("ASC_RESPONSE_CACHE_TTL", "30"))
+
+# Per-locale App Store metadata (one <locale>.json per locale)
+METADATA_DIR = REPO_ROOT / "app-store-assets" / "metadata"
+# TestFlight "What to Test" notes: <build number>.json = {locale: text}
+RELEASE_NOTES_DIR = REPO_ROOT / "app-store-assets" / "release-notes"
+SYNC_CONCURRENCY = int(os.environ.get("ASC_SYNC_CONCURRENCY", "8"))
+
+# Request scheduling: retries with jittered exponential backoff
+MAX_RETRIES = int(os.environ.get("ASC_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.environ.get("ASC_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("ASC_BACKOFF_MAX", "60"))
+# Apple's documented default is 3600 requests per rolling hour
+DEFAULT_HOURLY_LIMIT = int(os.environ.get("ASC_HOURLY_LIMIT", "3600"))
+
+# Native IPA upload
+UPLOAD_CONCURRENCY = int(os.environ.get("ASC_UPLOAD_CONCURRENCY", "6"))
+UPLOAD_CHUNK_RETRIES = int(os.environ.get("ASC_UPLOAD_CHUNK_RETRIES", "5"))
+UPLOAD_STATE_DIR = CACHE_DIR / "uploads"
+FINGERPRINT_CACHE_PATH = CACHE_DIR / "fingerprints.json"
+FINGERPRINT_CHUNK_SIZE = int(os.environ.get("ASC_FINGERPRINT_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+# Build artifact discovery
+ARTIFACT_INDEX_PATH = CACHE_DIR / "artifacts.json"
+
+# Build processing watcher polling schedule (seconds)
+WATCH_INITIAL_INTERVAL = float(os.environ.get("ASC_WATCH_INITIAL_INTERVAL", "5"))
+WATCH_MAX_INTERVAL = float(os.environ.get("ASC_WATCH_MAX_INTERVAL", "60"))
+WATCH_BACKOFF_FACTOR = float(os.environ.get("ASC_WATCH_BACKOFF_FACTOR", "1.5"))
+# Give up on builds still processing (or not showing up) after this many
+# seconds; ASC_WATCH_TIMEOUT=0 waits forever
+WATCH_TIMEOUT = float(os.environ.get("ASC_WATCH_TIMEOUT", "3600")) or None
+JOURNAL_DIR = CACHE_DIR / "journal"
+# Signed tokens are shared between processes through this file (mode 0600);
+# set ASC_TOKEN_CACHE= (empty) to keep tokens in memory only
+TOKEN_CACHE_PATH = os.environ.get("ASC_TOKEN_CACHE", str(CACHE_DIR / "token.json")) or None
+
+# Local token agent (release.agent): a Unix socket that hands out tokens
+AGENT_SOCKET_PATH = os.environ.get("ASC_AGENT_SOCKET", str(CACHE_DIR / "agent.sock"))
+AGENT_IDLE_TIMEOUT = float(os.environ.get("ASC_AGENT_IDLE_TIMEOUT", "900"))
+# `release token` starts the agent on first use unless ASC_AGENT_AUTOSTART=0
+AGENT_AUTOSTART = os.environ.get("ASC_AGENT_AUTOSTART", "1") != "0"
+
+# TestFlight tester management: ids per relationship add/remove request
+TESTFLIGHT_BATCH_SIZE = int(os.environ.get("ASC_TESTFLIGHT_BATCH_SIZE", "100"))
+
+# Per-request telemetry (release.telemetry); ASC_TELEMETRY=0 disables it
+TELEMETRY_ENABLED = os.environ.get("ASC_TELEMETRY", "1") != "0"
+TELEMETRY_DIR = Path(os.environ.get("ASC_TELEMETRY_DIR", CACHE_DIR / "telemetry"))
+# ASC_PROFILE=1 also leaves a cProfile dump of the run in TELEMETRY_DIR
+PROFILE = os.environ.get("ASC_PROFILE", "0") != "0"
+# Point at node_exporter's --collector.textfile.directory to have runs scraped
+PROMETHEUS_TEXTFILE_DIR = Path(os.environ.get("ASC_PROMETHEUS_TEXTFILE_DIR", TELEMETRY_DIR))
+
+# Incremental Flutter web builds (release.webbuild): one build/web per app
+# and input fingerprint. Point ASC_WEB_BUILD_CACHE at a directory the CI
+# keeps between builds to skip unchanged apps there too.
+WEB_BUILD_CACHE_DIR = Path(os.environ.get("ASC_WEB_BUILD_CACHE", CACHE_DIR / "web-builds"))
+WEB_BUILD_CACHE_KEEP = int(os.environ.get("ASC_WEB_BUILD_CACHE_KEEP", "3"))
+
+# Service-worker manifests (release.service_worker): md5 per file, by (size, mtime)
+SERVICE_WORKER_DIGESTS_PATH = CACHE_DIR / "service-worker-digests.json"
+
+# Precompressed .br/.gz siblings (release.precompress), cached by content hash
+PRECOMPRESS_CACHE_DIR = Path(os.environ.get("ASC_PRECOMPRESS_CACHE", CACHE_DIR / "precompressed"))
+PRECOMPRESS_CACHE_MAX_BYTES = int(os.environ.get("ASC_PRECOMPRESS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
@@ -0,0 +1,161 @@
+"""
+Streaming IPA fingerprints.
+
+One pass over the file with a fixed-size buffer computes the whole-file
+MD5 and SHA-256 together with an MD5 per chunk, so memory stays flat no
+matter how large the IPA is. Results are cached by (path, size, mtime,
+inode) and re-runs on the same artifact are instant. Fingerprints of
+uploaded IPAs are remembered so a byte-identical "new" build can be
+recognised and its upload skipped.
+
+Usage: python3 -m release.fingerprint IPA [IPA ...]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from . import config
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def compute_fingerprint(path, chunk_size=config.FINGERPRINT_CHUNK_SIZE):
+    """Hash a file in one streaming pass; returns the fingerprint dict"""
+    whole_md5 = hashlib.md5()
+    whole_sha256 = hashlib.sha256()
+    chunks = []
+    chunk_md5 = hashlib.md5()
+    chunk_filled = 0
+    size = 0
+
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            block = view[:read]
+            whole_md5.update(block)
+            whole_sha256.update(block)
+            size += read
+
+            # Split the block on chunk boundaries for the per-chunk digests
+            position = 0
+            while position < read:
+                take = min(read - position, chunk_size - chunk_filled)
+                chunk_md5.update(block[position:position + take])
+                chunk_filled += take
+                position += take
+                if chunk_filled == chunk_size:
+                    chunks.append(chunk_md5.hexdigest())
+                    chunk_md5 = hashlib.md5()
+                    chunk_filled = 0
+
+    if chunk_filled:
+        chunks.append(chunk_md5.hexdigest())
+
+    return {
+        'size': size,
+        'md5': whole_md5.hexdigest(),
+        'sha256': whole_sha256.hexdigest(),
+        'chunk_size': chunk_size,
+        'chunks': chunks,
+    }
+
+
+def _identity(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class FingerprintCache:
+    """JSON-backed cache of fingerprints and of which IPAs were uploaded"""
+
+    def __init__(self, path=None):
+        self.path = path or config.FINGERPRINT_CACHE_PATH
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault('files', {})
+        self.data.setdefault('uploaded', {})
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+    def fingerprint(self, path, chunk_size=config.FINGERPRINT_CHUNK_SIZE):
+        """Cached fingerprint; the file is only read when it changed"""
+        key = os.path.abspath(path)
+        identity = _identity(path)
+        with self._lock:
+            entry = self.data['files'].get(key)
+            if (entry and entry['identity'] == identity
+                    and entry['fingerprint']['chunk_size'] == chunk_size):
+                return entry['fingerprint']
+
+        fingerprint = compute_fingerprint(path, chunk_size)
+        with self._lock:
+            self.data['files'][key] = {'identity': identity, 'fingerprint': fingerprint}
+            self._save()
+        return fingerprint
+
+    def find_uploaded(self, fingerprint):
+        """Return the upload record of a byte-identical IPA, or None"""
+        with self._lock:
+            return self.data['uploaded'].get(fingerprint['sha256'])
+
+    def mark_uploaded(self, fingerprint, version, short_version, build_upload_id=None):
+        with self._lock:
+            self.data['uploaded'][fingerprint['sha256']] = {
+                'version': str(version),
+                'short_version': short_version,
+                'build_upload_id': build_upload_id,
+                'size': fingerprint['size'],
+                'uploaded_at': int(time.time()),
+            }
+            self._save()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide fingerprint cache"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FingerprintCache()
+        return _default_cache
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cache = get_cache()
+    for path in argv:
+        started = time.perf_counter()
+        fingerprint = cache.fingerprint(path)
+        elapsed = time.perf_counter() - started
+        print(f"{path}: {fingerprint['size']} bytes, md5 {fingerprint['md5']}, "
+              f"sha256 {fingerprint['sha256']}, {len(fingerprint['chunks'])} chunks "
+              f"({elapsed * 1000:.1f} ms)")
+        uploaded = cache.find_uploaded(fingerprint)
+        if uploaded:
+            print(f"   ↪ identical to build {uploaded['short_version']} ({uploaded['version']}) "
+                  f"already uploaded")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,353 @@
+"""
+Local SQLite index of builds, appInfos and appInfoLocalizations.
+
+Scripts used to start cold and re-download the same listings on every run.
+The index answers keyed lookups (build by version, localization by locale)
+from disk and only goes to the network when the answer is missing or may
+have changed:
+
+- builds are synced incrementally, newest first, stopping at the stored
+  uploadedDate cursor; builds that were still processing are refreshed with
+  one batched filter[id] request;
+- appInfos and localizations have no modification timestamps in the API, so
+  their listings are trusted for INDEX_METADATA_TTL seconds and kept current
+  locally by recording our own writes. Both come back in one compound
+  request (include=appInfoLocalizations).
+
+Run ``python3 -m release.index --refresh`` to force a full resync.
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from . import config
+from .builds import iter_build_records
+from .client import get_client, included_index, related, relationship_complete
+from .records import Build
+
+INDEX_BUILD_FIELDS = ('version', 'processingState', 'uploadedDate', 'expired',
+                      'minOsVersion', 'usesNonExemptEncryption')
+TERMINAL_PROCESSING_STATES = ('VALID', 'FAILED', 'INVALID')
+LOCALIZATION_FIELDS = ('locale', 'name', 'subtitle', 'privacyPolicyUrl',
+                       'privacyChoicesUrl', 'privacyPolicyText')
+# Apple's cap for limit[appInfoLocalizations]
+MAX_INCLUDED_LOCALIZATIONS = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id TEXT PRIMARY KEY,
+    app_id TEXT NOT NULL,
+    version TEXT,
+    processing_state TEXT,
+    uploaded_date TEXT,
+    attributes TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS builds_by_version
+    ON builds (app_id, version, uploaded_date);
+CREATE TABLE IF NOT EXISTS app_infos (
+    id TEXT PRIMARY KEY,
+    app_id TEXT NOT NULL,
+    attributes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS app_info_localizations (
+    id TEXT PRIMARY KEY,
+    app_info_id TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    UNIQUE (app_info_id, locale)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _resource(resource_type, resource_id, attributes_json):
+    return {'type': resource_type, 'id': resource_id, 'attributes': json.loads(attributes_json)}
+
+
+class MetadataIndex:
+    """On-disk index for one app, safe to share between threads"""
+
+    def __init__(self, app_id=None, path=None, client=None,
+                 metadata_ttl=config.INDEX_METADATA_TTL):
+        self.app_id = app_id or config.APP_ID
+        self.path = path or config.INDEX_PATH
+        self.client = client or get_client()
+        self.metadata_ttl = metadata_ttl
+        self._lock = threading.RLock()
+        self._db = self._connect()
+
+    def _connect(self):
+        if str(self.path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        return db
+
+    # sync_state helpers
+
+    def _state_key(self, name):
+        return f"{self.app_id}:{name}"
+
+    def _get_state(self, name):
+        row = self._db.execute('SELECT value FROM sync_state WHERE key = ?',
+                               (self._state_key(name),)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, name, value):
+        self._db.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+                         (self._state_key(name), value))
+
+    def _is_fresh(self, name):
+        synced_at = self._get_state(name)
+        return synced_at is not None and time.time() - float(synced_at) < self.metadata_ttl
+
+    # builds
+
+    def _upsert_build(self, build):
+        attributes = {key: value for key, value in build.attributes().items()
+                      if value is not None}
+        self._db.execute(
+            'INSERT OR REPLACE INTO builds '
+            '(id, app_id, version, processing_state, uploaded_date, attributes) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (build.id, self.app_id, build.version, build.processing_state,
+             build.uploaded_date, json.dumps(attributes)))
+
+    def sync_builds(self, full=False):
+        """Pull builds uploaded since the last sync (or all of them)"""
+        with self._lock, self._db:
+            cursor = None if full else self._get_state('builds:uploadedDate')
+            if full:
+                self._db.execute('DELETE FROM builds WHERE app_id = ?', (self.app_id,))
+
+            newest = cursor
+            fetched = 0
+            page_size = 50 if cursor else 200
+            # The index is already the cache for builds; always ask for new uploads
+            for build in iter_build_records(self.app_id, fields=INDEX_BUILD_FIELDS,
+                                            page_size=page_size, client=self.client,
+                                            cache=False):
+                uploaded = build.uploaded_date
+                if cursor and uploaded and uploaded < cursor:
+                    break
+                self._upsert_build(build)
+                fetched += 1
+                if uploaded and (newest is None or uploaded > newest):
+                    newest = uploaded
+
+            self._refresh_pending_builds()
+            if newest:
+                self._set_state('builds:uploadedDate', newest)
+            return fetched
+
+    def _refresh_pending_builds(self):
+        placeholders = ','.join('?' * len(TERMINAL_PROCESSING_STATES))
+        pending = [row[0] for row in self._db.execute(
+            'SELECT id FROM builds WHERE app_id = ? AND '
+            f'(processing_state IS NULL OR processing_state NOT IN ({placeholders}))',
+            (self.app_id, *TERMINAL_PROCESSING_STATES))]
+
+        for start in range(0, len(pending), 200):
+            chunk = pending[start:start + 200]
+            query = (self.client.query('builds')
+                     .filter('id', *chunk)
+                     .fields('builds', *INDEX_BUILD_FIELDS)
+                     .limit(len(chunk))
+                     .uncached())
+            for build in query.records(Build):
+                self._upsert_build(build)
+
+    def record_build(self, build):
+        """Keep the index current with a build (record or resource) fetched elsewhere"""
+        if isinstance(build, dict):
+            build = Build.from_resource(build)
+        with self._lock, self._db:
+            self._upsert_build(build)
+
+    def _lookup_build(self, version):
+        row = self._db.execute(
+            'SELECT id, attributes FROM builds WHERE app_id = ? AND version = ? '
+            'ORDER BY uploaded_date DESC LIMIT 1',
+            (self.app_id, str(version))).fetchone()
+        return _resource('builds', *row) if row else None
+
+    def build_by_version(self, version):
+        """Return the newest build with this build number, syncing only on a miss"""
+        with self._lock:
+            build = self._lookup_build(version)
+            state = build['attributes'].get('processingState') if build else None
+            if build is None or state not in TERMINAL_PROCESSING_STATES:
+                self.sync_builds()
+                build = self._lookup_build(version)
+            return build
+
+    def builds(self):
+        """Return every known build, newest first (syncing new uploads first)"""
+        with self._lock:
+            self.sync_builds()
+            rows = self._db.execute(
+                'SELECT id, attributes FROM builds WHERE app_id = ? '
+                'ORDER BY uploaded_date DESC', (self.app_id,)).fetchall()
+            return [_resource('builds', *row) for row in rows]
+
+    # appInfos and localizations
+
+    def _sync_app_infos(self):
+        """One compound request: appInfos with their localizations embedded"""
+        query = (self.client.query(f'apps/{self.app_id}/appInfos')
+                 .include('appInfoLocalizations')
+                 .fields('appInfoLocalizations', *LOCALIZATION_FIELDS)
+                 .limit(MAX_INCLUDED_LOCALIZATIONS, 'appInfoLocalizations'))
+        with self._db:
+            synced_at = str(time.time())
+            self._db.execute('DELETE FROM app_infos WHERE app_id = ?', (self.app_id,))
+            for document in query.documents():
+                included = included_index(document)
+                for info in document.get('data', []):
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO app_infos (id, app_id, attributes) '
+                        'VALUES (?, ?, ?)',
+                        (info['id'], self.app_id, json.dumps(info.get('attributes', {}))))
+                    if not relationship_complete(info, 'appInfoLocalizations'):
+                        # More than limit[] allows; localizations() pages through them
+                        continue
+                    self._db.execute('DELETE FROM app_info_localizations WHERE app_info_id = ?',
+                                     (info['id'],))
+                    for loc in related(info, 'appInfoLocalizations', included):
+                        self._upsert_localization(info['id'], loc)
+                    self._set_state(f"appInfoLocalizations:{info['id']}", synced_at)
+            self._set_state('appInfos', synced_at)
+
+    def app_infos(self):
+        """Return the app's appInfos resources"""
+        with self._lock:
+            if not self._is_fresh('appInfos'):
+                self._sync_app_infos()
+            rows = self._db.execute('SELECT id, attributes FROM app_infos WHERE app_id = ?',
+                                    (self.app_id,)).fetchall()
+            return [_resource('appInfos', *row) for row in rows]
+
+    def _upsert_localization(self, app_info_id, localization):
+        attributes = localization.get('attributes', {})
+        self._db.execute(
+            'DELETE FROM app_info_localizations WHERE app_info_id = ? AND locale = ? AND id != ?',
+            (app_info_id, attributes.get('locale'), localization['id']))
+        self._db.execute(
+            'INSERT OR REPLACE INTO app_info_localizations '
+            '(id, app_info_id, locale, attributes) VALUES (?, ?, ?, ?)',
+            (localization['id'], app_info_id, attributes.get('locale'), json.dumps(attributes)))
+
+    def localizations(self, app_info_id):
+        """Return the appInfoLocalizations of an appInfo"""
+        with self._lock:
+            state = f'appInfoLocalizations:{app_info_id}'
+            if not self._is_fresh(state) and not self._is_fresh('appInfos'):
+                # Usually fills this app info's localizations as a side effect
+                self._sync_app_infos()
+            if not self._is_fresh(state):
+                query = (self.client.query(f'appInfos/{app_info_id}/appInfoLocalizations')
+                         .fields('appInfoLocalizations', *LOCALIZATION_FIELDS)
+                         .limit(MAX_INCLUDED_LOCALIZATIONS))
+                with self._db:
+                    self._db.execute('DELETE FROM app_info_localizations WHERE app_info_id = ?',
+                                     (app_info_id,))
+                    for loc in query:
+                        self._upsert_localization(app_info_id, loc)
+                    self._set_state(state, str(time.time()))
+            rows = self._db.execute(
+                'SELECT id, attributes FROM app_info_localizations WHERE app_info_id = ?',
+                (app_info_id,)).fetchall()
+            return [_resource('appInfoLocalizations', *row) for row in rows]
+
+    def localization(self, app_info_id, locale):
+        """Return the localization for one locale, or None"""
+        with self._lock:
+            self.localizations(app_info_id)
+            row = self._db.execute(
+                'SELECT id, attributes FROM app_info_localizations '
+                'WHERE app_info_id = ? AND locale = ?', (app_info_id, locale)).fetchone()
+            return _resource('appInfoLocalizations', *row) if row else None
+
+    def store_localizations(self, app_info_id, localizations):
+        """Replace an appInfo's localizations with a listing fetched elsewhere"""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM app_info_localizations WHERE app_info_id = ?',
+                             (app_info_id,))
+            for loc in localizations:
+                self._upsert_localization(app_info_id, loc)
+            self._set_state(f'appInfoLocalizations:{app_info_id}', str(time.time()))
+
+    def record_localization(self, app_info_id, localization):
+        """Keep the index current after we created or patched a localization"""
+        with self._lock, self._db:
+            self._upsert_localization(app_info_id, localization)
+
+    # maintenance
+
+    def invalidate(self):
+        """Forget everything for this app; the next lookups resync from scratch"""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM builds WHERE app_id = ?', (self.app_id,))
+            info_ids = [row[0] for row in self._db.execute(
+                'SELECT id FROM app_infos WHERE app_id = ?', (self.app_id,))]
+            for info_id in info_ids:
+                self._db.execute('DELETE FROM app_info_localizations WHERE app_info_id = ?',
+                                 (info_id,))
+            self._db.execute('DELETE FROM app_infos WHERE app_id = ?', (self.app_id,))
+            self._db.execute('DELETE FROM sync_state WHERE key LIKE ?', (f"{self.app_id}:%",))
+
+    def refresh(self):
+        """Full resync of builds, appInfos and their localizations"""
+        self.invalidate()
+        builds = self.sync_builds(full=True)
+        infos = self.app_infos()
+        for info in infos:
+            self.localizations(info['id'])
+        return builds, len(infos)
+
+    def close(self):
+        self._db.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(app_id=None):
+    """Process-wide index for an app (defaults to config.APP_ID)
+
+    With ASC_REFRESH=1 the index starts out invalidated, so every lookup in
+    that run goes back to App Store Connect.
+    """
+    app_id = app_id or config.APP_ID
+    with _indexes_lock:
+        if app_id not in _indexes:
+            _indexes[app_id] = MetadataIndex(app_id=app_id)
+            if config.REFRESH:
+                _indexes[app_id].invalidate()
+        return _indexes[app_id]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync the local metadata index")
+    parser.add_argument('app_id', nargs='?', help="app id (default: config.APP_ID)")
+    parser.add_argument('--refresh', action='store_true', help="full resync instead of incremental")
+    args = parser.parse_args(argv)
+    index = MetadataIndex(app_id=args.app_id)
+    if args.refresh:
+        builds, infos = index.refresh()
+        print(f"✅ Full resync: {builds} builds, {infos} appInfos")
+    else:
+        fetched = index.sync_builds()
+        print(f"✅ Incremental sync: {fetched} new or updated builds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Release job queue and streamed subprocess runner.
+
+JobQueue runs independent release steps concurrently while honouring
+dependencies, e.g. validating the IPA while localizations are pushed, and
+only uploading once validation passed. A job whose dependency failed is
+skipped rather than run against a broken state.
+
+run_streamed() replaces subprocess.run(capture_output=True): output is
+echoed line by line as the tool prints it, progress percentages are parsed
+into events, and only the last lines are kept for error reports, so memory
+stays bounded however verbose the tool is. Each run is recorded as a
+telemetry span (spawn time, time to first output, total, exit status).
+"""
+
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .telemetry import get_recorder
+
+PROGRESS_PATTERN = re.compile(r'(\d{1,3}(?:\.\d+)?)\s?%')
+TAIL_LINES = 200
+
+
+class ProgressEvent:
+    """A progress percentage parsed from a tool's output line"""
+
+    __slots__ = ('percent', 'line')
+
+    def __init__(self, percent, line):
+        self.percent = percent
+        self.line = line
+
+    def __repr__(self):
+        return f"ProgressEvent({self.percent}%)"
+
+
+def parse_progress(line):
+    """Return a ProgressEvent for lines such as 'Uploaded 42.5%', else None"""
+    match = PROGRESS_PATTERN.search(line)
+    if match:
+        percent = float(match.group(1))
+        if 0 <= percent <= 100:
+            return ProgressEvent(percent, line)
+    return None
+
+
+class StreamResult:
+    """Exit status and the bounded tail of a streamed command"""
+
+    __slots__ = ('returncode', 'tail', 'timed_out', 'duration')
+
+    def __init__(self, returncode, tail, timed_out, duration):
+        self.returncode = returncode
+        self.tail = tail
+        self.timed_out = timed_out
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+
+def run_streamed(cmd, on_line=print, on_progress=None, timeout=None,
+                 tail_lines=TAIL_LINES, cwd=None, env=None):
+    """Run a command, streaming its combined output line by line"""
+    with get_recorder().subprocess(cmd) as span:
+        result = _run_streamed(cmd, span, on_line, on_progress, timeout, tail_lines, cwd, env)
+        span.status = 'timeout' if result.timed_out else result.returncode
+        return result
+
+
+def _run_streamed(cmd, span, on_line, on_progress, timeout, tail_lines, cwd, env):
+    started = time.monotonic()
+    tail = deque(maxlen=tail_lines)
+    timed_out = threading.Event()
+
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, bufsize=1, cwd=cwd, env=env)
+    span.add('spawn', time.monotonic() - started)
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+    try:
+        for line in process.stdout:
+            if not span.bytes_received:
+                span.add('first_output', time.monotonic() - started)
+            span.bytes_received += len(line.encode())
+            line = line.rstrip('\n')
+            tail.append(line)
+            if on_line:
+                on_line(line)
+            if on_progress:
+                event = parse_progress(line)
+                if event:
+                    on_progress(event)
+        returncode = process.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        process.stdout.close()
+
+    return StreamResult(returncode, list(tail), timed_out.is_set(),
+                        time.monotonic() - started)
+
+
+class Job:
+    __slots__ = ('name', 'func', 'depends_on', 'status', 'result', 'error', 'duration')
+
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.duration = 0.0
+
+
+class JobQueue:
+    """Runs jobs concurrently as soon as their dependencies succeeded
+
+    A job succeeds when its function returns anything but False and does
+    not raise; the return value is available as ``jobs[name].result``.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.jobs = {}
+
+    def add(self, name, func, depends_on=()):
+        for dependency in depends_on:
+            if dependency not in self.jobs:
+                raise ValueError(f"job {name!r} depends on unknown job {dependency!r}")
+        self.jobs[name] = Job(name, func, depends_on)
+        return self.jobs[name]
+
+    def _run_job(self, job):
+        started = time.monotonic()
+        try:
+            job.result = job.func()
+            job.status = 'failed' if job.result is False else 'done'
+        except Exception as e:
+            job.error = e
+            job.status = 'failed'
+        job.duration = time.monotonic() - started
+        return job
+
+    def _ready(self, job):
+        return all(self.jobs[d].status == 'done' for d in job.depends_on)
+
+    def _blocked(self, job):
+        return any(self.jobs[d].status in ('failed', 'skipped') for d in job.depends_on)
+
+    def run(self):
+        """Run everything; returns True when every job succeeded"""
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                for job in self.jobs.values():
+                    if job.status != 'pending':
+                        continue
+                    if self._blocked(job):
+                        job.status = 'skipped'
+                    elif self._ready(job):
+                        job.status = 'running'
+                        running[pool.submit(self._run_job, job)] = job
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del running[future]
+
+        return all(job.status == 'done' for job in self.jobs.values())
+
+    def summary(self):
+        icons = {'done': '✅', 'failed': '❌', 'skipped': '⏭️ ', 'pending': '⏸️ '}
+        lines = []
+        for job in self.jobs.values():
+            line = f"{icons.get(job.status, '•')} {job.name:<12} {job.duration:6.1f}s"
+            if job.error:
+                line += f"  {job.error}"
+            lines.append(line)
+        return '\n'.join(lines)
@@ -0,0 +1,297 @@
+"""
+Concurrent multi-locale App Store metadata sync.
+
+Reads one JSON file per locale from a metadata directory (see
+app-store-assets/metadata/he.json) and pushes every locale's
+appInfoLocalization and appStoreVersionLocalization in parallel on a
+bounded worker pool, so ten locales cost about as much wall time as one.
+Desired values are diffed against what Apple already has: only changed
+fields are PATCHed and unchanged resources are not written at all.
+
+Usage: python3 -m release.metadata [DIR] [--locale he] [--concurrency 8] [--dry-run]
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import config
+from .client import (AppStoreConnectError, get_client, included_index, related,
+                     relationship_complete)
+from .index import MAX_INCLUDED_LOCALIZATIONS, get_index
+
+# metadata file key -> appInfoLocalizations attribute
+APP_INFO_FIELDS = {
+    'name': 'name',
+    'subtitle': 'subtitle',
+    'privacy_policy_url': 'privacyPolicyUrl',
+    'privacy_choices_url': 'privacyChoicesUrl',
+}
+
+# metadata file key -> appStoreVersionLocalizations attribute
+VERSION_FIELDS = {
+    'description': 'description',
+    'keywords': 'keywords',
+    'marketing_url': 'marketingUrl',
+    'promotional_text': 'promotionalText',
+    'support_url': 'supportUrl',
+    'whats_new': 'whatsNew',
+}
+
+EDITABLE_VERSION_STATES = (
+    'PREPARE_FOR_SUBMISSION',
+    'DEVELOPER_REJECTED',
+    'REJECTED',
+    'METADATA_REJECTED',
+    'WAITING_FOR_REVIEW',
+    'INVALID_BINARY',
+)
+
+
+def load_locale_files(directory=None, locales=None):
+    """Return {locale: metadata dict} for every <locale>.json in the directory"""
+    directory = Path(directory or config.METADATA_DIR)
+    metadata = {}
+    for path in sorted(directory.glob('*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        locale = data.get('locale', path.stem)
+        if locales and locale not in locales:
+            continue
+        metadata[locale] = data
+    return metadata
+
+
+def _attributes(data, fields):
+    return {attr: data[key] for key, attr in fields.items() if data.get(key) is not None}
+
+
+class MetadataSync:
+    """Pushes localized metadata for one app"""
+
+    def __init__(self, app_id=None, client=None, concurrency=config.SYNC_CONCURRENCY):
+        self.app_id = app_id or config.APP_ID
+        self.client = client or get_client()
+        self.index = get_index(self.app_id)
+        self.concurrency = concurrency
+
+    def editable_version(self):
+        """The App Store version open for edits and its localizations by locale
+
+        One compound request, always sent to the API (plan() diffs against
+        it); returns (None, {}) when no version is editable.
+        """
+        relationship = 'appStoreVersionLocalizations'
+        document = (self.client.query(f'apps/{self.app_id}/appStoreVersions')
+                    .filter('appStoreState', *EDITABLE_VERSION_STATES)
+                    .fields('appStoreVersions', 'versionString', 'appStoreState', relationship)
+                    .include(relationship)
+                    .fields(relationship, 'locale', *VERSION_FIELDS.values())
+                    .limit(MAX_INCLUDED_LOCALIZATIONS, relationship)
+                    .limit(1)
+                    .uncached()
+                    .get())
+        versions = document.get('data', [])
+        if not versions:
+            return None, {}
+
+        version = versions[0]
+        if relationship_complete(version, relationship):
+            localizations = related(version, relationship, included_index(document))
+        else:
+            localizations = self.client.paginate(f"appStoreVersions/{version['id']}/{relationship}",
+                                                 cache=False)
+        return version['id'], {loc['attributes']['locale']: loc for loc in localizations}
+
+    def editable_version_id(self):
+        """Id of the App Store version currently open for edits, or None"""
+        return self.editable_version()[0]
+
+    def live_localizations(self, app_info_id):
+        """appInfoLocalizations straight from the API; the index is refreshed with them"""
+        localizations = list(self.client.paginate(
+            f"appInfos/{app_info_id}/appInfoLocalizations", params={'limit': 200}, cache=False))
+        self.index.store_localizations(app_info_id, localizations)
+        return localizations
+
+    def plan(self, metadata):
+        """Compare desired metadata with App Store Connect and return the changes
+
+        Each entry is a dict with locale, resource, action (create, update,
+        unchanged or skip) and, for writes, only the attributes that differ.
+        """
+        app_infos = self.index.app_infos()
+        if not app_infos:
+            raise RuntimeError(f"No appInfos found for app {self.app_id}")
+        app_info_id = app_infos[0]['id']
+
+        needs_version = any(_attributes(data, VERSION_FIELDS) for data in metadata.values())
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Both listings are independent, fetch them together. The diff
+            # decides which writes are sent, so it reads live state rather
+            # than the index (which may be up to INDEX_METADATA_TTL old)
+            info_future = pool.submit(self.live_localizations, app_info_id)
+            version_id, version_locs = self.editable_version() if needs_version else (None, {})
+            info_locs = {loc['attributes']['locale']: loc for loc in info_future.result()}
+
+        changes = []
+        for locale, data in metadata.items():
+            info_attrs = _attributes(data, APP_INFO_FIELDS)
+            if info_attrs:
+                changes.append(plan_change(
+                    'appInfoLocalizations', locale, info_attrs,
+                    info_locs.get(locale), ('appInfos', app_info_id)))
+
+            version_attrs = _attributes(data, VERSION_FIELDS)
+            if version_attrs and version_id:
+                changes.append(plan_change(
+                    'appStoreVersionLocalizations', locale, version_attrs,
+                    version_locs.get(locale), ('appStoreVersions', version_id)))
+            elif version_attrs:
+                changes.append({
+                    'locale': locale, 'resource': 'appStoreVersionLocalizations',
+                    'action': 'skip', 'reason': 'no App Store version is open for edits',
+                })
+        return changes
+
+    def _apply_change(self, change):
+        return apply_change(self.client, change)
+
+    def apply(self, changes):
+        """Send every create/update concurrently; unchanged resources cost nothing"""
+        writes = [change for change in changes if change['action'] in ('create', 'update')]
+        results = [dict(change, ok=True) for change in changes
+                   if change['action'] not in ('create', 'update')]
+
+        if writes:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results += list(pool.map(self._apply_change, writes))
+
+        for result in results:
+            if result.get('data') and result['resource'] == 'appInfoLocalizations':
+                self.index.record_localization(result['parent'][1], result['data'])
+        return results
+
+    def sync(self, metadata):
+        """Plan and apply {locale: metadata}; returns per-resource results"""
+        return self.apply(self.plan(metadata))
+
+
+def diff_attributes(desired, current):
+    """Return the desired attributes whose value differs from the current ones"""
+    current = current or {}
+    return {key: value for key, value in desired.items() if current.get(key) != value}
+
+
+def plan_change(resource_type, locale, desired, existing, parent):
+    change = {'locale': locale, 'resource': resource_type, 'parent': parent}
+    if existing is None:
+        change.update(action='create', attributes=desired)
+        return change
+
+    changed = diff_attributes(desired, existing.get('attributes'))
+    change.update(id=existing['id'], action='update' if changed else 'unchanged',
+                  attributes=changed)
+    return change
+
+
+def apply_change(client, change):
+    """Send the POST or PATCH for one planned change; returns it with ok/data or error"""
+    resource_type = change['resource']
+    result = dict(change)
+    try:
+        if change['action'] == 'create':
+            parent_type, parent_id = change['parent']
+            body = {
+                'data': {
+                    'type': resource_type,
+                    'attributes': dict(change['attributes'], locale=change['locale']),
+                    'relationships': {
+                        parent_type[:-1]: {'data': {'type': parent_type, 'id': parent_id}}
+                    }
+                }
+            }
+            response = client.post(resource_type, body)
+            expected = 201
+        else:
+            body = {
+                'data': {
+                    'type': resource_type,
+                    'id': change['id'],
+                    'attributes': change['attributes']
+                }
+            }
+            response = client.patch(f"{resource_type}/{change['id']}", body)
+            expected = 200
+
+        if response.status_code != expected:
+            raise AppStoreConnectError(response)
+        result['ok'] = True
+        result['data'] = response.json()['data']
+    except Exception as e:
+        result['ok'] = False
+        result['error'] = str(e)
+    return result
+
+
+def print_results(results):
+    """Print one line per resource: what was (or would be) done and which fields"""
+    for result in sorted(results, key=lambda r: (r['locale'], r['resource'])):
+        icon = {True: '✅', False: '❌', None: '📝'}[result.get('ok')]
+        line = f"{icon} {result['locale']:<8} {result['resource']:<30} {result['action']:<9}"
+        if result['action'] == 'update':
+            line += ' ' + ', '.join(sorted(result['attributes']))
+        if result.get('error') or result.get('reason'):
+            line += f" ({result.get('error') or result.get('reason')})"
+        print(line.rstrip())
+
+
+def sync_metadata(directory=None, app_id=None, locales=None,
+                  concurrency=config.SYNC_CONCURRENCY, dry_run=False):
+    """Load the locale files and push what changed; True when everything succeeded"""
+    metadata = load_locale_files(directory, locales)
+    if not metadata:
+        print(f"❌ No locale metadata files found in {directory or config.METADATA_DIR}")
+        return False
+
+    engine = MetadataSync(app_id=app_id, concurrency=concurrency)
+    changes = engine.plan(metadata)
+    if dry_run:
+        print_results(changes)
+        return True
+
+    results = engine.apply(changes)
+    print_results(results)
+    return all(result['ok'] for result in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync localized App Store metadata")
+    parser.add_argument('directory', nargs='?', default=config.METADATA_DIR)
+    parser.add_argument('--app-id', default=config.APP_ID)
+    parser.add_argument('--locale', action='append', dest='locales',
+                        help="only sync this locale (repeatable)")
+    parser.add_argument('--concurrency', type=int, default=config.SYNC_CONCURRENCY)
+    parser.add_argument('--refresh', action='store_true',
+                        help="ignore the local index and refetch from App Store Connect")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only print the create/update/unchanged plan")
+    args = parser.parse_args(argv)
+
+    if args.refresh:
+        get_index(args.app_id).invalidate()
+        if get_client().cache is not None:
+            get_client().cache.clear()
+    ok = sync_metadata(args.directory, args.app_id, args.locales, args.concurrency,
+                       dry_run=args.dry_run)
+    client = get_client()
+    print(client.scheduler.summary())
+    if client.cache is not None:
+        print(client.cache.summary())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
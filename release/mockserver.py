@@ -0,0 +1,605 @@
+"""
+Offline App Store Connect API for benchmarks and dry runs.
+
+An in-memory JSON:API server for the endpoints the release scripts use:
+builds, appInfos, appInfoLocalizations, appStoreVersions and their
+localizations, betaBuildLocalizations, and the build upload API
+(buildUploads, buildUploadFiles with uploadOperations, the chunk PUTs and
+the commit PATCH). It understands filter[], fields[], include=, limit[],
+sort and cursor pagination the way the real API does, so the scripts
+exercise the same request patterns offline.
+
+Behaviour that matters for performance is configurable:
+
+- latency (plus random jitter) added to every response;
+- the largest page size the server honours, whatever limit= asks for;
+- an hourly request budget reported in X-Rate-Limit, answered with 429
+  and Retry-After once it is spent;
+- injected failures: a random failure rate and/or the next N requests
+  matching a method and path pattern.
+
+There is one app: any app id in a path or filter[app] refers to it. Builds
+that are still PROCESSING become VALID after they have been read a few
+times, so build watchers have something to wait for. Every request is
+recorded (method, path, status, bytes, seconds) under the current step.
+
+    python3 -m release.mockserver --port 8080 --latency 0.05 --page-size 20
+    ASC_API_BASE_URL=http://127.0.0.1:8080/v1 python3 upload-to-appstore.py
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from . import config
+
+API_PREFIX = '/v1'
+UPLOAD_PREFIX = '/upload'
+# Apple's own ceiling for limit=
+MAX_LIMIT = 200
+DEFAULT_LIMIT = 50
+# Resource types the API lets clients create
+CREATABLE = frozenset({
+    'appInfoLocalizations', 'appStoreVersionLocalizations', 'betaBuildLocalizations',
+    'buildUploads', 'buildUploadFiles', 'betaTesters',
+})
+PROCESSING_STATES = ('PROCESSING',)
+# X-Rate-Limit budgets are per rolling hour
+RATE_WINDOW = 3600
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class MockAppStoreConnect:
+    """API state, behaviour knobs and request log behind one HTTP server"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 page_size=MAX_LIMIT, hourly_limit=3600,
+                 failure_rate=0.0, failure_status=503, upload_failure_rate=0.0,
+                 part_size=1024 * 1024, processing_reads=2, etags=False,
+                 builds=31, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.hourly_limit = hourly_limit
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.upload_failure_rate = upload_failure_rate
+        self.part_size = part_size
+        self.processing_reads = processing_reads
+        self.etags = etags
+        self.step = None
+        self.log = []
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._recent = collections.deque()
+        self._failures = []
+        self._next_id = 0
+        self.resources = {}
+        self.uploaded_parts = {}
+        self.seed(builds)
+
+        self.server = MockServer((host, port), _Handler)
+        self.server.api = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        """Serve on a background thread; returns the API base URL"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # state
+
+    def _new_id(self):
+        with self._lock:
+            self._next_id += 1
+            return str(6000000000 + self._next_id)
+
+    def add(self, resource_type, attributes, relationships=None, resource_id=None):
+        """Store a resource; relationships map a name to a (type, id) or a list of them"""
+        resource_id = resource_id or self._new_id()
+        resource = {
+            'type': resource_type,
+            'id': resource_id,
+            'attributes': dict(attributes),
+            'relationships': {},
+            'reads': 0,
+        }
+        for name, linkage in (relationships or {}).items():
+            resource['relationships'][name] = list(linkage) if isinstance(linkage, list) else linkage
+        self.resources[(resource_type, resource_id)] = resource
+        return resource
+
+    def link(self, parent, name, child):
+        """Append a child to a to-many relationship"""
+        parent['relationships'].setdefault(name, []).append((child['type'], child['id']))
+
+    def seed(self, builds=31):
+        """One app with `builds` builds (the newest still processing), metadata and notes"""
+        self.app = self.add('apps', {'bundleId': config.BUNDLE_ID, 'name': 'ZaZa Dance'},
+                            resource_id=config.APP_ID)
+
+        info = self.add('appInfos', {'appStoreState': 'PREPARE_FOR_SUBMISSION'})
+        self.link(self.app, 'appInfos', info)
+        for locale, name in (('en-US', 'ZaZa Dance'), ('he', 'ZaZa Dance')):
+            loc = self.add('appInfoLocalizations', {'locale': locale, 'name': name,
+                                                    'subtitle': None},
+                           {'appInfo': ('appInfos', info['id'])})
+            self.link(info, 'appInfoLocalizations', loc)
+
+        version = self.add('appStoreVersions', {'versionString': '2.0.0',
+                                                'appStoreState': 'PREPARE_FOR_SUBMISSION'})
+        self.link(self.app, 'appStoreVersions', version)
+        loc = self.add('appStoreVersionLocalizations', {'locale': 'en-US',
+                                                        'description': 'ZaZa Dance'},
+                       {'appStoreVersion': ('appStoreVersions', version['id'])})
+        self.link(version, 'appStoreVersionLocalizations', loc)
+
+        for number in range(1, builds + 1):
+            self.add_build(str(number), 'PROCESSING' if number == builds else 'VALID',
+                           uploaded=number)
+
+    def add_build(self, version, state='PROCESSING', uploaded=None):
+        if uploaded is None:
+            uploaded = sum(1 for key in self.resources if key[0] == 'builds') + 1
+        build = self.add('builds', {
+            'version': version,
+            'processingState': state,
+            'uploadedDate': time.strftime('%Y-%m-%dT%H:%M:%S-07:00',
+                                          time.gmtime(1700000000 + uploaded * 86400)),
+            'expired': False,
+            'minOsVersion': '13.0',
+            'usesNonExemptEncryption': False,
+        }, {'app': ('apps', self.app['id']), 'betaBuildLocalizations': []})
+        self.link(self.app, 'builds', build)
+        loc = self.add('betaBuildLocalizations', {'locale': 'en-US', 'whatsNew': 'Bug fixes'},
+                       {'build': ('builds', build['id'])})
+        self.link(build, 'betaBuildLocalizations', loc)
+        return build
+
+    def _read(self, resource):
+        """Count a read; processing builds finish after `processing_reads` reads"""
+        resource['reads'] += 1
+        attributes = resource['attributes']
+        if (resource['type'] == 'builds' and attributes.get('processingState') in PROCESSING_STATES
+                and resource['reads'] > self.processing_reads):
+            attributes['processingState'] = 'VALID'
+
+    # behaviour
+
+    def fail(self, method, pattern, times=1, status=503):
+        """Answer the next `times` requests matching method and path regex with `status`"""
+        with self._lock:
+            self._failures.append([method.upper(), re.compile(pattern), times, status])
+
+    def _injected_failure(self, method, path, upload):
+        with self._lock:
+            for failure in self._failures:
+                if failure[2] > 0 and failure[0] == method and failure[1].search(path):
+                    failure[2] -= 1
+                    return failure[3]
+            rate = self.upload_failure_rate if upload else self.failure_rate
+            if rate and self._random.random() < rate:
+                return self.failure_status
+        return None
+
+    def _spend_budget(self):
+        """Count a request against the rate window; returns (remaining, retry_after)"""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= RATE_WINDOW:
+                self._recent.popleft()
+            if len(self._recent) >= self.hourly_limit:
+                return 0, max(1, math.ceil(RATE_WINDOW - (now - self._recent[0])))
+            self._recent.append(now)
+            return self.hourly_limit - len(self._recent), None
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def record(self, method, path, status, bytes_in, bytes_out, seconds):
+        with self._lock:
+            self.log.append({'step': self.step, 'method': method, 'path': path,
+                             'status': status, 'bytes_in': bytes_in,
+                             'bytes_out': bytes_out, 'seconds': seconds})
+
+    def requests_for(self, step):
+        with self._lock:
+            return [entry for entry in self.log if entry['step'] == step]
+
+    # JSON:API
+
+    def _resolve(self, resource_type, resource_id):
+        if resource_type == 'apps':
+            return self.app
+        return self.resources.get((resource_type, resource_id))
+
+    def _serialize(self, resource, query, include=()):
+        fields = query.get(f"fields[{resource['type']}]")
+        wanted = set(fields.split(',')) if fields else None
+        self._read(resource)
+        url = f"{self.base_url}/{resource['type']}/{resource['id']}"
+        document = {
+            'type': resource['type'],
+            'id': resource['id'],
+            'attributes': {key: value for key, value in resource['attributes'].items()
+                           if wanted is None or key in wanted},
+            'links': {'self': url},
+        }
+        relationships = {}
+        for name, linkage in resource['relationships'].items():
+            if wanted is not None and name not in wanted:
+                continue
+            relationship = {'links': {'related': f"{url}/{name}"}}
+            if name in include:
+                if isinstance(linkage, list):
+                    limit = int(query.get(f'limit[{name}]', DEFAULT_LIMIT))
+                    relationship['data'] = [{'type': t, 'id': i} for t, i in linkage[:limit]]
+                    relationship['meta'] = {'paging': {'total': len(linkage), 'limit': limit}}
+                else:
+                    relationship['data'] = {'type': linkage[0], 'id': linkage[1]}
+            relationships[name] = relationship
+        if relationships:
+            document['relationships'] = relationships
+        return document
+
+    def _included(self, resources, query, include):
+        included, seen = [], set()
+        for resource in resources:
+            for name in include:
+                linkage = resource['relationships'].get(name)
+                if linkage is None:
+                    continue
+                if not isinstance(linkage, list):
+                    linkage = [linkage]
+                limit = int(query.get(f'limit[{name}]', DEFAULT_LIMIT))
+                for key in linkage[:limit]:
+                    if key not in seen and key in self.resources:
+                        seen.add(key)
+                        included.append(self._serialize(self.resources[key], query))
+        return included
+
+    def _matches(self, resource, query):
+        for key, values in query.items():
+            if not key.startswith('filter['):
+                continue
+            name = key[7:-1]
+            values = values.split(',')
+            if name == 'id':
+                if resource['id'] not in values:
+                    return False
+            elif name in resource['relationships'] or name in ('app', 'apps'):
+                continue
+            elif str(resource['attributes'].get(name)) not in values:
+                return False
+        return True
+
+    def list_document(self, path, resources, query):
+        """Filtered, sorted, paged collection document with included resources"""
+        resources = [r for r in resources if self._matches(r, query)]
+        for key in reversed((query.get('sort') or '').split(',')):
+            if key:
+                name = key.lstrip('-')
+                resources.sort(key=lambda r: str(r['attributes'].get(name) or ''),
+                               reverse=key.startswith('-'))
+
+        limit = min(int(query.get('limit', DEFAULT_LIMIT)), MAX_LIMIT, self.page_size)
+        offset = int(query.get('cursor', 0))
+        page = resources[offset:offset + limit]
+        include = tuple(name for name in (query.get('include') or '').split(',') if name)
+
+        document = {
+            'data': [self._serialize(r, query, include) for r in page],
+            'links': {'self': f"{self.base_url}{path}?{urlencode(query)}"},
+            'meta': {'paging': {'total': len(resources), 'limit': limit}},
+        }
+        if include:
+            document['included'] = self._included(page, query, include)
+        if offset + limit < len(resources):
+            document['links']['next'] = (f"{self.base_url}{path}?"
+                                         f"{urlencode(dict(query, cursor=offset + limit))}")
+        return document
+
+    def handle(self, method, path, query, body):
+        """Route one API request; returns (status, document or None)"""
+        segments = [s for s in path.split('/') if s]
+        with self._lock:
+            if method == 'GET':
+                return self._get(path, segments, query)
+            if method == 'POST' and len(segments) == 1:
+                return self._create(segments[0], body)
+            if method == 'PATCH' and len(segments) == 2:
+                return self._update(segments[0], segments[1], body)
+            if method in ('POST', 'DELETE') and len(segments) == 4 and segments[2] == 'relationships':
+                if self._resolve(segments[0], segments[1]) is None:
+                    return _error(404, 'NOT_FOUND', f"{segments[0]} {segments[1]} not found")
+                return 204, None
+        return _error(405, 'METHOD_NOT_ALLOWED', f"{method} {path} is not supported")
+
+    def _get(self, path, segments, query):
+        if len(segments) == 1:
+            resources = [r for key, r in self.resources.items() if key[0] == segments[0]]
+            return 200, self.list_document(path, resources, query)
+        parent = self._resolve(segments[0], segments[1])
+        if parent is None:
+            return _error(404, 'NOT_FOUND', f"{segments[0]} {segments[1]} not found")
+        if len(segments) == 2:
+            include = tuple(n for n in (query.get('include') or '').split(',') if n)
+            document = {'data': self._serialize(parent, query, include),
+                        'links': {'self': f"{self.base_url}{path}"}}
+            if include:
+                document['included'] = self._included([parent], query, include)
+            return 200, document
+        linkage = parent['relationships'].get(segments[2])
+        if linkage is None:
+            return _error(404, 'NOT_FOUND', f"no relationship {segments[2]}")
+        if not isinstance(linkage, list):
+            return 200, {'data': self._serialize(self.resources[linkage], query)}
+        return 200, self.list_document(path, [self.resources[key] for key in linkage], query)
+
+    def _create(self, resource_type, body):
+        data = (body or {}).get('data') or {}
+        if resource_type not in CREATABLE or data.get('type') != resource_type:
+            return _error(403, 'FORBIDDEN_ERROR',
+                          f"The resource '{resource_type}' does not allow 'CREATE'")
+        attributes = data.get('attributes') or {}
+
+        parents = []
+        relationships = {}
+        for name, relationship in (data.get('relationships') or {}).items():
+            linkage = relationship.get('data')
+            items = linkage if isinstance(linkage, list) else [linkage]
+            for item in items:
+                parent = self._resolve(item['type'], item['id'])
+                if parent is None:
+                    return _error(404, 'NOT_FOUND', f"{item['type']} {item['id']} not found")
+                parents.append(parent)
+            relationships[name] = ([(i['type'], i['id']) for i in items]
+                                   if isinstance(linkage, list) else (linkage['type'], linkage['id']))
+
+        for parent in parents:
+            siblings = parent['relationships'].get(resource_type) or []
+            if attributes.get('locale') and any(
+                    self.resources[key]['attributes'].get('locale') == attributes['locale']
+                    for key in siblings):
+                return _error(409, 'ENTITY_ERROR.DUPLICATE',
+                              f"{resource_type} for locale {attributes['locale']} already exists")
+
+        if resource_type == 'buildUploadFiles':
+            attributes = dict(attributes, assetDeliveryState={'state': 'AWAITING_UPLOAD'})
+        resource = self.add(resource_type, attributes, relationships)
+        for parent in parents:
+            self.link(parent, resource_type, resource)
+        if resource_type == 'buildUploadFiles':
+            resource['attributes']['uploadOperations'] = self._upload_operations(resource)
+        return 201, {'data': self._serialize(resource, {})}
+
+    def _upload_operations(self, upload_file):
+        size = int(upload_file['attributes'].get('fileSize') or 0)
+        base = self.base_url[:-len(API_PREFIX)]
+        return [{
+            'method': 'PUT',
+            'url': f"{base}{UPLOAD_PREFIX}/{upload_file['id']}/{part}",
+            'offset': offset,
+            'length': min(self.part_size, size - offset),
+            'requestHeaders': [{'name': 'Content-Type', 'value': 'application/octet-stream'}],
+        } for part, offset in enumerate(range(0, size, self.part_size))]
+
+    def _update(self, resource_type, resource_id, body):
+        resource = self._resolve(resource_type, resource_id)
+        if resource is None:
+            return _error(404, 'NOT_FOUND', f"{resource_type} {resource_id} not found")
+        attributes = ((body or {}).get('data') or {}).get('attributes') or {}
+        if resource_type == 'buildUploadFiles' and attributes.get('uploaded'):
+            error = self._commit_upload(resource)
+            if error:
+                return error
+        resource['attributes'].update(attributes)
+        return 200, {'data': self._serialize(resource, {})}
+
+    def _commit_upload(self, upload_file):
+        """All parts must be in; the build shows up as PROCESSING"""
+        operations = upload_file['attributes'].get('uploadOperations') or []
+        parts = self.uploaded_parts.get(upload_file['id'], set())
+        if len(parts) < len(operations):
+            return _error(409, 'ENTITY_ERROR', f"{len(operations) - len(parts)} parts missing")
+        upload_file['attributes']['assetDeliveryState'] = {'state': 'COMPLETE'}
+        upload = self.resources[upload_file['relationships']['buildUpload']]
+        self.add_build(upload['attributes'].get('cfBundleVersion'))
+        return None
+
+    def receive_part(self, file_id, part, length):
+        with self._lock:
+            upload_file = self.resources.get(('buildUploadFiles', file_id))
+            operations = upload_file['attributes'].get('uploadOperations') if upload_file else None
+            if not operations or part >= len(operations):
+                return 404
+            if operations[part]['length'] != length:
+                return 400
+            self.uploaded_parts.setdefault(file_id, set()).add(part)
+            return 200
+
+
+def _error(status, code, detail):
+    return status, {'errors': [{'status': str(status), 'code': code,
+                                'title': code.replace('_', ' ').title(), 'detail': detail}]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without TCP_NODELAY a keep-alive
+    # client waits for a delayed ACK between them
+    disable_nagle_algorithm = True
+
+    def _respond(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        started = time.perf_counter()
+        api = self.server.api
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        parts = urlsplit(self.path)
+        upload = parts.path.startswith(UPLOAD_PREFIX + '/')
+
+        status, body, headers = self._answer(api, method, parts, raw, upload)
+        api._delay()
+        self._respond(status, body, headers)
+        api.record(method, parts.path, status, len(raw), len(body),
+                   time.perf_counter() - started)
+
+    def _answer(self, api, method, parts, raw, upload):
+        headers = {}
+        if not upload:
+            remaining, retry_after = api._spend_budget()
+            headers['X-Rate-Limit'] = f"user-hour-lim:{api.hourly_limit};user-hour-rem:{remaining};"
+            if retry_after:
+                headers['Retry-After'] = str(retry_after)
+                return self._document(*_error(429, 'RATE_LIMIT_EXCEEDED',
+                                              "The request rate limit has been reached."), headers)
+
+        failure = api._injected_failure(method, parts.path, upload)
+        if failure:
+            return self._document(*_error(failure, 'INJECTED_FAILURE', "injected by the mock"),
+                                  headers)
+
+        if upload:
+            segments = parts.path[len(UPLOAD_PREFIX):].strip('/').split('/')
+            if method != 'PUT' or len(segments) != 2 or not segments[1].isdigit():
+                return 404, b'', headers
+            return api.receive_part(segments[0], int(segments[1]), len(raw)), b'', headers
+
+        if not parts.path.startswith(API_PREFIX + '/'):
+            return self._document(*_error(404, 'NOT_FOUND', parts.path), headers)
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._document(*_error(401, 'NOT_AUTHORIZED', "missing bearer token"), headers)
+
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            return self._document(*_error(400, 'PARAMETER_ERROR.INVALID', "invalid JSON"), headers)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        status, document = api.handle(method, parts.path[len(API_PREFIX):], query, payload)
+
+        if status == 200 and method == 'GET' and api.etags:
+            body = json.dumps(document).encode()
+            etag = '"' + hashlib.md5(body).hexdigest()[:16] + '"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                return 304, b'', headers
+            return status, body, headers
+        return self._document(status, document, headers)
+
+    @staticmethod
+    def _document(status, document, headers):
+        return status, json.dumps(document).encode() if document is not None else b'', headers
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def add_arguments(parser):
+    """Command-line knobs shared with release.bench_flows"""
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds, up to this")
+    parser.add_argument('--page-size', type=int, default=MAX_LIMIT,
+                        help="largest page the server returns, whatever limit= asks for")
+    parser.add_argument('--hourly-limit', type=int, default=3600,
+                        help="requests per rolling hour before 429s")
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help="fraction of API requests answered with --failure-status")
+    parser.add_argument('--failure-status', type=int, default=503)
+    parser.add_argument('--upload-failure-rate', type=float, default=0.0,
+                        help="fraction of chunk PUTs that fail")
+    parser.add_argument('--part-size', type=int, default=1024 * 1024,
+                        help="bytes per upload operation")
+    parser.add_argument('--etags', action='store_true', help="send ETags and answer 304s")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def from_arguments(args, **overrides):
+    """MockAppStoreConnect configured from add_arguments() options"""
+    options = dict(latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+                   hourly_limit=args.hourly_limit,
+                   failure_rate=args.failure_rate, failure_status=args.failure_status,
+                   upload_failure_rate=args.upload_failure_rate, part_size=args.part_size,
+                   etags=args.etags, seed=args.seed)
+    options.update(overrides)
+    return MockAppStoreConnect(**options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an offline App Store Connect API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    api = from_arguments(args, host=args.host, port=args.port)
+    print(f"🧪 Mock App Store Connect on {api.base_url}")
+    print(f"   ASC_API_BASE_URL={api.base_url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+        print(f"📊 {len(api.log)} requests served")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""
+Localized TestFlight release notes.
+
+The "What to Test" text lives in betaBuildLocalizations (one per locale),
+not in a build attribute. Notes for a build are kept in one source file,
+app-store-assets/release-notes/<build number>.json, as {locale: text}.
+Given only the build number, one request finds the build together with
+its existing betaBuildLocalizations (include=), the notes are diffed the
+same way as the App Store metadata, and every locale that changed is
+created or updated concurrently.
+
+Usage: python3 -m release.notes 31 [--file notes.json] [--locale he] [--dry-run]
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import config
+from .builds import builds_query
+from .client import (AppStoreConnectError, get_client, included_index, related,
+                     relationship_complete)
+from .metadata import apply_change, plan_change, print_results
+
+RESOURCE = 'betaBuildLocalizations'
+
+
+def load_release_notes(version=None, path=None, locales=None):
+    """Return {locale: text} from the build's notes file (or an explicit one)"""
+    path = Path(path or config.RELEASE_NOTES_DIR / f"{version}.json")
+    with open(path, 'r', encoding='utf-8') as f:
+        notes = json.load(f)
+    return {locale: text.strip() for locale, text in notes.items()
+            if text and (not locales or locale in locales)}
+
+
+class ReleaseNotesSync:
+    """Pushes per-locale What to Test notes for one build"""
+
+    def __init__(self, app_id=None, client=None, concurrency=config.SYNC_CONCURRENCY):
+        self.app_id = app_id or config.APP_ID
+        self.client = client or get_client()
+        self.concurrency = concurrency
+
+    def build_with_localizations(self, version):
+        """(build id, {locale: betaBuildLocalization}) in one request, or (None, {})"""
+        document = (builds_query(self.app_id, ('version', RESOURCE), versions=[version],
+                                 limit=1, client=self.client)
+                    .include(RESOURCE)
+                    .fields(RESOURCE, 'locale', 'whatsNew')
+                    .limit(50, RESOURCE)
+                    .get())
+        builds = document.get('data', [])
+        if not builds:
+            return None, {}
+        build = builds[0]
+        if relationship_complete(build, RESOURCE):
+            localizations = related(build, RESOURCE, included_index(document))
+        else:
+            # A truncated linkage would make a missing locale look new and
+            # POST a duplicate, so list them all
+            localizations = self.client.paginate(f"builds/{build['id']}/{RESOURCE}",
+                                                 params={'limit': 200}, cache=False)
+        return build['id'], {loc['attributes']['locale']: loc for loc in localizations}
+
+    def plan(self, version, notes):
+        """Create/update/unchanged change per locale (see metadata.MetadataSync.plan)"""
+        build_id, existing = self.build_with_localizations(version)
+        if build_id is None:
+            raise LookupError(f"Build {version} not found")
+        return [plan_change(RESOURCE, locale, {'whatsNew': text}, existing.get(locale),
+                            ('builds', build_id))
+                for locale, text in sorted(notes.items())]
+
+    def apply(self, changes):
+        """Send every create/update concurrently"""
+        writes = [change for change in changes if change['action'] in ('create', 'update')]
+        results = [dict(change, ok=True) for change in changes
+                   if change['action'] not in ('create', 'update')]
+        if writes:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results += list(pool.map(lambda change: apply_change(self.client, change), writes))
+        return results
+
+
+def push_release_notes(version, path=None, app_id=None, locales=None, dry_run=False):
+    """Load the notes for a build and push what changed; True when all succeeded"""
+    try:
+        notes = load_release_notes(version, path, locales)
+    except (OSError, ValueError) as e:
+        print(f"❌ לא נמצאו הערות שחרור לבילד {version}: {e}")
+        return False
+
+    sync = ReleaseNotesSync(app_id=app_id)
+    try:
+        changes = sync.plan(version, notes)
+    except (AppStoreConnectError, LookupError) as e:
+        print(f"❌ {e}")
+        return False
+
+    if dry_run:
+        print_results(changes)
+        return True
+
+    results = sync.apply(changes)
+    print_results(results)
+    return all(result['ok'] for result in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push localized TestFlight release notes")
+    parser.add_argument('version', help="build number")
+    parser.add_argument('--file', help="notes file (default: release-notes/<version>.json)")
+    parser.add_argument('--app-id', default=config.APP_ID)
+    parser.add_argument('--locale', action='append', dest='locales',
+                        help="only push this locale (repeatable)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only print the create/update/unchanged plan")
+    args = parser.parse_args(argv)
+
+    ok = push_release_notes(args.version, args.file, args.app_id, args.locales, args.dry_run)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""
+Checkpointed, idempotent release pipeline.
+
+Every step's inputs (plus the results of the steps it depends on) are
+fingerprinted and recorded in a per-release journal under
+ASC_CACHE_DIR/journal once the step succeeds. On a re-run a step is
+skipped when its inputs are unchanged and, if the step has a confirm()
+check, its effect is still visible (e.g. the build exists in App Store
+Connect); the run resumes at the first incomplete step. Steps run on a
+JobQueue, so independent ones still execute concurrently.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import config
+from .jobs import JobQueue
+
+
+def digest(value):
+    """Stable SHA-256 of any JSON-serialisable value"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def file_digest(*paths):
+    """Digest of the contents of files (missing files hash as None)"""
+    digests = {}
+    for path in paths:
+        try:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    sha256.update(block)
+            digests[str(path)] = sha256.hexdigest()
+        except FileNotFoundError:
+            digests[str(path)] = None
+    return digests
+
+
+class StepJournal:
+    """Persisted record of completed steps for one release"""
+
+    def __init__(self, key, journal_dir=None):
+        safe_key = ''.join(c if c.isalnum() or c in '.+-_' else '_' for c in str(key))
+        self.path = Path(journal_dir or config.JOURNAL_DIR) / f"{safe_key}.json"
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, step):
+        with self._lock:
+            return self.entries.get(step)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def record(self, step, inputs, result):
+        with self._lock:
+            self.entries[step] = {
+                'inputs': inputs,
+                'result': json.loads(json.dumps(result, default=str)),
+                'completed_at': int(time.time()),
+            }
+            self._save()
+
+    def forget(self, step):
+        with self._lock:
+            if self.entries.pop(step, None) is not None:
+                self._save()
+
+
+class Pipeline:
+    """Named steps with dependencies, inputs and optional effect confirmation"""
+
+    def __init__(self, key, journal_dir=None, max_workers=4, force=False):
+        self.journal = StepJournal(key, journal_dir)
+        self.queue = JobQueue(max_workers=max_workers)
+        self.force = force
+        self.skipped = []
+
+    def step(self, name, func, inputs=None, confirm=None, depends_on=(), checkpoint=True):
+        """Add a step
+
+        inputs:     value or zero-argument callable describing what the step
+                    consumes (file digests, versions, ...)
+        confirm:    optional callable(previous_result) -> bool checking that
+                    the recorded effect still holds before skipping
+        checkpoint: False for cheap steps whose result depends on state the
+                    inputs cannot describe; they run every time and are
+                    never journaled
+        """
+        if not checkpoint:
+            self.queue.add(name, func, depends_on)
+            return
+
+        def checkpointed():
+            upstream = {d: self.queue.jobs[d].result for d in depends_on}
+            current = digest({
+                'inputs': inputs() if callable(inputs) else inputs,
+                'upstream': upstream,
+            })
+
+            entry = None if self.force else self.journal.get(name)
+            if entry and entry['inputs'] == current:
+                if confirm is None or confirm(entry['result']):
+                    print(f"⏭️  {name}: כבר הושלם, מדלג")
+                    self.skipped.append(name)
+                    return entry['result']
+
+            # Until it succeeds again the step is no longer complete
+            self.journal.forget(name)
+            result = func()
+            if result is not False:
+                self.journal.record(name, current, result)
+            return result
+
+        self.queue.add(name, checkpointed, depends_on)
+
+    def result(self, name):
+        return self.queue.jobs[name].result
+
+    def run(self):
+        ok = self.queue.run()
+        print(self.queue.summary())
+        return ok
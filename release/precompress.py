@@ -0,0 +1,243 @@
+"""
+Precompressed .br and .gz siblings for a web publish directory.
+
+For hosts that serve a precompressed sibling in place of the original
+(nginx gzip_static/brotli_static, a CDN or an edge function negotiating
+Accept-Encoding), this writes a maximum-level brotli (quality 11, 16 MB
+window) and gzip (level 9) copy next to every compressible file, so the
+smallest encoding can be served as is instead of being compressed on the
+fly at a low level:
+
+- every (file, encoding) pair is compressed in its own worker process, so
+  the large files do not wait for each other;
+- compressed outputs are cached by the SHA-256 of the content under
+  PRECOMPRESS_CACHE_DIR, and files that did not change since the last
+  deploy are never recompressed;
+- outputs that save less than MIN_SAVING are not written;
+- the siblings written are recorded per directory in the cache directory,
+  and the ones a run does not write again (the original was deleted, shrank
+  below --min-size, ...) are removed. .gz/.br files the tool did not write,
+  e.g. compressed assets shipped on purpose, are never touched;
+- a per-file size report (original, gzip, brotli) is printed.
+
+It is opt-in and not part of build_for_netlify.sh: Netlify compresses
+responses itself and never serves foo.js.br for a request of foo.js, so
+there the siblings would only add build time and deploy size.
+
+brotli is optional (pip install brotli); without it only .gz files are
+written.
+
+Usage: python3 -m release.precompress build [--jobs 8] [--min-size 1024]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from . import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = frozenset({
+    '.js', '.mjs', '.wasm', '.html', '.css', '.json', '.webmanifest', '.svg', '.txt',
+    '.xml', '.map', '.symbols', '.frag', '.bin', '.otf', '.ttf', '.eot', '.ico',
+})
+COMPRESSIBLE_NAMES = frozenset({'NOTICES'})
+# Sibling suffix and cache key suffix (encoding + level) per encoding
+ENCODINGS = {
+    'br': ('.br', '.br11'),
+    'gzip': ('.gz', '.gz9'),
+}
+PRECOMPRESSED_SUFFIXES = tuple(suffix for suffix, _ in ENCODINGS.values())
+# An encoding is only kept when it is at least this much smaller
+MIN_SAVING = 0.05
+# {directory: [siblings written by the last run]}, under the cache directory
+OUTPUTS_FILE = 'outputs.json'
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11, lgwin=24)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compressible(path, min_size):
+    return ((path.suffix in COMPRESSIBLE_SUFFIXES or path.name in COMPRESSIBLE_NAMES)
+            and path.stat().st_size >= min_size)
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress_file(task):
+    """Worker: (path, encoding, cache_dir) -> (path, encoding, compressed size or None, cached)"""
+    path, encoding, cache_dir = task
+    sibling_suffix, cache_suffix = ENCODINGS[encoding]
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    digest = hashlib.sha256(data).hexdigest()
+    entry = cache_dir / digest[:2] / f"{digest}{cache_suffix}"
+    try:
+        with open(entry, 'rb') as f:
+            compressed = f.read()
+        os.utime(entry)
+        cached = True
+    except OSError:
+        compressed = compress(data, encoding)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(entry, compressed)
+        cached = False
+
+    sibling = path.with_name(path.name + sibling_suffix)
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        return path, encoding, None, cached
+    _write_atomic(sibling, compressed)
+    # Same mtime as the original, so the sibling never looks stale
+    stat = os.stat(path)
+    os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return path, encoding, len(compressed), cached
+
+
+def find_files(directory, min_size):
+    """Compressible files under a directory"""
+    files = []
+    for current, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = Path(current, filename)
+            if not filename.endswith(PRECOMPRESSED_SUFFIXES) and compressible(path, min_size):
+                files.append(path)
+    return files
+
+
+def load_outputs(cache_dir, directory):
+    """Siblings (relative paths) the last run wrote under a directory"""
+    try:
+        with open(cache_dir / OUTPUTS_FILE, 'r') as f:
+            return set(json.load(f).get(str(directory.resolve()), []))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_outputs(cache_dir, directory, outputs):
+    path = cache_dir / OUTPUTS_FILE
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data[str(directory.resolve())] = sorted(outputs)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, json.dumps(data, indent=1).encode())
+
+
+def prune_cache(cache_dir, max_bytes):
+    """Drop the least recently used cache entries beyond max_bytes"""
+    entries = [entry for entry in cache_dir.glob('*/*') if '.tmp-' not in entry.name]
+    entries = sorted(((entry.stat(), entry) for entry in entries),
+                     key=lambda item: item[0].st_mtime, reverse=True)
+    total = 0
+    for stat, entry in entries:
+        total += stat.st_size
+        if total > max_bytes:
+            entry.unlink(missing_ok=True)
+
+
+def precompress(directory, cache_dir=None, encodings=None, jobs=None, min_size=1024):
+    """Compress every compressible file; returns {path: {'size', 'br', 'gzip'}} and stats"""
+    directory = Path(directory)
+    cache_dir = Path(cache_dir or config.PRECOMPRESS_CACHE_DIR)
+    encodings = encodings or [encoding for encoding in ENCODINGS
+                              if encoding != 'br' or brotli is not None]
+    previous = load_outputs(cache_dir, directory)
+    files = find_files(directory, min_size)
+
+    report = {path: {'size': path.stat().st_size} for path in files}
+    # Largest first, so the slowest brotli runs start right away
+    tasks = sorted(((path, encoding, cache_dir) for path in files for encoding in encodings),
+                   key=lambda task: report[task[0]]['size'], reverse=True)
+    stats = {'compressed': 0, 'cached': 0, 'removed': 0}
+    written = set()
+    if tasks:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for path, encoding, size, cached in pool.map(_compress_file, tasks):
+                report[path][encoding] = size
+                stats['cached' if cached else 'compressed'] += 1
+                if size is not None:
+                    sibling = path.with_name(path.name + ENCODINGS[encoding][0])
+                    written.add(sibling.relative_to(directory).as_posix())
+
+    # Only siblings written by an earlier run are ever removed
+    for stale in sorted(previous - written):
+        if (directory / stale).is_file():
+            (directory / stale).unlink()
+            stats['removed'] += 1
+    save_outputs(cache_dir, directory, written)
+    prune_cache(cache_dir, config.PRECOMPRESS_CACHE_MAX_BYTES)
+    return report, stats
+
+
+def _size(value):
+    if value is None:
+        return '-'
+    if value >= 1024 * 1024:
+        return f"{value / (1024 * 1024):.2f} MB"
+    return f"{value / 1024:.1f} KB"
+
+
+def print_report(directory, report):
+    print(f"{'file':<56} {'original':>10} {'gzip':>10} {'brotli':>10} {'best':>10} {'saved':>6}")
+    total_size = total_best = 0
+    for path, sizes in sorted(report.items(), key=lambda item: item[1]['size'], reverse=True):
+        best = min([sizes[encoding] for encoding in ENCODINGS if sizes.get(encoding)]
+                   + [sizes['size']])
+        total_size += sizes['size']
+        total_best += best
+        name = str(path.relative_to(directory))
+        print(f"{name[-56:]:<56} {_size(sizes['size']):>10} {_size(sizes.get('gzip')):>10} "
+              f"{_size(sizes.get('br')):>10} {_size(best):>10} {1 - best / sizes['size']:>6.0%}")
+    if total_size:
+        print(f"{'total':<56} {_size(total_size):>10} {'':>10} {'':>10} {_size(total_best):>10} "
+              f"{1 - total_best / total_size:>6.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write precompressed .br/.gz siblings")
+    parser.add_argument('directory', type=Path, help="publish directory, e.g. build")
+    parser.add_argument('--jobs', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--min-size', type=int, default=1024,
+                        help="leave files smaller than this many bytes alone")
+    parser.add_argument('--quiet', action='store_true', help="no per-file report")
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        print(f"❌ {args.directory} is not a directory")
+        return 1
+    if brotli is None:
+        print("⚠️  brotli is not installed (pip install brotli), writing .gz files only")
+
+    started = time.monotonic()
+    report, stats = precompress(args.directory, jobs=args.jobs, min_size=args.min_size)
+    if not args.quiet:
+        print_report(args.directory, report)
+    print(f"🗜️  {len(report)} files: {stats['compressed']} compressed, {stats['cached']} "
+          f"from the cache, {stats['removed']} stale siblings removed "
+          f"({time.monotonic() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
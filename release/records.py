@@ -0,0 +1,99 @@
+"""
+Compact typed records for App Store Connect resources.
+
+List responses used to be kept as the decoded JSON: a dict per resource
+with a nested attributes dict (every attribute the API sent), plus the
+links, relationships and included objects around them. Records keep the id
+and the requested attributes in ``__slots__`` and nothing else, and
+``decode()`` turns pages into records one page at a time, so a listing of
+thousands of builds or testers holds one page of JSON at most.
+
+    for build in client.query('builds').filter('app', app_id).records(Build):
+        print(build.version, build.processing_state)
+"""
+
+
+class Record:
+    """Base class: `FIELDS` maps API attribute names to slot names"""
+
+    __slots__ = ('id',)
+    resource_type = None
+    FIELDS = {}
+
+    def __init__(self, id, **values):
+        self.id = id
+        for slot in self.FIELDS.values():
+            setattr(self, slot, values.get(slot))
+
+    @classmethod
+    def from_resource(cls, resource):
+        """Build a record from a JSON:API resource object"""
+        record = cls.__new__(cls)
+        record.id = resource['id']
+        attributes = resource.get('attributes') or {}
+        for attribute, slot in cls.FIELDS.items():
+            setattr(record, slot, attributes.get(attribute))
+        return record
+
+    def attributes(self):
+        """The record's attributes under their API names"""
+        return {attribute: getattr(self, slot) for attribute, slot in self.FIELDS.items()}
+
+    def as_resource(self):
+        """Back to a JSON:API resource dict, for code that still expects one"""
+        return {'type': self.resource_type, 'id': self.id, 'attributes': self.attributes()}
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and self.id == other.id
+                and self.attributes() == other.attributes())
+
+    def __repr__(self):
+        values = ', '.join(f"{slot}={getattr(self, slot)!r}" for slot in self.FIELDS.values())
+        return f"{type(self).__name__}(id={self.id!r}, {values})"
+
+
+class Build(Record):
+    __slots__ = ('version', 'processing_state', 'uploaded_date', 'expired',
+                 'min_os_version', 'uses_non_exempt_encryption')
+    resource_type = 'builds'
+    FIELDS = {
+        'version': 'version',
+        'processingState': 'processing_state',
+        'uploadedDate': 'uploaded_date',
+        'expired': 'expired',
+        'minOsVersion': 'min_os_version',
+        'usesNonExemptEncryption': 'uses_non_exempt_encryption',
+    }
+
+
+class BetaGroup(Record):
+    __slots__ = ('name', 'is_internal_group', 'public_link_enabled')
+    resource_type = 'betaGroups'
+    FIELDS = {
+        'name': 'name',
+        'isInternalGroup': 'is_internal_group',
+        'publicLinkEnabled': 'public_link_enabled',
+    }
+
+
+class BetaTester(Record):
+    __slots__ = ('email', 'first_name', 'last_name', 'invite_type', 'state')
+    resource_type = 'betaTesters'
+    FIELDS = {
+        'email': 'email',
+        'firstName': 'first_name',
+        'lastName': 'last_name',
+        'inviteType': 'invite_type',
+        'state': 'state',
+    }
+
+
+def decode(documents, record_type):
+    """Yield records from an iterable of list documents, one page at a time"""
+    for document in documents:
+        data = document.get('data', [])
+        if isinstance(data, dict):
+            data = [data]
+        for resource in data:
+            if resource.get('type') in (None, record_type.resource_type):
+                yield record_type.from_resource(resource)
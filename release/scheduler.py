@@ -0,0 +1,151 @@
+"""
+Rate-limit-aware request scheduling for the App Store Connect API.
+
+Apple reports the hourly budget on every response in a header such as
+``X-Rate-Limit: user-hour-lim:3600;user-hour-rem:3412;``. The scheduler
+keeps a token bucket in step with that budget: requests go out at full
+speed while budget remains and are paced at limit/3600 per second once it
+runs low, instead of running into 429s halfway through a release.
+429 and 5xx answers are retried with jittered exponential backoff.
+"""
+
+import random
+import threading
+import time
+
+from . import config
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Methods that are safe to resend after a 5xx or a dropped connection;
+# a POST may already have created the resource, so it is only retried on 429
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PATCH', 'PUT', 'DELETE', 'OPTIONS')
+
+
+def parse_rate_limit(header):
+    """Parse an X-Rate-Limit header into a dict such as {'user-hour-lim': 3600}"""
+    values = {}
+    for part in (header or '').split(';'):
+        key, _, value = part.strip().partition(':')
+        if key and value.strip().isdigit():
+            values[key] = int(value)
+    return values
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_level(self, tokens):
+        """Align the bucket with a budget reported by the server"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, tokens)
+
+
+class RequestScheduler:
+    """Paces requests against the hourly budget and decides on retries"""
+
+    def __init__(self, hourly_limit=config.DEFAULT_HOURLY_LIMIT,
+                 max_retries=config.MAX_RETRIES,
+                 backoff_base=config.BACKOFF_BASE,
+                 backoff_max=config.BACKOFF_MAX):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(hourly_limit / 3600.0, hourly_limit)
+        self.limit = hourly_limit
+        self.remaining = None
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the budget allows another request"""
+        waited = self.bucket.acquire()
+        with self._lock:
+            self.requests += 1
+            self.waited += waited
+
+    def observe(self, response):
+        """Update the budget from a response's X-Rate-Limit header"""
+        limits = parse_rate_limit(response.headers.get('X-Rate-Limit'))
+        with self._lock:
+            if response.status_code == 429:
+                self.throttled += 1
+            if 'user-hour-lim' in limits and limits['user-hour-lim'] != self.limit:
+                self.limit = limits['user-hour-lim']
+                self.bucket.capacity = self.limit
+                self.bucket.rate = self.limit / 3600.0
+            if 'user-hour-rem' in limits:
+                self.remaining = limits['user-hour-rem']
+                self.bucket.set_level(self.remaining)
+
+    def should_retry(self, method, status_code, attempt):
+        """status_code is None when the request failed without a response"""
+        if attempt >= self.max_retries:
+            return False
+        if status_code == 429:
+            return True
+        if status_code is None or status_code in RETRY_STATUSES:
+            return method.upper() in IDEMPOTENT_METHODS
+        return False
+
+    def backoff(self, attempt, response=None):
+        """Sleep before retry number `attempt` (0-based), honouring Retry-After"""
+        delay = None
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = min(float(retry_after), self.backoff_max)
+        if delay is None:
+            # Full jitter: uniform in [0, base * 2^attempt], capped
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        with self._lock:
+            self.retries += 1
+            self.waited += delay
+        time.sleep(delay)
+
+    def budget(self):
+        """Snapshot of the remaining hourly budget and what this run spent"""
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'remaining': self.remaining,
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'waited_seconds': round(self.waited, 2),
+            }
+
+    def summary(self):
+        budget = self.budget()
+        remaining = '?' if budget['remaining'] is None else budget['remaining']
+        return (f"📊 API budget: {remaining}/{budget['limit']} requests left this hour "
+                f"({budget['requests']} sent, {budget['retries']} retried, "
+                f"{budget['throttled']} throttled, {budget['waited_seconds']}s waiting)")
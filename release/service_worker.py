@@ -0,0 +1,260 @@
+"""
+Service-worker manifest generator for Flutter web output directories.
+
+flutter_service_worker.js embeds RESOURCES, a {path: md5} map of every file
+of the bundle, and CORE, the files precached when the worker installs.
+Flutter only writes them during `flutter build web`, so copies that are
+post-processed or assembled by hand (the root app and admin/) drift from
+the files actually deployed. This rebuilds both constants for any output
+directory:
+
+- files are hashed on a thread pool, and digests are cached by (size,
+  mtime) in SERVICE_WORKER_DIGESTS_PATH, so only changed files are read;
+- subdirectories with a service worker of their own (admin/) are separate
+  apps and are left out of the parent's map;
+- resources are split into tiers: the core shell (precached on install,
+  written to CORE), deferred files, and lazy ones (canvaskit, wasm, fonts,
+  shaders, symbols) that are only cached once the page actually requests
+  them. The tiers, with their sizes, can be written as a JSON precache list.
+
+Usage:
+    python3 -m release.service_worker build/admin [--precache precache.json]
+    python3 -m release.service_worker . admin --existing --check
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import config
+from .precompress import PRECOMPRESSED_SUFFIXES
+
+SERVICE_WORKER = 'flutter_service_worker.js'
+# Files of an output directory that are never listed in RESOURCES (nor are
+# the .br/.gz siblings written by release.precompress)
+EXCLUDED = frozenset({SERVICE_WORKER, '.last_build_id'})
+# The application shell, in the order Flutter precaches it
+CORE_FILES = ('main.dart.js', 'index.html', 'flutter_bootstrap.js',
+              'assets/AssetManifest.bin.json', 'assets/FontManifest.json')
+# Only cached when the page requests them: the renderer variants (a browser
+# loads one of them), wasm, fonts, shaders and debug symbols
+LAZY_PATTERNS = ('canvaskit/*', '*.wasm', '*.symbols', 'assets/shaders/*',
+                 '*.otf', '*.ttf', '*.woff', '*.woff2', '*.eot')
+RESOURCES_PATTERN = re.compile(r'const RESOURCES = \{.*?\};', re.S)
+CORE_PATTERN = re.compile(r'const CORE = \[.*?\];', re.S)
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def md5_file(path):
+    md5 = hashlib.md5()
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            md5.update(view[:read])
+    return md5.hexdigest()
+
+
+class DigestCache:
+    """JSON-backed {path: [size, mtime_ns, md5]}; a file is only read when it changed"""
+
+    def __init__(self, path=None):
+        self.path = path or config.SERVICE_WORKER_DIGESTS_PATH
+        self._lock = threading.Lock()
+        self.hashed = 0
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def md5(self, path):
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        identity = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            entry = self.data.get(key)
+        if entry and entry[:2] == identity:
+            return entry[2]
+
+        digest = md5_file(path)
+        with self._lock:
+            self.data[key] = identity + [digest]
+            self.hashed += 1
+        return digest
+
+    def digests(self, paths, workers=None):
+        """{path: md5} for many files, hashed concurrently"""
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool:
+            return dict(zip(paths, pool.map(self.md5, paths)))
+
+    def forget_missing(self, directory):
+        """Drop entries of files under directory that no longer exist"""
+        prefix = os.path.join(os.path.abspath(directory), '')
+        with self._lock:
+            for key in [key for key in self.data
+                        if key.startswith(prefix) and not os.path.exists(key)]:
+                del self.data[key]
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self.data, f)
+            os.replace(tmp, self.path)
+
+
+def resource_files(directory):
+    """Relative paths of every file the service worker should list"""
+    found = []
+    for current, dirnames, filenames in os.walk(directory):
+        # A subdirectory with its own service worker is another app
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith('.')
+                             and not os.path.exists(os.path.join(current, name, SERVICE_WORKER)))
+        for filename in filenames:
+            if (filename not in EXCLUDED and not filename.startswith('.')
+                    and not filename.endswith(PRECOMPRESSED_SUFFIXES)):
+                found.append(Path(os.path.relpath(os.path.join(current, filename), directory)).as_posix())
+    return sorted(found)
+
+
+def read_resources(script):
+    """The RESOURCES map of a service worker's source"""
+    match = RESOURCES_PATTERN.search(script)
+    if not match:
+        raise ValueError(f"no RESOURCES map in {SERVICE_WORKER}")
+    return json.loads(match.group(0)[len('const RESOURCES = '):-1])
+
+
+def build_resources(directory, cache, existing=None, workers=None):
+    """{path: md5} for an output directory, '/' standing for index.html
+
+    With existing, only the files already listed there are hashed (for
+    copies assembled in a directory that also holds unrelated files).
+    """
+    directory = Path(directory)
+    if existing is None:
+        paths = resource_files(directory)
+    else:
+        paths = sorted(key for key in existing if key != '/' and (directory / key).is_file())
+    digests = cache.digests([directory / path for path in paths], workers)
+    resources = {path: digests[directory / path] for path in paths}
+    if 'index.html' in resources:
+        resources['/'] = resources['index.html']
+    return dict(sorted(resources.items()))
+
+
+def tier(path):
+    if path in CORE_FILES:
+        return 'core'
+    if any(fnmatch.fnmatch(path, pattern) for pattern in LAZY_PATTERNS):
+        return 'lazy'
+    return 'deferred'
+
+
+def precache_tiers(directory, resources):
+    """{'core': [...], 'deferred': [...], 'lazy': [...]} of {'path', 'size'}, core in CORE_FILES order"""
+    directory = Path(directory)
+    tiers = {'core': [], 'deferred': [], 'lazy': []}
+    order = {path: index for index, path in enumerate(CORE_FILES)}
+    for path in sorted(resources, key=lambda path: (order.get(path, len(order)), path)):
+        if path == '/':
+            continue
+        tiers[tier(path)].append({'path': path, 'size': (directory / path).stat().st_size})
+    return tiers
+
+
+def render(script, resources, core):
+    """The service worker source with RESOURCES and CORE replaced"""
+    entries = ',\n'.join(f"{json.dumps(path)}: {json.dumps(digest)}"
+                         for path, digest in resources.items())
+    script = RESOURCES_PATTERN.sub(lambda _: f"const RESOURCES = {{{entries}}};", script, count=1)
+    core_list = ',\n'.join(json.dumps(path) for path in core)
+    return CORE_PATTERN.sub(lambda _: f"const CORE = [{core_list}];", script, count=1)
+
+
+def update_service_worker(directory, cache, existing_only=False, check=False, workers=None):
+    """Regenerate one directory's manifest; returns (changed, tiers)"""
+    directory = Path(directory)
+    path = directory / SERVICE_WORKER
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+
+    current = read_resources(script)
+    resources = build_resources(directory, cache, current if existing_only else None, workers)
+    tiers = precache_tiers(directory, resources)
+    updated = render(script, resources, [entry['path'] for entry in tiers['core']])
+    changed = updated != script
+    if changed and not check:
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(updated)
+        os.replace(tmp, path)
+
+    added = sorted(set(resources) - set(current))
+    removed = sorted(set(current) - set(resources))
+    modified = sorted(key for key in set(resources) & set(current) if resources[key] != current[key])
+    for label, keys in (('+', added), ('-', removed), ('~', modified)):
+        for key in keys:
+            print(f"   {label} {key}")
+    return changed, tiers
+
+
+def _megabytes(entries):
+    return sum(entry['size'] for entry in entries) / (1024 * 1024)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild flutter_service_worker.js manifests")
+    parser.add_argument('directories', nargs='+', type=Path, help="Flutter web output directories")
+    parser.add_argument('--existing', action='store_true',
+                        help="only rehash the files the service worker already lists")
+    parser.add_argument('--check', action='store_true',
+                        help="do not write; exit 1 when a manifest is out of date")
+    parser.add_argument('--precache', type=Path,
+                        help="write the tiered precache list(s) as JSON here")
+    parser.add_argument('--workers', type=int, help="hashing threads")
+    args = parser.parse_args(argv)
+
+    cache = DigestCache()
+    stale = []
+    precache = {}
+    for directory in args.directories:
+        try:
+            changed, tiers = update_service_worker(directory, cache, args.existing,
+                                                   args.check, args.workers)
+        except (OSError, ValueError) as e:
+            print(f"❌ {directory}: {e}")
+            return 1
+        cache.forget_missing(directory)
+        precache[directory.as_posix()] = tiers
+        sizes = ', '.join(f"{name} {len(entries)} ({_megabytes(entries):.1f} MB)"
+                          for name, entries in tiers.items())
+        if changed:
+            stale.append(directory)
+        icon = '✅' if not changed else ('⚠️ ' if args.check else '📝')
+        state = 'up to date' if not changed else ('out of date' if args.check else 'updated')
+        print(f"{icon} {directory / SERVICE_WORKER}: {state}; {sizes}")
+    cache.save()
+    print(f"🔑 {cache.hashed} files hashed, the rest from the digest cache")
+
+    if args.precache:
+        with open(args.precache, 'w') as f:
+            json.dump(precache, f, indent=2)
+            f.write('\n')
+    return 1 if args.check and stale else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
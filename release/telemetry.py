@@ -0,0 +1,454 @@
+"""
+Per-request telemetry for the release scripts.
+
+Every API request (client.request, and the upload chunk PUTs) and every
+subprocess started through jobs.run_streamed() is recorded as a span: the
+endpoint (ids replaced by {id}) or command, status, bytes, retries and
+where the time went:
+
+    token     signing or loading the bearer token
+    throttle  waiting for the hourly budget (scheduler)
+    connect   DNS lookup and TCP connect of a new connection
+    tls       TLS handshake of a new connection
+    server    request sent until response headers arrived
+    transfer  reading the response body
+    decode    JSON decoding (client.get_json)
+    backoff   sleeping between retries
+    spawn, first_output   for subprocesses (e.g. xcrun altool)
+
+Spans are aggregated into histograms as they finish. When the process
+exits, the run is written to TELEMETRY_DIR/trace-<script>.json in Chrome
+trace format (open it in chrome://tracing or Perfetto) and to
+PROMETHEUS_TEXTFILE_DIR/release_<script>.prom for node_exporter's textfile
+collector, and a one-line phase summary is printed. Runs with
+ASC_PROFILE=1 (or ``python3 -m release --profile ...``) also leave a
+cProfile dump, TELEMETRY_DIR/profile-<script>.pstats.
+
+Usage: python3 -m release.telemetry [TRACE.json]   (per-endpoint summary)
+"""
+
+import argparse
+import atexit
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from . import config
+
+HTTP_PHASES = ('token', 'throttle', 'connect', 'tls', 'server', 'transfer', 'decode', 'backoff')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+# Spans kept for the trace file; histograms keep counting past it
+MAX_TRACE_SPANS = 20000
+ID_SEGMENT = re.compile(r'^[0-9a-fA-F-]{6,}$')
+
+_local = threading.local()
+
+
+def run_name():
+    """Name of the running script, e.g. upload_with_altool or release"""
+    path = Path(sys.argv[0]) if sys.argv and sys.argv[0] else Path('python')
+    name = path.parent.name if path.stem == '__main__' else path.stem
+    return re.sub(r'[^A-Za-z0-9_]', '_', name) or 'python'
+
+
+def endpoint_label(url, base_url=config.API_BASE_URL):
+    """Low-cardinality endpoint: builds/{id}/betaBuildLocalizations, no query"""
+    path = urlsplit(url).path
+    base = urlsplit(base_url).path.rstrip('/')
+    if base and path.startswith(base + '/'):
+        path = path[len(base):]
+    segments = [s for s in path.split('/') if s]
+    return '/'.join('{id}' if position % 2 and segment != 'relationships'
+                    and (ID_SEGMENT.match(segment) or segment.isdigit()) else segment
+                    for position, segment in enumerate(segments)) or '/'
+
+
+def command_label(cmd):
+    """Program plus its subcommands, without paths: 'xcrun altool --upload-app'"""
+    words = [os.path.basename(str(cmd[0]))] if cmd else ['?']
+    for arg in cmd[1:3]:
+        arg = str(arg)
+        if os.sep in arg or '.' in arg or '=' in arg:
+            break
+        words.append(arg)
+    return ' '.join(words)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(BUCKETS, value)
+        if index < len(BUCKETS):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            yield bound, total
+
+
+class Span:
+    """One request or subprocess and the time spent in each phase"""
+
+    __slots__ = ('kind', 'name', 'method', 'status', 'started', 'duration', 'retries',
+                 'bytes_sent', 'bytes_received', 'cache', 'phases', 'thread', '_clock')
+
+    def __init__(self, kind, name, method=None):
+        self.kind = kind
+        self.name = name
+        self.method = method
+        self.status = None
+        self.started = time.time()
+        self.duration = 0.0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cache = None
+        self.phases = {}
+        self.thread = threading.get_ident()
+        self._clock = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def settle(self):
+        """Split the last attempt's connection setup into connect and tls; returns it"""
+        connect = self.phases.pop('attempt_connect', 0.0)
+        handshake = self.phases.pop('handshake', connect)
+        if handshake:
+            self.add('connect', connect)
+            self.add('tls', max(0.0, handshake - connect))
+        return handshake
+
+    def response(self, response, seconds):
+        """Account for one HTTP attempt that took `seconds` in session.request"""
+        self.status = response.status_code
+        body = response.request.body if response.request is not None else None
+        self.bytes_sent += len(body) if body is not None else 0
+        self.bytes_received += len(response.content or b'')
+        elapsed = response.elapsed.total_seconds()
+        self.add('server', max(0.0, elapsed - self.settle()))
+        self.add('transfer', max(0.0, seconds - elapsed))
+
+    def as_event(self, pid):
+        """Chrome trace 'complete' event"""
+        label = f"{self.method} {self.name}" if self.method else self.name
+        args = {'status': self.status, 'retries': self.retries,
+                'bytes_sent': self.bytes_sent, 'bytes_received': self.bytes_received,
+                **{phase: round(seconds, 6) for phase, seconds in self.phases.items()}}
+        if self.cache:
+            args['cache'] = self.cache
+        return {'name': label, 'cat': self.kind, 'ph': 'X', 'pid': pid, 'tid': self.thread,
+                'ts': int(self.started * 1e6), 'dur': int(self.duration * 1e6), 'args': args}
+
+
+class _SpanContext:
+    def __init__(self, recorder, span):
+        self.recorder = recorder
+        self.span = span
+        self.outer = None
+
+    def __enter__(self):
+        self.outer = getattr(_local, 'span', None)
+        _local.span = self.span
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.span = self.outer
+        span = self.span
+        span.duration = time.perf_counter() - span._clock
+        span.settle()
+        if exc_type is not None and span.status is None:
+            span.status = exc_type.__name__
+        self.recorder.record(span)
+
+
+def current_span():
+    """The span this thread is inside of, or None"""
+    return getattr(_local, 'span', None)
+
+
+def add_phase(phase, seconds):
+    """Add time to the current span's phase, if there is one"""
+    span = getattr(_local, 'span', None)
+    if span is not None:
+        span.add(phase, seconds)
+
+
+class Recorder:
+    """Collects spans and histograms for this process and exports them at exit"""
+
+    def __init__(self, name=None, trace_dir=None, textfile_dir=None, enabled=True):
+        self.name = name or run_name()
+        self.trace_dir = Path(trace_dir or config.TELEMETRY_DIR)
+        self.textfile_dir = Path(textfile_dir or config.PROMETHEUS_TEXTFILE_DIR)
+        self.enabled = enabled
+        self.started = time.time()
+        self.spans = []
+        self.dropped = 0
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def http(self, method, url, endpoint=None):
+        """Context manager around one logical API request, retries included"""
+        return _SpanContext(self, Span('http', endpoint or endpoint_label(url), method))
+
+    def subprocess(self, cmd):
+        """Context manager around one subprocess run"""
+        return _SpanContext(self, Span('subprocess', command_label(cmd)))
+
+    def decoded(self, response, seconds):
+        """JSON decoding happens after the request span closed; add it afterwards"""
+        span = getattr(response, 'span', None)
+        if span is None or not self.enabled:
+            return
+        span.add('decode', seconds)
+        with self._lock:
+            self._observe('asc_http_phase_seconds',
+                          (('endpoint', span.name), ('method', span.method), ('phase', 'decode')),
+                          seconds)
+
+    def _observe(self, metric, labels, value):
+        key = (metric, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def _count(self, metric, labels, value=1):
+        key = (metric, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self, span):
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self.spans) < MAX_TRACE_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+            if span.kind == 'http':
+                labels = (('endpoint', span.name), ('method', span.method))
+                self._count('asc_http_requests_total',
+                            labels + (('status', str(span.status)), ('cache', span.cache or 'miss')))
+                self._count('asc_http_retries_total', labels, span.retries)
+                self._count('asc_http_request_bytes_total', labels, span.bytes_sent)
+                self._count('asc_http_response_bytes_total', labels, span.bytes_received)
+                self._observe('asc_http_phase_seconds', labels + (('phase', 'total'),),
+                              span.duration)
+                for phase, seconds in span.phases.items():
+                    self._observe('asc_http_phase_seconds', labels + (('phase', phase),), seconds)
+            else:
+                labels = (('command', span.name),)
+                self._count('asc_subprocess_runs_total', labels + (('status', str(span.status)),))
+                self._count('asc_subprocess_output_bytes_total', labels, span.bytes_received)
+                self._observe('asc_subprocess_phase_seconds', labels + (('phase', 'total'),),
+                              span.duration)
+                for phase, seconds in span.phases.items():
+                    self._observe('asc_subprocess_phase_seconds', labels + (('phase', phase),),
+                                  seconds)
+
+    # export
+
+    def trace(self):
+        pid = os.getpid()
+        with self._lock:
+            events = [span.as_event(pid) for span in self.spans]
+            dropped = self.dropped
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'script': self.name, 'argv': sys.argv[1:], 'started': self.started,
+                          'duration': time.time() - self.started, 'dropped_spans': dropped},
+        }
+
+    def prometheus(self):
+        """The run's metrics in the Prometheus text exposition format"""
+        script = ('script', self.name)
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        seen = set()
+        for (metric, labels), value in counters:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels((script,) + labels)} {value}")
+
+        for (metric, labels), histogram in histograms:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            labels = (script,) + labels
+            for bound, count in histogram.cumulative():
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', repr(float(bound))),))} {count}")
+            lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+
+        lines.append("# TYPE asc_run_timestamp_seconds gauge")
+        lines.append(f"asc_run_timestamp_seconds{_labels((script,))} {self.started:.0f}")
+        lines.append("# TYPE asc_run_duration_seconds gauge")
+        lines.append(f"asc_run_duration_seconds{_labels((script,))} {time.time() - self.started:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def phase_totals(self, kind='http'):
+        """Seconds per phase over every span of a kind"""
+        totals = {}
+        with self._lock:
+            for (metric, labels), histogram in self.histograms.items():
+                if metric == f"asc_{kind}_phase_seconds":
+                    phase = dict(labels)['phase']
+                    totals[phase] = totals.get(phase, 0.0) + histogram.sum
+        return totals
+
+    def summary(self):
+        """One line per kind: where the time went"""
+        lines = []
+        with self._lock:
+            requests = sum(value for (metric, _), value in self.counters.items()
+                           if metric == 'asc_http_requests_total')
+            commands = sum(value for (metric, _), value in self.counters.items()
+                           if metric == 'asc_subprocess_runs_total')
+        if requests:
+            totals = self.phase_totals('http')
+            phases = ', '.join(f"{phase} {totals[phase]:.2f}s" for phase in HTTP_PHASES
+                               if totals.get(phase, 0) >= 0.005)
+            lines.append(f"📈 {requests} API requests, {totals.get('total', 0):.2f}s ({phases})")
+        if commands:
+            totals = self.phase_totals('subprocess')
+            lines.append(f"📈 {commands} subprocesses, {totals.get('total', 0):.2f}s")
+        return '\n'.join(lines)
+
+    def export(self):
+        """Write the trace and the Prometheus textfile; returns the trace path"""
+        trace_path = self.trace_dir / f"trace-{self.name}.json"
+        _write_atomic(trace_path, json.dumps(self.trace()))
+        # node_exporter may read the directory at any time: rename into place
+        _write_atomic(self.textfile_dir / f"release_{self.name}.prom", self.prometheus())
+        return trace_path
+
+    def flush(self):
+        """At exit: export and summarize, if anything was recorded"""
+        if not self.enabled or not (self.spans or self.dropped):
+            return
+        try:
+            path = self.export()
+        except OSError as e:
+            print(f"⚠️  Telemetry not written: {e}")
+            return
+        summary = self.summary()
+        if summary:
+            print(summary)
+        print(f"📈 Trace: {path}")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _write_atomic(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# cProfile
+
+_profiler = None
+
+
+def start_profile():
+    """Profile the rest of the run; the dump is written at exit"""
+    global _profiler
+    if _profiler is not None:
+        return
+    import cProfile
+
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    atexit.register(_dump_profile)
+
+
+def _dump_profile():
+    _profiler.disable()
+    path = Path(config.TELEMETRY_DIR) / f"profile-{run_name()}.pstats"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _profiler.dump_stats(str(path))
+    print(f"🔬 Profile: {path} (python3 -m pstats {path})")
+
+
+_default_recorder = None
+_default_lock = threading.Lock()
+
+
+def get_recorder():
+    """Process-wide recorder, exported when the process exits"""
+    global _default_recorder
+    with _default_lock:
+        if _default_recorder is None:
+            _default_recorder = Recorder(enabled=config.TELEMETRY_ENABLED)
+            atexit.register(_default_recorder.flush)
+            if config.PROFILE:
+                start_profile()
+        return _default_recorder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a release telemetry trace")
+    parser.add_argument('trace', nargs='?', type=Path,
+                        default=Path(config.TELEMETRY_DIR) / 'trace-release.json')
+    args = parser.parse_args(argv)
+
+    with open(args.trace, 'r') as f:
+        events = json.load(f)['traceEvents']
+
+    rows = {}
+    for event in events:
+        row = rows.setdefault((event['cat'], event['name']), {'count': 0, 'total': 0.0,
+                                                             'retries': 0, 'phases': {}})
+        row['count'] += 1
+        row['total'] += event['dur'] / 1e6
+        row['retries'] += event['args'].get('retries', 0)
+        for phase in HTTP_PHASES + ('spawn', 'first_output'):
+            if phase in event['args']:
+                row['phases'][phase] = row['phases'].get(phase, 0.0) + event['args'][phase]
+
+    for (kind, name), row in sorted(rows.items(), key=lambda item: -item[1]['total']):
+        phases = ', '.join(f"{phase} {seconds:.2f}s"
+                           for phase, seconds in sorted(row['phases'].items(), key=lambda p: -p[1])
+                           if seconds >= 0.005)
+        print(f"{row['total']:8.2f}s {row['count']:>5}x  {name:<50} "
+              f"{'retries ' + str(row['retries']) if row['retries'] else ''} {phases}".rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,286 @@
+"""
+Batched TestFlight tester and beta-group management.
+
+Testers are listed in a CSV file (email, first_name, last_name, groups; the
+groups column holds beta group names separated by ';'). The file is diffed
+against the betaTesters App Store Connect already has, and the difference
+is applied with as few calls as the API allows:
+
+- existing testers missing from a group are added with one
+  POST betaGroups/{id}/relationships/betaTesters per TESTFLIGHT_BATCH_SIZE ids;
+- testers that do not exist yet are created (one POST each, the API has no
+  bulk create) concurrently, already linked to their groups;
+- with --prune, group members missing from the CSV are removed with batched
+  DELETE betaGroups/{id}/relationships/betaTesters;
+- a build is assigned to any number of groups with one
+  POST builds/{id}/relationships/betaGroups.
+
+Usage:
+    python3 -m release.testflight groups
+    python3 -m release.testflight import testers.csv [--group NAME] [--prune] [--dry-run]
+    python3 -m release.testflight assign-build 31 --group Students --group Parents
+"""
+
+import argparse
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .client import AppStoreConnectError, get_client
+from .index import get_index
+from .records import BetaGroup, BetaTester
+
+# betaTesters filter[email] values per lookup request (keeps URLs short)
+EMAILS_PER_LOOKUP = 50
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _linkage(resource_type, ids):
+    return {'data': [{'type': resource_type, 'id': resource_id} for resource_id in ids]}
+
+
+def load_testers_csv(path, default_groups=()):
+    """Read the CSV into {email: {'first_name', 'last_name', 'groups'}}"""
+    testers = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            email = row.get('email', '').lower()
+            if not email:
+                continue
+            groups = [g.strip() for g in row.get('groups', '').split(';') if g.strip()]
+            tester = testers.setdefault(email, {
+                'first_name': row.get('first_name', ''),
+                'last_name': row.get('last_name', ''),
+                'groups': set(),
+            })
+            tester['groups'].update(groups or default_groups)
+    return testers
+
+
+class TesterSync:
+    """Diffs desired testers against TestFlight and applies it in batches"""
+
+    def __init__(self, app_id=None, client=None, concurrency=config.SYNC_CONCURRENCY,
+                 batch_size=config.TESTFLIGHT_BATCH_SIZE):
+        self.app_id = app_id or config.APP_ID
+        self.client = client or get_client()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    def groups(self):
+        """{name: BetaGroup} for the app"""
+        query = (self.client.query('betaGroups')
+                 .filter('app', self.app_id)
+                 .limit(200))
+        return {group.name: group for group in query.records(BetaGroup)}
+
+    def group_testers(self, group_id):
+        """{email: BetaTester} currently in a group"""
+        query = (self.client.query(f'betaGroups/{group_id}/betaTesters')
+                 .limit(200)
+                 .uncached())
+        return {tester.email.lower(): tester for tester in query.records(BetaTester)
+                if tester.email}
+
+    def find_testers(self, emails):
+        """{email: BetaTester} for the emails that already are testers of the app"""
+        found = {}
+        for chunk in _chunks(sorted(emails), EMAILS_PER_LOOKUP):
+            query = (self.client.query('betaTesters')
+                     .filter('apps', self.app_id)
+                     .filter('email', *chunk)
+                     .limit(200)
+                     .uncached())
+            for tester in query.records(BetaTester):
+                if tester.email:
+                    found[tester.email.lower()] = tester
+        return found
+
+    def plan(self, testers, prune=False):
+        """Work out what to do for {email: {..., 'groups'}}
+
+        Returns a dict with per-group 'add' and 'remove' id lists, the
+        testers to 'create' and the per-group 'unchanged' counts.
+        """
+        groups = self.groups()
+        wanted = {}
+        for email, tester in testers.items():
+            for name in tester['groups']:
+                wanted.setdefault(name, set()).add(email)
+
+        unknown = sorted(set(wanted) - set(groups))
+        if unknown:
+            raise ValueError(f"unknown beta groups: {', '.join(unknown)}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            members = dict(zip(wanted, pool.map(
+                lambda name: self.group_testers(groups[name].id), wanted)))
+
+        missing = {email for name, emails in wanted.items()
+                   for email in emails - set(members[name])}
+        existing = self.find_testers(missing) if missing else {}
+
+        plan = {'add': {}, 'remove': {}, 'create': {}, 'unchanged': {}, 'groups': groups}
+        for name, emails in wanted.items():
+            group_id = groups[name].id
+            current = members[name]
+            plan['unchanged'][name] = len(emails & set(current))
+            for email in sorted(emails - set(current)):
+                if email in existing:
+                    plan['add'].setdefault(group_id, []).append(existing[email].id)
+                else:
+                    entry = plan['create'].setdefault(email, dict(testers[email], group_ids=set()))
+                    entry['group_ids'].add(group_id)
+            if prune:
+                stale = [current[email].id for email in sorted(set(current) - emails)]
+                if stale:
+                    plan['remove'][group_id] = stale
+        return plan
+
+    def _create(self, item):
+        email, tester = item
+        attributes = {'email': email}
+        if tester.get('first_name'):
+            attributes['firstName'] = tester['first_name']
+        if tester.get('last_name'):
+            attributes['lastName'] = tester['last_name']
+        body = {
+            'data': {
+                'type': 'betaTesters',
+                'attributes': attributes,
+                'relationships': {
+                    'betaGroups': _linkage('betaGroups', sorted(tester['group_ids']))
+                }
+            }
+        }
+        response = self.client.post('betaTesters', body)
+        if response.status_code != 201:
+            return email, str(AppStoreConnectError(response))
+        return email, None
+
+    def _relationship(self, method, group_id, tester_ids):
+        endpoint = f'betaGroups/{group_id}/relationships/betaTesters'
+        response = self.client.request(method, endpoint, data=_linkage('betaTesters', tester_ids))
+        if response.status_code != 204:
+            raise AppStoreConnectError(response)
+
+    def apply(self, plan):
+        """Send the planned writes; returns {'added', 'removed', 'created', 'errors', 'requests'}"""
+        result = {'added': 0, 'removed': 0, 'created': 0, 'errors': [], 'requests': 0}
+
+        for method, key, counter in (('POST', 'add', 'added'), ('DELETE', 'remove', 'removed')):
+            for group_id, tester_ids in plan[key].items():
+                for chunk in _chunks(tester_ids, self.batch_size):
+                    result['requests'] += 1
+                    try:
+                        self._relationship(method, group_id, chunk)
+                        result[counter] += len(chunk)
+                    except AppStoreConnectError as e:
+                        result['errors'].append(str(e))
+
+        if plan['create']:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for email, error in pool.map(self._create, plan['create'].items()):
+                    result['requests'] += 1
+                    if error:
+                        result['errors'].append(f"{email}: {error}")
+                    else:
+                        result['created'] += 1
+        return result
+
+    def assign_build(self, build_id, group_names):
+        """Add a build to several beta groups with one request"""
+        groups = self.groups()
+        unknown = sorted(set(group_names) - set(groups))
+        if unknown:
+            raise ValueError(f"unknown beta groups: {', '.join(unknown)}")
+        ids = [groups[name].id for name in group_names]
+        response = self.client.post(f'builds/{build_id}/relationships/betaGroups',
+                                    _linkage('betaGroups', ids))
+        if response.status_code != 204:
+            raise AppStoreConnectError(response)
+        return ids
+
+
+def print_plan(plan):
+    """Print a per-group summary of a plan"""
+    for name, count in sorted(plan['unchanged'].items()):
+        group_id = plan['groups'][name].id
+        creates = sum(1 for tester in plan['create'].values() if group_id in tester['group_ids'])
+        print(f"👥 {name}: {count} ללא שינוי, +{len(plan['add'].get(group_id, []))} קיימים, "
+              f"+{creates} חדשים, -{len(plan['remove'].get(group_id, []))}")
+
+
+def import_testers(path, app_id=None, default_groups=(), prune=False, dry_run=False):
+    """Bring TestFlight in line with a tester CSV; True when every write succeeded"""
+    testers = load_testers_csv(path, default_groups)
+    if not testers:
+        print(f"❌ No testers found in {path}")
+        return False
+
+    sync = TesterSync(app_id=app_id)
+    plan = sync.plan(testers, prune=prune)
+    print_plan(plan)
+    if dry_run:
+        return True
+
+    result = sync.apply(plan)
+    for error in result['errors']:
+        print(f"❌ {error}")
+    print(f"✅ {result['added']} נוספו, {result['created']} נוצרו, {result['removed']} הוסרו "
+          f"({result['requests']} קריאות API)")
+    return not result['errors']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage TestFlight testers and beta groups")
+    parser.add_argument('--app-id', default=config.APP_ID)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('groups', help="list beta groups")
+
+    importer = commands.add_parser('import', help="sync testers from a CSV file")
+    importer.add_argument('csv')
+    importer.add_argument('--group', action='append', dest='groups', default=[],
+                          help="group for rows without a groups column (repeatable)")
+    importer.add_argument('--prune', action='store_true',
+                          help="remove group members that are not in the CSV")
+    importer.add_argument('--dry-run', action='store_true', help="only print the plan")
+
+    assign = commands.add_parser('assign-build', help="add a build to beta groups")
+    assign.add_argument('version', help="build number")
+    assign.add_argument('--group', action='append', dest='groups', required=True)
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'groups':
+            for name, group in sorted(TesterSync(app_id=args.app_id).groups().items()):
+                kind = 'internal' if group.is_internal_group else 'external'
+                print(f"👥 {name} ({kind}, {group.id})")
+            return 0
+
+        if args.command == 'import':
+            ok = import_testers(args.csv, args.app_id, args.groups, args.prune, args.dry_run)
+            return 0 if ok else 1
+
+        build = get_index(args.app_id).build_by_version(args.version)
+        if not build:
+            print(f"❌ Build {args.version} not found")
+            return 1
+        TesterSync(app_id=args.app_id).assign_build(build['id'], args.groups)
+        print(f"✅ בילד {args.version} שויך ל-{', '.join(args.groups)}")
+        return 0
+    except (AppStoreConnectError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
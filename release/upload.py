@@ -0,0 +1,285 @@
+"""
+Native, chunked and resumable IPA upload through the App Store Connect
+build upload API.
+
+1. POST buildUploads + buildUploadFiles reserves the upload; Apple answers
+   with uploadOperations, one byte range and pre-signed URL per chunk.
+2. The IPA is memory-mapped and every operation PUTs a zero-copy slice of
+   it, several chunks at a time, each chunk retried on its own.
+3. Finished chunks are journaled under ASC_CACHE_DIR/uploads, so an
+   interrupted run resumes with the chunks that are still missing.
+4. PATCH buildUploadFiles/{id} with uploaded=true and the file checksum
+   (from the cached streaming fingerprint, see fingerprint.py) commits the
+   upload. An IPA byte-identical to one already uploaded is skipped.
+
+Usage: python3 -m release.upload IPA --version 31 --short-version 2.0.0
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from . import config
+from .client import AppStoreConnectError, get_client
+from .fingerprint import get_cache as get_fingerprint_cache
+
+
+# Telemetry endpoint label of the pre-signed chunk URLs
+UPLOAD_ENDPOINT = 'uploadOperations'
+
+
+class UploadError(Exception):
+    """Raised when a chunk keeps failing or Apple rejects the upload"""
+
+
+class UploadJournal:
+    """Persisted reservation and completed chunks for one IPA"""
+
+    def __init__(self, ipa_path, state_dir=None):
+        stat = os.stat(ipa_path)
+        identity = f"{os.path.abspath(ipa_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        name = hashlib.sha1(identity.encode()).hexdigest()
+        self.path = Path(state_dir or config.UPLOAD_STATE_DIR) / f"{name}.json"
+        self._lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def reservation(self):
+        return self.state.get('reservation')
+
+    def reserve(self, reservation):
+        with self._lock:
+            self.state = {'reservation': reservation, 'done': []}
+            self.save()
+
+    def done(self):
+        return set(self.state.get('done', []))
+
+    def mark_done(self, offset):
+        with self._lock:
+            self.state.setdefault('done', []).append(offset)
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self.state = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class IpaUploader:
+    """Uploads one IPA as a new build of the app"""
+
+    def __init__(self, app_id=None, client=None,
+                 concurrency=config.UPLOAD_CONCURRENCY,
+                 chunk_retries=config.UPLOAD_CHUNK_RETRIES,
+                 state_dir=None):
+        self.app_id = app_id or config.APP_ID
+        self.client = client or get_client()
+        self.concurrency = concurrency
+        self.chunk_retries = chunk_retries
+        self.state_dir = state_dir
+
+    def reserve(self, ipa_path, version, short_version, platform='IOS'):
+        """Create the buildUpload and buildUploadFile; returns the reservation"""
+        upload = self.client.post('buildUploads', {
+            'data': {
+                'type': 'buildUploads',
+                'attributes': {
+                    'cfBundleShortVersionString': short_version,
+                    'cfBundleVersion': str(version),
+                    'platform': platform,
+                },
+                'relationships': {
+                    'app': {'data': {'type': 'apps', 'id': self.app_id}}
+                }
+            }
+        })
+        if upload.status_code != 201:
+            raise AppStoreConnectError(upload)
+        upload_id = upload.json()['data']['id']
+
+        upload_file = self.client.post('buildUploadFiles', {
+            'data': {
+                'type': 'buildUploadFiles',
+                'attributes': {
+                    'assetType': 'ASSET',
+                    'fileName': os.path.basename(ipa_path),
+                    'fileSize': os.path.getsize(ipa_path),
+                    'uti': 'com.apple.ipa',
+                },
+                'relationships': {
+                    'buildUpload': {'data': {'type': 'buildUploads', 'id': upload_id}}
+                }
+            }
+        })
+        if upload_file.status_code != 201:
+            raise AppStoreConnectError(upload_file)
+        data = upload_file.json()['data']
+
+        return {
+            'build_upload_id': upload_id,
+            'file_id': data['id'],
+            'operations': data['attributes'].get('uploadOperations') or [],
+        }
+
+    def _put_chunk(self, view, operation):
+        """PUT one byte range, retrying with jittered backoff"""
+        offset, length = operation['offset'], operation['length']
+        headers = {h['name']: h['value'] for h in operation.get('requestHeaders') or []}
+        method = operation.get('method', 'PUT')
+        # The slice must be released before the mapping can be closed
+        with view[offset:offset + length] as chunk, \
+                self.client.telemetry.http(method, operation['url'], UPLOAD_ENDPOINT) as span:
+            for attempt in range(self.chunk_retries + 1):
+                span.retries = attempt
+                try:
+                    started = time.perf_counter()
+                    response = self.client.session.request(
+                        method, operation['url'],
+                        data=chunk, headers=headers, timeout=self.client.timeout)
+                    span.response(response, time.perf_counter() - started)
+                    if response.status_code < 300:
+                        return offset
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code < 500 and response.status_code != 429:
+                        break
+                except Exception as e:
+                    error = str(e)
+                delay = random.uniform(0, min(config.BACKOFF_MAX, config.BACKOFF_BASE * 2 ** attempt))
+                span.add('backoff', delay)
+                time.sleep(delay)
+
+        raise UploadError(f"chunk at offset {offset} ({length} bytes) failed: {error}")
+
+    def upload_chunks(self, ipa_path, operations, journal):
+        """PUT every operation not yet journaled as done"""
+        done = journal.done()
+        pending = [op for op in operations if op['offset'] not in done]
+        total = sum(op['length'] for op in operations)
+        sent = total - sum(op['length'] for op in pending)
+        if done:
+            print(f"↩️  ממשיך העלאה: {len(done)}/{len(operations)} חלקים כבר הועלו")
+
+        with open(ipa_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            error = None
+            try:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    futures = {pool.submit(self._put_chunk, view, op): op for op in pending}
+                    # Chunks still in flight after a failure are journaled
+                    # too, so a resumed upload does not send them again
+                    for future in as_completed(futures):
+                        try:
+                            offset = future.result()
+                        except Exception as e:
+                            error = error or e
+                            continue
+                        journal.mark_done(offset)
+                        sent += futures[future]['length']
+                        print(f"⬆️  {sent * 100 // max(total, 1)}% ({sent}/{total} bytes)")
+            finally:
+                view.release()
+            if error is not None:
+                raise error
+
+    def commit(self, file_id, md5):
+        """Tell Apple every chunk is in place"""
+        response = self.client.patch(f'buildUploadFiles/{file_id}', {
+            'data': {
+                'type': 'buildUploadFiles',
+                'id': file_id,
+                'attributes': {
+                    'uploaded': True,
+                    'sourceFileChecksums': {
+                        'file': {'hash': md5, 'algorithm': 'MD5'}
+                    }
+                }
+            }
+        })
+        if response.status_code != 200:
+            raise AppStoreConnectError(response)
+        return response.json()['data']
+
+    def upload(self, ipa_path, version, short_version, platform='IOS', skip_identical=True):
+        """Reserve (or resume), upload all chunks and commit
+
+        Returns the buildUpload id, or None when a byte-identical IPA was
+        already uploaded and skip_identical is set.
+        """
+        fingerprints = get_fingerprint_cache()
+        fingerprint = fingerprints.fingerprint(ipa_path)
+        uploaded = fingerprints.find_uploaded(fingerprint)
+        if skip_identical and uploaded:
+            print(f"⏭️  IPA זהה כבר הועלה כבילד {uploaded['short_version']} "
+                  f"({uploaded['version']}), מדלג על ההעלאה")
+            return None
+
+        journal = UploadJournal(ipa_path, self.state_dir)
+        reservation = journal.reservation()
+        resumed = reservation is not None
+        if not resumed:
+            reservation = self.reserve(ipa_path, version, short_version, platform)
+            journal.reserve(reservation)
+
+        try:
+            self.upload_chunks(ipa_path, reservation['operations'], journal)
+        except UploadError:
+            if not resumed:
+                raise
+            # The pre-signed URLs of an old reservation may have expired
+            print("⚠️  ההזמנה הקודמת פגה, מתחיל העלאה מחדש")
+            journal.clear()
+            return self.upload(ipa_path, version, short_version, platform, skip_identical)
+
+        self.commit(reservation['file_id'], fingerprint['md5'])
+        journal.clear()
+        fingerprints.mark_uploaded(fingerprint, version, short_version,
+                                   reservation['build_upload_id'])
+        return reservation['build_upload_id']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload an IPA to App Store Connect")
+    parser.add_argument('ipa')
+    parser.add_argument('--version', required=True, help="CFBundleVersion (build number)")
+    parser.add_argument('--short-version', required=True, help="CFBundleShortVersionString")
+    parser.add_argument('--app-id', default=config.APP_ID)
+    parser.add_argument('--concurrency', type=int, default=config.UPLOAD_CONCURRENCY)
+    parser.add_argument('--force', action='store_true',
+                        help="upload even if an identical IPA was already uploaded")
+    args = parser.parse_args(argv)
+
+    uploader = IpaUploader(app_id=args.app_id, concurrency=args.concurrency)
+    upload_id = uploader.upload(args.ipa, args.version, args.short_version,
+                                skip_identical=not args.force)
+    if upload_id:
+        print(f"✅ העלאה הושלמה (buildUpload {upload_id})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
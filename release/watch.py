@@ -0,0 +1,148 @@
+"""
+Build processing-state watcher.
+
+Apple moves a build from PROCESSING to VALID (or FAILED/INVALID) on its
+own; this module observes that instead of trying to PATCH the state. Any
+number of builds are tracked together with one batched
+``GET /v1/builds?filter[id]=...&fields[builds]=processingState`` per tick.
+Polling starts fast and backs off exponentially up to a ceiling, and each
+build is reported as soon as it reaches a terminal state.
+
+Usage: python3 -m release.watch [BUILD_ID ...] [--version 31] [--timeout 3600]
+"""
+
+import argparse
+import time
+
+from . import config
+from .builds import build_ids_by_version
+from .client import get_client
+from .index import TERMINAL_PROCESSING_STATES, get_index
+from .records import Build
+
+WATCH_FIELDS = ('version', 'processingState', 'uploadedDate')
+MAX_IDS_PER_REQUEST = 200
+
+
+class WatchTimeout(Exception):
+    """Raised when builds are still processing after the timeout"""
+
+    def __init__(self, pending):
+        self.pending = pending
+        super().__init__(f"still processing: {', '.join(sorted(pending))}")
+
+
+class BuildWatcher:
+    """Polls builds until they leave the PROCESSING state"""
+
+    def __init__(self, app_id=None, client=None,
+                 initial_interval=config.WATCH_INITIAL_INTERVAL,
+                 max_interval=config.WATCH_MAX_INTERVAL,
+                 factor=config.WATCH_BACKOFF_FACTOR,
+                 sleep=time.sleep):
+        self.app_id = app_id or config.APP_ID
+        self.client = client or get_client()
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.sleep = sleep
+
+    def intervals(self):
+        """Polling delays: initial, then growing by `factor` up to the ceiling"""
+        interval = self.initial_interval
+        while True:
+            yield interval
+            interval = min(self.max_interval, interval * self.factor)
+
+    def poll(self, build_ids):
+        """Fetch the current state of many builds with one request per 200 ids"""
+        ids = sorted(build_ids)
+        builds = {}
+        for start in range(0, len(ids), MAX_IDS_PER_REQUEST):
+            chunk = ids[start:start + MAX_IDS_PER_REQUEST]
+            query = (self.client.query('builds')
+                     .filter('id', *chunk)
+                     .fields('builds', *WATCH_FIELDS)
+                     .limit(len(chunk))
+                     .uncached())
+            for build in query.records(Build):
+                builds[build.id] = build
+        return builds
+
+    def _resolve_versions(self, versions):
+        """Map build numbers to build ids once the builds show up in the API"""
+        return build_ids_by_version(versions, app_id=self.app_id, client=self.client,
+                                    cache=False)
+
+    def watch(self, build_ids=(), versions=(), timeout=None):
+        """Yield each Build record as soon as it reaches a terminal state
+
+        A timeout of None or 0 waits forever, as ASC_WATCH_TIMEOUT=0 does.
+        """
+        pending = set(build_ids)
+        unresolved = {str(version) for version in versions}
+        deadline = time.monotonic() + timeout if timeout else None
+        index = get_index(self.app_id)
+
+        for interval in self.intervals():
+            if unresolved:
+                for version, build_id in self._resolve_versions(unresolved).items():
+                    unresolved.discard(version)
+                    pending.add(build_id)
+
+            if pending:
+                for build_id, build in self.poll(pending).items():
+                    if build.processing_state in TERMINAL_PROCESSING_STATES:
+                        pending.discard(build_id)
+                        index.record_build(build)
+                        yield build
+
+            if not pending and not unresolved:
+                return
+            if deadline is not None and time.monotonic() + interval > deadline:
+                raise WatchTimeout(pending | unresolved)
+            self.sleep(interval)
+
+    def wait(self, build_ids=(), versions=(), timeout=None):
+        """Block until every build is terminal; returns {build_id: processingState}"""
+        return {build.id: build.processing_state
+                for build in self.watch(build_ids, versions, timeout)}
+
+
+def wait_for_builds(build_ids=(), versions=(), app_id=None, timeout=config.WATCH_TIMEOUT):
+    """Wait for builds, printing each one as it finishes; True if all are VALID
+
+    Raises WatchTimeout when some are still processing after timeout seconds.
+    """
+    ok = True
+    for build in BuildWatcher(app_id=app_id).watch(build_ids, versions, timeout):
+        state = build.processing_state
+        icon = '✅' if state == 'VALID' else '❌'
+        print(f"{icon} בילד {build.version} ({build.id}): {state}")
+        ok = ok and state == 'VALID'
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wait for builds to finish processing")
+    parser.add_argument('build_ids', nargs='*')
+    parser.add_argument('--version', action='append', dest='versions', default=[],
+                        help="build number to watch (repeatable)")
+    parser.add_argument('--app-id', default=config.APP_ID)
+    parser.add_argument('--timeout', type=float, default=config.WATCH_TIMEOUT,
+                        help="give up after this many seconds, 0 waits forever "
+                             "(default: ASC_WATCH_TIMEOUT)")
+    args = parser.parse_args(argv)
+
+    if not args.build_ids and not args.versions:
+        parser.error("give at least one build id or --version")
+    try:
+        ok = wait_for_builds(args.build_ids, args.versions, args.app_id, args.timeout)
+    except WatchTimeout as e:
+        print(f"⏰ {e}")
+        return 2
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,298 @@
+"""
+Incremental Flutter web builds.
+
+build.sh and build_for_netlify.sh used to `flutter clean` and rebuild both
+web apps from scratch on every run. Each app's build is now keyed by a
+fingerprint of everything that goes into it: its lib/, web/, pubspec.yaml,
+pubspec.lock and declared assets, the lib/ and pubspec.yaml of every path
+dependency (shared_core), the build arguments and FLUTTER_VERSION. A
+successful build/web is stored under WEB_BUILD_CACHE_DIR/<app>/<fingerprint>;
+when the fingerprint is already there the cached output is restored instead
+of building, and an app whose build/web already matches is left alone. Apps
+that do need building are built at the same time, each in its own flutter
+process.
+
+With --restore-only nothing is built and the exit status is 1 when some app
+needs a build, so a deploy that only touched landing-page/ can skip
+downloading Flutter altogether.
+
+Usage:
+    python3 -m release.webbuild [user-app admin-app] [--force] [--clean] [--jobs 2]
+    python3 -m release.webbuild admin-app --restore-only
+"""
+
+import argparse
+import os
+import shutil
+import time
+from pathlib import Path
+
+from . import config
+from .jobs import JobQueue, run_streamed
+from .pipeline import digest, file_digest
+
+# Inputs of every app, and of the packages it depends on by path
+APP_INPUTS = ('lib', 'web', 'pubspec.yaml', 'pubspec.lock')
+PACKAGE_INPUTS = ('lib', 'pubspec.yaml')
+IGNORED_NAMES = frozenset({'.dart_tool', 'build', '.DS_Store', '.idea', '__pycache__'})
+# Where the app's current build/web came from (kept outside the deployed tree)
+FINGERPRINT_FILE = '.web_fingerprint'
+
+
+class WebApp:
+    """One Flutter web app of the repo and how it is built"""
+
+    def __init__(self, name, base_href):
+        self.name = name
+        self.base_href = base_href
+
+    def directory(self, root=config.REPO_ROOT):
+        return root / self.name
+
+    def output(self, root=config.REPO_ROOT):
+        return self.directory(root) / 'build' / 'web'
+
+    def build_command(self, verbose=False):
+        command = ['flutter', 'build', 'web', '--release', f'--base-href={self.base_href}']
+        return command + ['--verbose'] if verbose else command
+
+    def inputs(self, root=config.REPO_ROOT):
+        """Every file the web build reads from the repo"""
+        app_dir = self.directory(root)
+        _, assets = pubspec_paths(app_dir / 'pubspec.yaml')
+        paths = [app_dir / name for name in APP_INPUTS]
+        paths += [app_dir / asset for asset in assets]
+        for package in path_dependencies(app_dir):
+            paths += [package / name for name in PACKAGE_INPUTS]
+        return sorted(set(_files(paths)))
+
+    def fingerprint(self, root=config.REPO_ROOT):
+        """Digest of the inputs' contents, the build arguments and the Flutter version"""
+        files = self.inputs(root)
+        digests = file_digest(*files)
+        return digest({
+            'files': {os.path.relpath(path, root): digests[str(path)] for path in files},
+            'command': self.build_command(),
+            'flutter': os.environ.get('FLUTTER_VERSION'),
+        })
+
+
+APPS = {
+    'user-app': WebApp('user-app', '/'),
+    'admin-app': WebApp('admin-app', '/admin/'),
+}
+
+
+def _files(paths):
+    for path in paths:
+        if path.is_file():
+            yield path
+        elif path.is_dir():
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(name for name in dirnames if name not in IGNORED_NAMES)
+                for filename in filenames:
+                    if filename not in IGNORED_NAMES:
+                        yield Path(directory, filename)
+
+
+def _unquote(value):
+    return value.strip().strip('"\'')
+
+
+def pubspec_paths(pubspec):
+    """(path dependencies, declared assets and fonts) of a pubspec.yaml
+
+    Only the handful of keys that point at files are read, so this does not
+    need a YAML parser.
+    """
+    dependencies, assets = [], []
+    try:
+        with open(pubspec, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return dependencies, assets
+
+    assets_indent = None
+    for line in lines:
+        line = line.split(' #', 1)[0].rstrip()
+        content = line.lstrip()
+        if not content or content.startswith('#'):
+            continue
+        indent = len(line) - len(content)
+        if assets_indent is not None:
+            if indent > assets_indent and content.startswith('-'):
+                assets.append(_unquote(content[1:]))
+                continue
+            assets_indent = None
+
+        key, _, value = content.lstrip('- ').partition(':')
+        if key == 'assets' and not value.strip():
+            assets_indent = indent
+        elif key == 'asset' and value.strip():
+            assets.append(_unquote(value))
+        elif key == 'path' and value.strip():
+            dependencies.append(_unquote(value))
+    return dependencies, assets
+
+
+def path_dependencies(app_dir):
+    """Directories of the packages an app depends on by path, transitively"""
+    found = []
+    pending = [app_dir]
+    while pending:
+        package = pending.pop()
+        dependencies, _ = pubspec_paths(package / 'pubspec.yaml')
+        for dependency in dependencies:
+            dependency = (package / dependency).resolve()
+            if dependency not in found and (dependency / 'pubspec.yaml').is_file():
+                found.append(dependency)
+                pending.append(dependency)
+    return found
+
+
+class WebBuildCache:
+    """Built build/web trees, one directory per app and fingerprint"""
+
+    def __init__(self, cache_dir=None, keep=config.WEB_BUILD_CACHE_KEEP):
+        self.cache_dir = cache_dir or config.WEB_BUILD_CACHE_DIR
+        self.keep = keep
+
+    def entry(self, app, fingerprint):
+        return self.cache_dir / app.name / fingerprint
+
+    def has(self, app, fingerprint):
+        return self.entry(app, fingerprint).is_dir()
+
+    def restore(self, app, fingerprint, root=config.REPO_ROOT):
+        """Replace the app's build/web with the cached output"""
+        entry = self.entry(app, fingerprint)
+        output = app.output(root)
+        shutil.rmtree(output, ignore_errors=True)
+        shutil.copytree(entry, output)
+        os.utime(entry)
+        write_fingerprint(app, fingerprint, root)
+
+    def store(self, app, fingerprint, root=config.REPO_ROOT):
+        """Copy a fresh build/web into the cache and drop the oldest entries"""
+        entry = self.entry(app, fingerprint)
+        tmp = entry.with_name(f"{entry.name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(app.output(root), tmp)
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            # Another build stored the same fingerprint first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.prune(app)
+
+    def prune(self, app):
+        entries = [path for path in (self.cache_dir / app.name).iterdir()
+                   if path.is_dir() and '.tmp-' not in path.name]
+        entries.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+        for stale in entries[self.keep:]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def current_fingerprint(app, root=config.REPO_ROOT):
+    """Fingerprint the app's build/web was built or restored from, or None"""
+    if not app.output(root).is_dir():
+        return None
+    try:
+        with open(app.output(root).parent / FINGERPRINT_FILE, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_fingerprint(app, fingerprint, root=config.REPO_ROOT):
+    path = app.output(root).parent / FINGERPRINT_FILE
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        f.write(fingerprint + '\n')
+    os.replace(tmp, path)
+
+
+def flutter_build(app, root=config.REPO_ROOT, clean=False, verbose=False):
+    """pub get and build web for one app, output prefixed with its name"""
+    commands = [['flutter', 'clean']] if clean else []
+    commands += [['flutter', 'pub', 'get'], app.build_command(verbose)]
+    for command in commands:
+        result = run_streamed(command, cwd=app.directory(root),
+                              on_line=lambda line: print(f"   [{app.name}] {line}"))
+        if not result.ok:
+            print(f"❌ {app.name}: {' '.join(command)} failed (exit {result.returncode})")
+            return False
+    return True
+
+
+def build_web_apps(apps, root=config.REPO_ROOT, cache=None, force=False, clean=False,
+                   restore_only=False, jobs=2, verbose=False):
+    """Bring every app's build/web up to date; True when all of them are"""
+    cache = cache or WebBuildCache()
+    missing = []
+    for app in apps:
+        started = time.monotonic()
+        fingerprint = app.fingerprint(root)
+        if not force and current_fingerprint(app, root) == fingerprint:
+            print(f"✅ {app.name}: build/web is up to date ({fingerprint[:12]})")
+        elif not force and cache.has(app, fingerprint):
+            cache.restore(app, fingerprint, root)
+            print(f"♻️  {app.name}: restored from the build cache ({fingerprint[:12]}, "
+                  f"{time.monotonic() - started:.1f}s)")
+        else:
+            missing.append((app, fingerprint))
+
+    if not missing:
+        return True
+    if restore_only:
+        for app, fingerprint in missing:
+            print(f"🔨 {app.name}: needs a build ({fingerprint[:12]})")
+        return False
+
+    if shutil.which('flutter') is None:
+        print("❌ Flutter is not installed. Please install Flutter first.")
+        return False
+
+    def build(app, fingerprint):
+        # A failed build must not leave build/web looking up to date
+        (app.output(root).parent / FINGERPRINT_FILE).unlink(missing_ok=True)
+        if not flutter_build(app, root, clean, verbose):
+            return False
+        # The sources may have changed while flutter was running
+        if app.fingerprint(root) == fingerprint:
+            cache.store(app, fingerprint, root)
+            write_fingerprint(app, fingerprint, root)
+        return True
+
+    queue = JobQueue(max_workers=jobs)
+    for app, fingerprint in missing:
+        print(f"🔨 {app.name}: building ({fingerprint[:12]})...")
+        queue.add(app.name, lambda app=app, fingerprint=fingerprint: build(app, fingerprint))
+    ok = queue.run()
+    print(queue.summary())
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Flutter web apps incrementally")
+    parser.add_argument('apps', nargs='*', metavar='APP',
+                        help=f"apps to build (default: all of {', '.join(APPS)})")
+    parser.add_argument('--force', action='store_true', help="build even when cached")
+    parser.add_argument('--clean', action='store_true', help="run flutter clean first")
+    parser.add_argument('--restore-only', action='store_true',
+                        help="never build; exit 1 when an app needs a build")
+    parser.add_argument('--jobs', type=int, default=2, help="apps built at the same time")
+    parser.add_argument('--verbose', action='store_true', help="flutter build --verbose")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.apps) - set(APPS))
+    if unknown:
+        parser.error(f"unknown apps: {', '.join(unknown)}")
+
+    apps = [APPS[name] for name in (args.apps or APPS)]
+    ok = build_web_apps(apps, force=args.force, clean=args.clean,
+                        restore_only=args.restore_only, jobs=args.jobs, verbose=args.verbose)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,29 @@
+"""
+Test setup: every run gets its own cache directory and signing key, and
+nothing is sent to telemetry or a token agent. release.config reads the
+environment once at import, so this has to happen before release is
+imported.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+_scratch = Path(tempfile.mkdtemp(prefix='release-tests-'))
+os.environ.update(
+    ASC_CACHE_DIR=str(_scratch / 'cache'),
+    ASC_KEY_PATH=str(_scratch / 'AuthKey_TEST.p8'),
+    ASC_TOKEN_CACHE=str(_scratch / 'token.json'),
+    ASC_AGENT_SOCKET=str(_scratch / 'agent.sock'),
+    ASC_AGENT_AUTOSTART='0',
+    ASC_TELEMETRY='0',
+    ASC_RESPONSE_CACHE='0',
+)
+
+from release.bench_startup import _write_test_key  # noqa: E402
+
+_write_test_key(os.environ['ASC_KEY_PATH'])
@@ -0,0 +1,104 @@
+"""Pipeline checkpoints: what is skipped, rerun or journaled on a second run"""
+
+import json
+
+from release.pipeline import Pipeline, StepJournal
+
+
+class Steps:
+    """Step functions that count their calls and can be made to fail"""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+
+    def __call__(self, name, result=None):
+        def func():
+            self.calls.append(name)
+            if name in self.failing:
+                return False
+            return result if result is not None else f"{name}-result"
+        return func
+
+
+def _pipeline(tmp_path, steps, inputs='v1', confirm=None, force=False):
+    pipeline = Pipeline('release-1', journal_dir=tmp_path, max_workers=2, force=force)
+    pipeline.step('build', steps('build'), inputs=inputs)
+    pipeline.step('upload', steps('upload'), inputs=lambda: 'ipa-digest',
+                  confirm=confirm, depends_on=['build'])
+    return pipeline
+
+
+def test_completed_steps_are_skipped_with_their_recorded_result(tmp_path):
+    steps = Steps()
+    assert _pipeline(tmp_path, steps).run()
+
+    rerun = _pipeline(tmp_path, steps)
+    assert rerun.run()
+    assert steps.calls == ['build', 'upload']
+    assert rerun.skipped == ['build', 'upload']
+    assert rerun.result('upload') == 'upload-result'
+
+
+def test_run_resumes_at_the_first_failed_step(tmp_path):
+    steps = Steps()
+    steps.failing.add('upload')
+    assert not _pipeline(tmp_path, steps).run()
+    assert StepJournal('release-1', tmp_path).get('upload') is None
+
+    steps.failing.clear()
+    rerun = _pipeline(tmp_path, steps)
+    assert rerun.run()
+    assert steps.calls == ['build', 'upload', 'upload']
+    assert rerun.skipped == ['build']
+
+
+def test_changed_inputs_rerun_the_step_and_its_dependents(tmp_path):
+    steps = Steps()
+    assert _pipeline(tmp_path, steps, inputs='v1').run()
+
+    # build returns the same result, so upload's upstream is unchanged
+    assert _pipeline(tmp_path, steps, inputs='v2').run()
+    assert steps.calls == ['build', 'upload', 'build']
+
+    other = Steps()
+    pipeline = Pipeline('release-1', journal_dir=tmp_path)
+    pipeline.step('build', other('build', result='other-build'), inputs='v3')
+    pipeline.step('upload', other('upload'), inputs=lambda: 'ipa-digest', depends_on=['build'])
+    assert pipeline.run()
+    assert other.calls == ['build', 'upload']
+
+
+def test_step_is_rerun_when_its_effect_is_gone(tmp_path):
+    steps = Steps()
+    assert _pipeline(tmp_path, steps).run()
+
+    rerun = _pipeline(tmp_path, steps, confirm=lambda result: False)
+    assert rerun.run()
+    assert steps.calls == ['build', 'upload', 'upload']
+    assert rerun.skipped == ['build']
+
+
+def test_force_reruns_everything_and_a_failure_clears_the_journal(tmp_path):
+    steps = Steps()
+    assert _pipeline(tmp_path, steps).run()
+
+    steps.failing.add('build')
+    assert not _pipeline(tmp_path, steps, force=True).run()
+    assert steps.calls == ['build', 'upload', 'build']
+    journal = StepJournal('release-1', tmp_path)
+    assert journal.get('build') is None
+    assert 'build' not in json.loads(journal.path.read_text())
+
+
+def test_steps_without_checkpoint_always_run_and_are_not_journaled(tmp_path):
+    steps = Steps()
+    for _ in range(2):
+        pipeline = Pipeline('release-1', journal_dir=tmp_path)
+        pipeline.step('locate', steps('locate'), checkpoint=False)
+        pipeline.step('upload', steps('upload'), inputs=lambda: 'ipa-digest',
+                      depends_on=['locate'])
+        assert pipeline.run()
+
+    assert steps.calls == ['locate', 'upload', 'locate']
+    assert StepJournal('release-1', tmp_path).get('locate') is None
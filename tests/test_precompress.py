@@ -0,0 +1,70 @@
+"""Precompressed siblings: what is written, reused from the cache and removed"""
+
+import gzip
+
+import pytest
+
+from release.precompress import precompress
+
+# Compresses well and is above the default --min-size
+SCRIPT = b"console.log('zazadance');\n" * 200
+
+
+@pytest.fixture
+def site(tmp_path):
+    site = tmp_path / 'build'
+    (site / 'assets').mkdir(parents=True)
+    (site / 'main.dart.js').write_bytes(SCRIPT)
+    (site / 'assets' / 'AssetManifest.json').write_bytes(b'{"a": 1}' * 400)
+    (site / 'tiny.js').write_bytes(b'1;')
+    (site / 'logo.png').write_bytes(bytes(range(256)) * 20)
+    return site
+
+
+def _run(site, tmp_path, **kwargs):
+    return precompress(site, cache_dir=tmp_path / 'cache', encodings=['gzip'], jobs=2, **kwargs)
+
+
+def test_writes_gzip_siblings_for_compressible_files(site, tmp_path):
+    report, stats = _run(site, tmp_path)
+
+    assert gzip.decompress((site / 'main.dart.js.gz').read_bytes()) == SCRIPT
+    assert (site / 'assets' / 'AssetManifest.json.gz').is_file()
+    assert not (site / 'tiny.js.gz').exists()
+    assert not (site / 'logo.png.gz').exists()
+    assert set(report) == {site / 'main.dart.js', site / 'assets' / 'AssetManifest.json'}
+    assert stats == {'compressed': 2, 'cached': 0, 'removed': 0}
+
+
+def test_unchanged_files_come_from_the_cache(site, tmp_path):
+    _run(site, tmp_path)
+    (site / 'main.dart.js.gz').unlink()
+
+    _, stats = _run(site, tmp_path)
+    assert stats == {'compressed': 0, 'cached': 2, 'removed': 0}
+    assert (site / 'main.dart.js.gz').is_file()
+
+
+def test_siblings_of_deleted_or_shrunk_files_are_removed(site, tmp_path):
+    _run(site, tmp_path)
+    (site / 'main.dart.js').unlink()
+    (site / 'assets' / 'AssetManifest.json').write_bytes(b'{}')
+
+    _, stats = _run(site, tmp_path)
+    assert stats['removed'] == 2
+    assert not (site / 'main.dart.js.gz').exists()
+    assert not (site / 'assets' / 'AssetManifest.json.gz').exists()
+
+
+def test_compressed_files_it_did_not_write_are_left_alone(site, tmp_path):
+    shipped = site / 'assets' / 'data.json.gz'
+    shipped.write_bytes(gzip.compress(b'{}'))
+    below_min_size = site / 'tiny.js.gz'
+    below_min_size.write_bytes(gzip.compress(b'1;'))
+
+    _run(site, tmp_path)
+    _, stats = _run(site, tmp_path)
+
+    assert shipped.is_file()
+    assert below_min_size.is_file()
+    assert stats['removed'] == 0
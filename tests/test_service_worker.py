@@ -0,0 +1,101 @@
+"""Service-worker manifests: render/read_resources round trip and regeneration"""
+
+import hashlib
+
+import pytest
+
+from release.service_worker import (CORE_FILES, DigestCache, SERVICE_WORKER, read_resources,
+                                    render, update_service_worker)
+
+TEMPLATE = ''''use strict';
+const MANIFEST = 'flutter-app-manifest';
+const RESOURCES = {"index.html": "stale"};
+// The application shell files that are downloaded before a service worker can
+// start.
+const CORE = ["main.dart.js"];
+self.addEventListener("install", (event) => {});
+'''
+
+
+def _md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+@pytest.fixture
+def site(tmp_path):
+    files = {
+        'index.html': b'<html></html>',
+        'main.dart.js': b'main();',
+        'flutter_bootstrap.js': b'bootstrap();',
+        'canvaskit/canvaskit.wasm': b'\0asm',
+        'assets/FontManifest.json': b'[]',
+        'assets/images/logo.png': b'png',
+        # Not part of the manifest: precompressed siblings and another app
+        'main.dart.js.gz': b'gz',
+        'admin/index.html': b'<html>admin</html>',
+        f'admin/{SERVICE_WORKER}': TEMPLATE.encode(),
+    }
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / SERVICE_WORKER).write_text(TEMPLATE)
+    return tmp_path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DigestCache(tmp_path / 'digests.json')
+
+
+def test_render_then_read_resources_round_trips():
+    resources = {'/': 'a1', 'index.html': 'a1', 'assets/a "quoted" name.json': 'b2'}
+
+    script = render(TEMPLATE, resources, ['main.dart.js', 'index.html'])
+
+    assert read_resources(script) == resources
+    assert 'const CORE = ["main.dart.js",\n"index.html"];' in script
+    assert script.startswith("'use strict';") and script.endswith('(event) => {});\n')
+
+
+def test_read_resources_without_a_manifest_fails():
+    with pytest.raises(ValueError):
+        read_resources('self.addEventListener("fetch", () => {});')
+
+
+def test_update_lists_every_file_with_its_digest(site, cache):
+    changed, tiers = update_service_worker(site, cache)
+    resources = read_resources((site / SERVICE_WORKER).read_text())
+
+    assert changed
+    assert resources == {
+        '/': _md5(b'<html></html>'),
+        'index.html': _md5(b'<html></html>'),
+        'main.dart.js': _md5(b'main();'),
+        'flutter_bootstrap.js': _md5(b'bootstrap();'),
+        'canvaskit/canvaskit.wasm': _md5(b'\0asm'),
+        'assets/FontManifest.json': _md5(b'[]'),
+        'assets/images/logo.png': _md5(b'png'),
+    }
+    assert [entry['path'] for entry in tiers['core']] == [
+        path for path in CORE_FILES if path in resources]
+    assert [entry['path'] for entry in tiers['lazy']] == ['canvaskit/canvaskit.wasm']
+    assert [entry['path'] for entry in tiers['deferred']] == ['assets/images/logo.png']
+
+
+def test_second_update_is_a_no_op_and_uses_the_digest_cache(site, cache):
+    update_service_worker(site, cache)
+    hashed = cache.hashed
+
+    changed, _ = update_service_worker(site, cache)
+    assert not changed
+    assert cache.hashed == hashed
+
+
+def test_check_reports_a_changed_file_without_writing(site, cache):
+    update_service_worker(site, cache)
+    before = (site / SERVICE_WORKER).read_text()
+    (site / 'main.dart.js').write_bytes(b'main(2);')
+
+    changed, _ = update_service_worker(site, cache, check=True)
+    assert changed
+    assert (site / SERVICE_WORKER).read_text() == before
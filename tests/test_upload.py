@@ -0,0 +1,103 @@
+"""IpaUploader against release.mockserver: reserve, resume and commit"""
+
+import os
+import threading
+
+import pytest
+
+from release.client import AppStoreConnectClient
+from release.mockserver import MockAppStoreConnect
+from release.upload import IpaUploader, UploadError, UploadJournal
+
+PART_SIZE = 64 * 1024
+PARTS = 6
+
+
+@pytest.fixture
+def api():
+    with MockAppStoreConnect('127.0.0.1', part_size=PART_SIZE) as api:
+        yield api
+
+
+@pytest.fixture
+def uploader(api, tmp_path):
+    client = AppStoreConnectClient(base_url=api.base_url)
+    return IpaUploader(client=client, concurrency=4, chunk_retries=0,
+                       state_dir=tmp_path / 'uploads')
+
+
+@pytest.fixture
+def ipa(tmp_path):
+    path = tmp_path / 'Runner.ipa'
+    # Random content, so no earlier test's upload makes this one a duplicate
+    path.write_bytes(os.urandom(PART_SIZE * PARTS - 123))
+    return path
+
+
+def _builds(api, version):
+    return [resource for (kind, _), resource in api.resources.items()
+            if kind == 'builds' and resource['attributes']['version'] == version]
+
+
+def _record_puts(uploader):
+    """Offsets PUT by the uploader, successful or not"""
+    offsets = []
+    lock = threading.Lock()
+    put_chunk = uploader._put_chunk
+
+    def recording(view, operation):
+        with lock:
+            offsets.append(operation['offset'])
+        return put_chunk(view, operation)
+
+    uploader._put_chunk = recording
+    return offsets
+
+
+def test_upload_reserves_puts_every_chunk_and_commits(api, uploader, ipa):
+    offsets = _record_puts(uploader)
+
+    upload_id = uploader.upload(ipa, '931', '2.0.0')
+
+    assert upload_id is not None
+    assert sorted(offsets) == [part * PART_SIZE for part in range(PARTS)]
+    assert [len(parts) for parts in api.uploaded_parts.values()] == [PARTS]
+    assert _builds(api, '931')
+    assert not UploadJournal(ipa, uploader.state_dir).path.exists()
+
+
+def test_identical_ipa_is_not_uploaded_twice(api, uploader, ipa):
+    assert uploader.upload(ipa, '932', '2.0.0') is not None
+    offsets = _record_puts(uploader)
+
+    assert uploader.upload(ipa, '932', '2.0.0') is None
+    assert offsets == []
+
+
+def test_interrupted_upload_resumes_with_the_missing_chunks(api, uploader, ipa):
+    failing = 2 * PART_SIZE
+    put_chunk = uploader._put_chunk
+
+    def flaky(view, operation):
+        if operation['offset'] == failing:
+            raise UploadError(f"chunk at offset {failing} failed")
+        return put_chunk(view, operation)
+
+    uploader._put_chunk = flaky
+    with pytest.raises(UploadError):
+        uploader.upload(ipa, '933', '2.0.0')
+
+    # Chunks that finished after the failure are journaled too
+    journal = UploadJournal(ipa, uploader.state_dir)
+    assert journal.reservation() is not None
+    assert journal.done() == {part * PART_SIZE for part in range(PARTS)} - {failing}
+    assert not _builds(api, '933')
+
+    uploader._put_chunk = put_chunk
+    offsets = _record_puts(uploader)
+    upload_id = uploader.upload(ipa, '933', '2.0.0')
+
+    assert upload_id == journal.reservation()['build_upload_id']
+    assert offsets == [failing]
+    assert _builds(api, '933')
+    assert not journal.path.exists()
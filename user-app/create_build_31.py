@@ -1,41 +1,28 @@
 #!/usr/bin/env python3
 
-import requests
-import jwt
-import time
-import json
+import sys
+from pathlib import Path
 
-# App Store Connect API credentials  
-KEY_ID = "496SGT8GNA"
-ISSUER_ID = "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1"
-KEY_PATH = "/Users/rontzarfati/.private_keys/AuthKey_496SGT8GNA.p8"
-APP_ID = "7078329715"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def generate_token():
-    with open(KEY_PATH, 'r') as f:
-        private_key = f.read()
-    
-    headers = {
-        'kid': KEY_ID,
-        'typ': 'JWT', 
-        'alg': 'ES256'
-    }
-    
-    payload = {
-        'iss': ISSUER_ID,
-        'exp': int(time.time()) + 1200,
-        'aud': 'appstoreconnect-v1'
-    }
-    
-    return jwt.encode(payload, private_key, algorithm='ES256', headers=headers)
+from release import config
+from release.client import get_client
+from release.index import get_index
+from release.notes import push_release_notes
+from release.watch import WatchTimeout, wait_for_builds
+
+# App Store Connect API credentials
+KEY_ID = config.KEY_ID
+ISSUER_ID = config.ISSUER_ID
+APP_ID = config.APP_ID
 
 def create_build():
     """יצירת בילד 31 חדש באפסטור קונקט"""
-    token = generate_token()
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    # לא ליצור שוב בילד שכבר קיים (הרצה חוזרת אחרי כשל)
+    existing = get_index(APP_ID).build_by_version('31')
+    if existing:
+        print(f"✅ בילד 31 כבר קיים (ID: {existing['id']}), מדלג על היצירה")
+        return {'data': existing}
     
     # נתונים לבילד 31
     build_data = {
@@ -46,22 +33,6 @@ def create_build():
                 "uploadedDate": "2025-01-09T22:00:00+00:00",
                 "processingState": "PROCESSING",
                 "buildAudienceType": "INTERNAL_ONLY",
-                "whatsNew": """בילד 31 - תיקונים מלאים:
-
-✅ תוקנה לחלוטין שגיאת Google Sign-In (AuthApiException nonce)
-- החלפה ל-OAuth flow במקום ID token
-- הסרת serverClientId הבעייתי
-- מנגנון fallback מובנה
-
-✅ נוסף כפתור מחיקת חשבון באיזור האישי
-- כפתור אדום עם double confirmation
-- מחיקה מלאה של כל נתוני המשתמש
-
-✅ תוקנה שגיאת מסד נתונים
-- תיקון הפניה לטבלת profiles→users
-- תיקון שגיאת PostgreSQL
-
-כל הבעיות מהבילדים 27-30 נפתרו!""",
                 "minOsVersion": "12.0"
             },
             "relationships": {
@@ -75,8 +46,7 @@ def create_build():
         }
     }
     
-    url = "https://api.appstoreconnect.apple.com/v1/builds"
-    response = requests.post(url, headers=headers, data=json.dumps(build_data))
+    response = get_client().post("builds", build_data)
     
     if response.status_code in [200, 201]:
         print("✅ בילד 31 נוצר בהצלחה!")
@@ -87,34 +57,18 @@ def create_build():
         return None
 
 def update_build_to_ready(build_id):
-    """עדכון סטטוס הבילד ל-Ready to Submit"""
-    token = generate_token()
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    """המתנה עד שאפל מסיימת לעבד את הבילד (Apple sets processingState itself)"""
+    print("⏳ ממתין לסיום עיבוד הבילד...")
     
-    update_data = {
-        "data": {
-            "type": "builds",
-            "id": build_id,
-            "attributes": {
-                "processingState": "VALID",
-                "buildAudienceType": "APP_STORE_ELIGIBLE"
-            }
-        }
-    }
-    
-    url = f"https://api.appstoreconnect.apple.com/v1/builds/{build_id}"
-    response = requests.patch(url, headers=headers, data=json.dumps(update_data))
-    
-    if response.status_code == 200:
-        print("✅ בילד 31 מוכן לבדיקה!")
-        return True
-    else:
-        print(f"❌ שגיאה בעדכון סטטוס: {response.status_code}")
-        print(response.text)
+    try:
+        if wait_for_builds([build_id], app_id=APP_ID):
+            print("✅ בילד 31 מוכן לבדיקה!")
+            return True
+    except WatchTimeout as e:
+        print(f"⏰ הבילד לא סיים עיבוד בזמן ({e})")
         return False
+    print("❌ עיבוד הבילד נכשל")
+    return False
 
 if __name__ == "__main__":
     print("🚀 יוצר בילד 31 באפסטור קונקט...")
@@ -126,10 +80,12 @@ if __name__ == "__main__":
         build_id = result['data']['id']
         print(f"📱 בילד נוצר עם ID: {build_id}")
         
-        # עדכון סטטוס
-        time.sleep(2)  # המתנה קצרה
-        update_build_to_ready(build_id)
-        
-        print("🎉 בילד 31 מוכן לבדיקה בTestFlight!")
+        # המתנה לעיבוד
+        if update_build_to_ready(build_id):
+            push_release_notes('31', app_id=APP_ID)
+            print("🎉 בילד 31 מוכן לבדיקה בTestFlight!")
+        else:
+            sys.exit(1)
     else:
-        print("❌ נכשל ביצירת הבילד")
\ No newline at end of file
+        print("❌ נכשל ביצירת הבילד")
+        sys.exit(1)
\ No newline at end of file
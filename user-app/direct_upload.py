@@ -1,37 +1,42 @@
 #!/usr/bin/env python3
 
 import subprocess
-import requests
-import jwt
 import time
-import json
-import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from release import config
+from release.client import get_client
+from release.index import get_index
+from release.notes import push_release_notes
+from release.watch import WatchTimeout, wait_for_builds
 
 # App Store Connect API credentials
-KEY_ID = "496SGT8GNA"
-ISSUER_ID = "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1"
-KEY_PATH = "/Users/rontzarfati/.private_keys/AuthKey_496SGT8GNA.p8"
-APP_ID = "7078329715"
+KEY_ID = config.KEY_ID
+ISSUER_ID = config.ISSUER_ID
+APP_ID = config.APP_ID
 
-def generate_token():
-    with open(KEY_PATH, 'r') as f:
-        private_key = f.read()
-    
-    headers = {'kid': KEY_ID, 'alg': 'ES256'}
-    payload = {
-        'iss': ISSUER_ID,
-        'iat': int(time.time()),
-        'exp': int(time.time()) + 600,  # 10 minutes
-        'aud': 'appstoreconnect-v1'
-    }
-    
-    return jwt.encode(payload, private_key, algorithm='ES256', headers=headers)
+def wait_until_processed(build_id):
+    """Wait for Apple to finish processing a build; False on failure or timeout"""
+    try:
+        return wait_for_builds([build_id], app_id=APP_ID)
+    except WatchTimeout as e:
+        print(f"⏰ הבילד לא סיים עיבוד בזמן ({e})")
+        return False
 
 def direct_upload_build_31():
     """Upload Build 31 directly using App Store Connect API"""
     
     print("🚀 מעלה בילד 31 ישירות לApp Store Connect...")
     
+    # A re-run after a failure must not create Build 31 a second time
+    existing = get_index(APP_ID).build_by_version('31')
+    if existing:
+        print(f"✅ בילד 31 כבר קיים (ID: {existing['id']})")
+        return wait_until_processed(existing['id'])
+    
     # Create IPA using existing successful method
     print("📦 יוצר IPA...")
     
@@ -51,12 +56,8 @@ def direct_upload_build_31():
         print("⬆️ מעלה לApp Store Connect...")
         
         # Use App Store Connect API directly to create build entry
-        token = generate_token()
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        
+        client = get_client()
+
         # Create build metadata
         build_data = {
             "data": {
@@ -68,13 +69,7 @@ def direct_upload_build_31():
                     "expired": False,
                     "processingState": "PROCESSING",
                     "uploadedDate": time.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
-                    "usesNonExemptEncryption": False,
-                    "whatsNew": """בילד 31 - תיקונים מלאים:
-
-✅ תוקנה לחלוטין שגיאת Google Sign-In (AuthApiException nonce)
-✅ נוסף כפתור מחיקת חשבון באיזור האישי  
-✅ תוקנה שגיאת מסד נתונים PostgreSQL
-✅ כל הבעיות מבילדים 27-30 נפתרו!"""
+                    "usesNonExemptEncryption": False
                 },
                 "relationships": {
                     "app": {
@@ -85,37 +80,16 @@ def direct_upload_build_31():
         }
         
         # Post to App Store Connect
-        response = requests.post(
-            'https://api.appstoreconnect.apple.com/v1/builds',
-            headers=headers,
-            json=build_data,
-            timeout=60
-        )
+        response = client.post('builds', build_data)
         
         if response.status_code in [200, 201]:
             print("✅ בילד 31 נוצר בApp Store Connect!")
             result = response.json()
             build_id = result['data']['id']
             
-            # Update to Ready state
-            update_data = {
-                "data": {
-                    "type": "builds",
-                    "id": build_id,
-                    "attributes": {
-                        "processingState": "VALID"
-                    }
-                }
-            }
-            
-            update_response = requests.patch(
-                f'https://api.appstoreconnect.apple.com/v1/builds/{build_id}',
-                headers=headers,
-                json=update_data,
-                timeout=30
-            )
-            
-            if update_response.status_code == 200:
+            # Apple sets processingState itself; wait for it to finish
+            print("⏳ ממתין לסיום עיבוד הבילד...")
+            if wait_until_processed(build_id):
                 print("🎉 בילד 31 מוכן לבדיקה!")
                 return True
             
@@ -134,63 +108,39 @@ def direct_upload_build_31():
 def copy_build_30_as_31():
     """Copy Build 30 and modify to Build 31"""
     
-    token = generate_token()
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
-    
+    client = get_client()
+
     try:
-        # Get Build 30
-        response = requests.get(
-            f'https://api.appstoreconnect.apple.com/v1/apps/{APP_ID}/builds',
-            headers=headers,
-            timeout=30
-        )
+        if get_index(APP_ID).build_by_version('31'):
+            print("✅ בילד 31 כבר קיים")
+            return True
         
-        if response.status_code == 200:
-            builds = response.json()
-            
-            build_30 = None
-            for build in builds.get('data', []):
-                if build['attributes']['version'] == '30':
-                    build_30 = build
-                    break
-            
-            if build_30:
-                print("📋 מעתיק מבילד 30...")
-                
-                # Create new build based on 30
-                new_build = {
-                    "data": {
-                        "type": "builds",
-                        "attributes": {
-                            "version": "31",
-                            "whatsNew": """בילד 31 - תיקונים מלאים:
+        # Get Build 30
+        build_30 = get_index(APP_ID).build_by_version('30')
 
-✅ תוקנה לחלוטין שגיאת Google Sign-In 
-✅ נוסף כפתור מחיקת חשבון באיזור האישי  
-✅ תוקנה שגיאת מסד הנתונים
-✅ כל הבעיות נפתרו!""",
-                            "processingState": "VALID",
-                            "usesNonExemptEncryption": False
-                        },
-                        "relationships": {
-                            "app": {"data": {"type": "apps", "id": APP_ID}}
-                        }
+        if build_30:
+            print("📋 מעתיק מבילד 30...")
+            
+            # Create new build based on 30
+            new_build = {
+                "data": {
+                    "type": "builds",
+                    "attributes": {
+                        "version": "31",
+                        "processingState": "VALID",
+                        "usesNonExemptEncryption": False
+                    },
+                    "relationships": {
+                        "app": {"data": {"type": "apps", "id": APP_ID}}
                     }
                 }
-                
-                create_response = requests.post(
-                    'https://api.appstoreconnect.apple.com/v1/builds',
-                    headers=headers,
-                    json=new_build,
-                    timeout=60
-                )
-                
-                if create_response.status_code in [200, 201]:
-                    print("✅ בילד 31 נוצר בהצלחה!")
-                    return True
+            }
+            
+            create_response = client.post('builds', new_build)
+            
+            if create_response.status_code in [200, 201]:
+                print("✅ בילד 31 נוצר בהצלחה!")
+                return True
                     
         print("❌ לא הצלחתי למצוא בילד 30")
         return False
@@ -203,8 +153,11 @@ if __name__ == "__main__":
     success = direct_upload_build_31()
     
     if success:
+        # What to Test notes, per locale, from app-store-assets/release-notes/31.json
+        push_release_notes('31', app_id=APP_ID)
         print("\n🎉 בילד 31 זמין בApp Store Connect!")
         print("📱 בדוק בTestFlight - הבילד כולל את כל התיקונים")
     else:
         print("\n❌ לא הצלחתי ליצור בילד 31")
-        print("💡 נסה דרך Xcode ידנית")
\ No newline at end of file
+        print("💡 נסה דרך Xcode ידנית")
+        sys.exit(1)
\ No newline at end of file
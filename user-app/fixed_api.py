@@ -1,62 +1,25 @@
 #!/usr/bin/env python3
 
-import requests
-import jwt
-import time
-import json
+import sys
+from pathlib import Path
 
-# Correct App Store Connect API credentials
-KEY_ID = "496SGT8GNA"
-ISSUER_ID = "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1" 
-KEY_PATH = "/Users/rontzarfati/.private_keys/AuthKey_496SGT8GNA.p8"
-APP_ID = "7078329715"
-BUNDLE_ID = "com.sharonstudio.app.danceStudioApp"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def generate_token():
-    """Generate proper JWT token for App Store Connect API"""
-    with open(KEY_PATH, 'r') as f:
-        private_key = f.read()
-    
-    # Correct JWT headers
-    headers = {
-        'kid': KEY_ID,
-        'alg': 'ES256',
-        'typ': 'JWT'
-    }
-    
-    # Correct payload with proper timing
-    payload = {
-        'iss': ISSUER_ID,
-        'iat': int(time.time()),
-        'exp': int(time.time()) + 1200,  # 20 minutes
-        'aud': 'appstoreconnect-v1'
-    }
-    
-    # Generate token
-    token = jwt.encode(payload, private_key, algorithm='ES256', headers=headers)
-    return token
+from release import config
+from release.client import get_client
+from release.index import get_index
+from release.notes import push_release_notes
+
+# App Store Connect API credentials
+KEY_ID = config.KEY_ID
+ISSUER_ID = config.ISSUER_ID
+APP_ID = config.APP_ID
+BUNDLE_ID = config.BUNDLE_ID
 
 def get_builds():
-    """Get current builds from App Store Connect"""
-    token = generate_token()
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
-    
-    url = f"https://api.appstoreconnect.apple.com/v1/apps/{APP_ID}/builds"
-    
+    """Get all builds (local index, synced incrementally from App Store Connect)"""
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        print(f"Response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error response: {response.text}")
-            return None
-            
+        return get_index(APP_ID).builds()
     except Exception as e:
         print(f"Request failed: {e}")
         return None
@@ -64,21 +27,16 @@ def get_builds():
 def duplicate_build_30_as_31():
     """Copy Build 30 and create Build 31 with our fixes"""
     
-    print("🔍 מחפש את הבילדים הקיימים...")
-    builds = get_builds()
-    
-    if not builds or 'data' not in builds:
-        print("❌ לא הצלחתי לקבל את רשימת הבילדים")
+    print("🔍 מחפש את בילד 30...")
+    try:
+        existing = get_index(APP_ID).build_by_version('31')
+        if existing:
+            print(f"✅ בילד 31 כבר קיים - ID: {existing['id']}")
+            return True
+        build_30 = get_index(APP_ID).build_by_version('30')
+    except Exception as e:
+        print(f"❌ לא הצלחתי לקבל את רשימת הבילדים: {e}")
         return False
-        
-    print(f"📱 נמצאו {len(builds['data'])} בילדים")
-    
-    # מצא בילד 30
-    build_30 = None
-    for build in builds['data']:
-        if build['attributes']['version'] == '30':
-            build_30 = build
-            break
             
     if not build_30:
         print("❌ לא נמצא בילד 30")
@@ -87,35 +45,12 @@ def duplicate_build_30_as_31():
     print(f"✅ נמצא בילד 30 - ID: {build_30['id']}")
     
     # יצור בילד 31 בהתבסס על בילד 30
-    token = generate_token()
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
-    
     # נתונים לבילד 31 החדש
     new_build_data = {
         "data": {
             "type": "builds",
             "attributes": {
                 "version": "31",
-                "whatsNew": """בילד 31 - תיקונים מלאים:
-
-✅ תוקנה לחלוטין שגיאת Google Sign-In 
-- החלפה מ-signInWithIdToken ל-signInWithOAuth
-- הסרת serverClientId הבעייתי שגרם לnonce error
-- מנגנון fallback מתקדם
-
-✅ נוסף כפתור מחיקת חשבון באיזור האישי
-- כפתור אדום בולט עם double confirmation
-- מחיקה מלאה של כל נתוני המשתמש ותמונות
-
-✅ תוקנה שגיאת מסד הנתונים PostgreSQL
-- תיקון הפניה מטבלת profiles ל-users
-- פתרון שגיאת "table not found"
-
-כל הבעיות מבילדים 27-30 נפתרו במלואן!""",
                 "minOsVersion": "12.0"
             },
             "relationships": {
@@ -130,10 +65,8 @@ def duplicate_build_30_as_31():
     }
     
     # POST ליצירת בילד חדש
-    create_url = "https://api.appstoreconnect.apple.com/v1/builds"
-    
     try:
-        response = requests.post(create_url, headers=headers, data=json.dumps(new_build_data), timeout=30)
+        response = get_client().post("builds", new_build_data)
         print(f"Create response status: {response.status_code}")
         
         if response.status_code in [200, 201]:
@@ -155,6 +88,7 @@ if __name__ == "__main__":
     success = duplicate_build_30_as_31()
     
     if success:
+        push_release_notes('31', app_id=APP_ID)
         print("🎉 בילד 31 הוכן בהצלחה!")
         print("📱 בדוק בApp Store Connect ו-TestFlight")
     else:
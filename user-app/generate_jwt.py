@@ -1,36 +1,20 @@
 #!/usr/bin/env python3
 
-import jwt
-import time
-from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from release import config
+from release.agent import get_token
 
 # App Store Connect API credentials
-KEY_ID = "496SGT8GNA"
-ISSUER_ID = "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1"
-KEY_PATH = "/Users/rontzarfati/.private_keys/AuthKey_496SGT8GNA.p8"
+KEY_ID = config.KEY_ID
+ISSUER_ID = config.ISSUER_ID
 
 def generate_token():
-    # Read private key
-    with open(KEY_PATH, 'r') as f:
-        private_key = f.read()
-    
-    # JWT header
-    headers = {
-        'kid': KEY_ID,
-        'typ': 'JWT',
-        'alg': 'ES256'
-    }
-    
-    # JWT payload
-    payload = {
-        'iss': ISSUER_ID,
-        'exp': int(time.time()) + 1200,  # 20 minutes
-        'aud': 'appstoreconnect-v1'
-    }
-    
-    # Generate token
-    token = jwt.encode(payload, private_key, algorithm='ES256', headers=headers)
-    return token
+    """Return a token from the local token agent (signed in-process as a fallback)"""
+    return get_token()
 
 if __name__ == "__main__":
     token = generate_token()
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 
 import subprocess
+import sys
 import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from release.notes import load_release_notes
 
 print("🔄 מעדכן את Build 30 להיות Build 31...")
 
@@ -20,15 +26,11 @@ def update_via_github():
     print("1. בחר Build 30")
     print("2. לחץ על 'Edit Build Details'") 
     print("3. שנה את Version Number ל-31")
-    print("4. עדכן את What's New ל:")
-    print("""
-בילד 31 - תיקונים מלאים:
-
-✅ תוקנה לחלוטין שגיאת Google Sign-In (AuthApiException nonce)
-✅ נוסף כפתור מחיקת חשבון באיזור האישי  
-✅ תוקנה שגיאת מסד נתונים PostgreSQL
-✅ כל הבעיות מבילדים 27-30 נפתרו!
-    """)
+    print("4. עדכן את What to Test ל:")
+    # Same notes `python3 -m release notes 31` pushes to every locale
+    print()
+    print(load_release_notes('31')['he'])
+    print()
     print("5. שמור את השינויים")
     
     return True
@@ -3,34 +3,40 @@
 import subprocess
 import os
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from release import config
+from release.artifacts import find_artifact, read_ipa_info
+from release.client import AppStoreConnectError
+from release.fingerprint import get_cache as get_fingerprint_cache
+from release.jobs import run_streamed
+from release.metadata import sync_metadata
+from release.pipeline import Pipeline, file_digest
+from release.upload import IpaUploader, UploadError
 
 # App Store Connect credentials
-API_KEY_ID = "496SGT8GNA"
-API_ISSUER_ID = "69a6de8f-cc07-47e3-e053-5b8c7c11a4d1"
+API_KEY_ID = config.KEY_ID
+API_ISSUER_ID = config.ISSUER_ID
 
-def find_existing_ipa():
-    """Find any existing IPA file"""
+def find_existing_ipa(version=None, short_version=None, exclude=None):
+    """Find the newest existing IPA, optionally for a specific version and build number"""
     
-    # Search in build directories
+    # Indexed scan of the project (build dirs included, web/Pods/canvaskit pruned)
     search_paths = [
-        "./build",
-        "../build", 
-        "./ios/build",
-        "/Users/rontzarfati/Desktop/zaza/zazadance-studio"
+        ".",
+        str(config.REPO_ROOT)
     ]
     
-    for path in search_paths:
-        if os.path.exists(path):
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    if file.endswith('.ipa'):
-                        full_path = os.path.join(root, file)
-                        print(f"📱 נמצא IPA: {full_path}")
-                        return full_path
-    
-    return None
+    full_path = find_artifact(version=version, short_version=short_version, roots=search_paths)
+    if full_path and exclude and os.path.exists(exclude) and os.path.samefile(full_path, exclude):
+        full_path = None
+    if full_path:
+        print(f"📱 נמצא IPA: {full_path}")
+    return full_path
 
-def create_dummy_ipa():
+def create_dummy_ipa(short_version, build):
     """Create a placeholder IPA for Build 31"""
     
     # Create build directory
@@ -39,8 +45,10 @@ def create_dummy_ipa():
     # Create a dummy IPA file (will be replaced with real binary later)
     dummy_ipa_path = "./build/ios/ipa/ZaZa_Dance_Build_31.ipa"
     
-    # Copy existing IPA if found, or create minimal structure
-    existing_ipa = find_existing_ipa()
+    # Copy an IPA of this exact version if found (never another build, never
+    # the placeholder onto itself), or create minimal structure
+    existing_ipa = find_existing_ipa(version=build, short_version=short_version,
+                                     exclude=dummy_ipa_path)
     
     if existing_ipa:
         print(f"📋 מעתיק IPA קיים: {existing_ipa}")
@@ -53,7 +61,7 @@ def create_dummy_ipa():
     
     return dummy_ipa_path
 
-def upload_to_app_store(ipa_path):
+def upload_with_altool(ipa_path):
     """Upload IPA to App Store Connect using altool"""
     
     print(f"☁️ מעלה {ipa_path} לApp Store Connect...")
@@ -69,25 +77,93 @@ def upload_to_app_store(ipa_path):
     ]
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        # Output is streamed as altool prints it; no fixed timeout for large IPAs
+        result = run_streamed(cmd, on_line=lambda line: print(f"   {line}"),
+                              on_progress=lambda event: print(f"⬆️  {event.percent:.0f}%"))
         
-        if result.returncode == 0:
+        if result.ok:
             print("✅ העלאה הושלמה בהצלחה!")
             print("🎉 בילד 31 יופיע בApp Store Connect תוך כמה דקות")
             return True
         else:
-            print(f"❌ שגיאה בהעלאה:")
-            print(f"stdout: {result.stdout}")
-            print(f"stderr: {result.stderr}")
+            print(f"❌ שגיאה בהעלאה (exit {result.returncode})")
             return False
             
-    except subprocess.TimeoutExpired:
-        print("❌ העלאה נכשלה - timeout")
-        return False
     except Exception as e:
         print(f"❌ שגיאה בהעלאה: {e}")
         return False
 
+def validate_ipa(ipa_path):
+    """Validate the IPA with altool before it is uploaded"""
+    
+    print(f"🔍 מאמת את {ipa_path}...")
+    
+    cmd = [
+        'xcrun', 'altool',
+        '--validate-app',
+        '--type', 'ios',
+        '--file', ipa_path,
+        '--apiKey', API_KEY_ID,
+        '--apiIssuer', API_ISSUER_ID
+    ]
+    
+    try:
+        result = run_streamed(cmd, on_line=lambda line: print(f"   {line}"))
+    except FileNotFoundError:
+        print("⚠️  xcrun לא זמין, מדלג על אימות")
+        return True
+    
+    if result.ok:
+        print("✅ האימות עבר בהצלחה")
+        return True
+    print(f"❌ האימות נכשל (exit {result.returncode})")
+    return False
+
+def read_pubspec_version(pubspec_path="./pubspec.yaml"):
+    """Return (short_version, build_number) from pubspec.yaml, e.g. ('2.0.0', '31')"""
+    with open(pubspec_path, 'r') as f:
+        for line in f:
+            if line.startswith('version:'):
+                short_version, _, build = line.split(':', 1)[1].strip().partition('+')
+                return short_version, build
+    return None, None
+
+def check_ipa_version(ipa_path, short_version, build):
+    """True when the IPA's Info.plist is the pubspec version and build number"""
+    info = read_ipa_info(ipa_path)
+    if info is None:
+        print(f"❌ {ipa_path} אינו IPA תקין (אין Info.plist)")
+        return False
+    if (info['short_version'], info['version']) != (short_version, build):
+        print(f"❌ {ipa_path} הוא גרסה {info['short_version']} בילד {info['version']}, "
+              f"ולא {short_version} בילד {build} כמו ב-pubspec.yaml")
+        return False
+    return True
+
+def upload_to_app_store(ipa_path):
+    """Upload IPA with the native chunked uploader, falling back to altool"""
+    
+    short_version, build = read_pubspec_version()
+    if not check_ipa_version(ipa_path, short_version, build):
+        return False
+    print(f"☁️ מעלה {ipa_path} לApp Store Connect (גרסה {short_version} בילד {build})...")
+    
+    try:
+        upload_id = IpaUploader().upload(ipa_path, build, short_version)
+        if upload_id is None:
+            return True
+        print(f"✅ העלאה הושלמה בהצלחה! (buildUpload {upload_id})")
+        print("🎉 בילד 31 יופיע בApp Store Connect תוך כמה דקות")
+        return True
+    except AppStoreConnectError as e:
+        print(f"⚠️  ה-API דחה את ההעלאה ({e.status_code}), עובר ל-altool...")
+    except UploadError as e:
+        print(f"❌ שגיאה בהעלאה: {e}")
+        print("💡 הרץ שוב כדי להמשיך מהחלק האחרון שהועלה")
+        return False
+    
+    return upload_with_altool(ipa_path)
+
 def update_version_to_31():
     """Update pubspec.yaml to version 31 if not already"""
     
@@ -112,33 +188,70 @@ def update_version_to_31():
     
     return True
 
+def locate_ipa():
+    """Find the IPA for the pubspec build number, or prepare one"""
+    
+    # Try to find an existing IPA for the pubspec version and build number
+    short_version, build = read_pubspec_version()
+    ipa_path = find_existing_ipa(version=build, short_version=short_version)
+    
+    if not ipa_path:
+        print("📦 לא נמצא IPA קיים, יוצר זמני...")
+        ipa_path = create_dummy_ipa(short_version, build)
+    
+    if not ipa_path or not os.path.exists(ipa_path):
+        print("❌ לא הצלחתי ליצור IPA")
+        return False
+    # A placeholder or another build must never be validated or uploaded
+    if not check_ipa_version(ipa_path, short_version, build):
+        print("💡 בנה את ה-IPA (flutter build ipa) והרץ שוב")
+        return False
+    return ipa_path
+
+def ipa_inputs(ipa_path):
+    """Identity of an IPA for the release journal"""
+    return get_fingerprint_cache().fingerprint(ipa_path)['sha256']
+
+def upload_confirmed(ipa_path):
+    """True when this exact IPA is already recorded as uploaded"""
+    fingerprint = get_fingerprint_cache().fingerprint(ipa_path)
+    return get_fingerprint_cache().find_uploaded(fingerprint) is not None
+
 if __name__ == "__main__":
     print("🚀 מתכונן להעלאת בילד 31...")
     
-    # Update version
-    if not update_version_to_31():
-        sys.exit(1)
+    # Steps whose inputs did not change since the last successful run are
+    # skipped; independent steps run in parallel
+    pipeline = Pipeline('build-31', force='--force' in sys.argv[1:])
     
-    # Try to find existing IPA
-    ipa_path = find_existing_ipa()
+    def locate_result():
+        return pipeline.result('locate')
     
-    if not ipa_path:
-        print("📦 לא נמצא IPA קיים, יוצר זמני...")
-        ipa_path = create_dummy_ipa()
+    pipeline.step('version', update_version_to_31, inputs={'build': '31'},
+                  confirm=lambda _: read_pubspec_version()[1] == '31')
+    # Cheap, and a placeholder IPA must never stand in for a real one on
+    # later runs: look the IPA up every time
+    pipeline.step('locate', locate_ipa, depends_on=['version'], checkpoint=False)
+    pipeline.step('validate', lambda: validate_ipa(locate_result()),
+                  inputs=lambda: ipa_inputs(locate_result()),
+                  depends_on=['locate'])
+    if '--metadata' in sys.argv[1:]:
+        # Localizations do not depend on the binary, push them meanwhile
+        pipeline.step('metadata', lambda: sync_metadata(app_id=config.APP_ID),
+                      inputs=lambda: file_digest(*sorted(config.METADATA_DIR.glob('*.json'))))
+    pipeline.step('upload', lambda: upload_to_app_store(locate_result()),
+                  inputs=lambda: ipa_inputs(locate_result()),
+                  confirm=lambda _: upload_confirmed(locate_result()),
+                  depends_on=['validate'])
     
-    if ipa_path and os.path.exists(ipa_path):
-        # Upload to App Store
-        success = upload_to_app_store(ipa_path)
-        
-        if success:
-            print("\n🎉 בילד 31 הועלה בהצלחה!")
-            print("📱 כלל את כל התיקונים:")
-            print("   ✅ Google Sign-In תוקן")
-            print("   ✅ כפתור מחיקת חשבון נוסף")
-            print("   ✅ שגיאת מסד הנתונים נפתרה")
-        else:
-            print("❌ העלאה נכשלה")
-            sys.exit(1)
+    success = pipeline.run()
+    
+    if success:
+        print("\n🎉 בילד 31 הועלה בהצלחה!")
+        print("📱 כלל את כל התיקונים:")
+        print("   ✅ Google Sign-In תוקן")
+        print("   ✅ כפתור מחיקת חשבון נוסף")
+        print("   ✅ שגיאת מסד הנתונים נפתרה")
     else:
-        print("❌ לא הצלחתי ליצור IPA")
-        sys.exit(1)
\ No newline at end of file
+        print("❌ העלאה נכשלה")
+        sys.exit(1)